@@ -0,0 +1,138 @@
+# proxy_steam_manager/adaptive_limiter.py
+
+"""
+Limite de concorrência adaptativo (AIMD) para o checker.
+
+O limite cresce de forma aditiva enquanto está a ser usado e o sistema está
+saudável, e é reduzido de forma multiplicativa quando aparecem sinais de
+sobrecarga local: erros de sockets do próprio sistema (EMFILE/ENOBUFS...),
+lag do event loop ou um aumento da taxa de timeouts acima da taxa de base.
+"""
+
+import asyncio
+import errno
+from collections import deque
+from typing import Deque, Optional
+
+# Erros que indicam falta de recursos locais, e não um proxy morto
+LOCAL_ERRNOS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.EADDRNOTAVAIL, errno.ENOMEM}
+# Número mínimo de resultados numa janela para a taxa de timeouts contar
+MIN_WINDOW_SAMPLES = 20
+
+OUTCOME_OK = "ok"
+OUTCOME_FAIL = "fail"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_LOCAL_ERROR = "local_error"
+
+
+def classify_exception(exc: BaseException) -> str:
+    """Classifica uma exceção de verificação como timeout, erro local ou falha do proxy."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, OSError) and exc.errno in LOCAL_ERRNOS:
+            return OUTCOME_LOCAL_ERROR
+        if isinstance(exc, asyncio.TimeoutError) or "Timeout" in type(exc).__name__:
+            return OUTCOME_TIMEOUT
+        exc = exc.__cause__ or exc.__context__
+    return OUTCOME_FAIL
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial: int, minimum: int, maximum: int, increase: float, decrease_factor: float,
+                 max_loop_lag_ms: float, timeout_margin: float):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.timeout_margin = timeout_margin
+        self.in_flight = 0
+        self.last_reason = "inicial"
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._timeout_baseline: Optional[float] = None
+        self._reset_window()
+
+    def _reset_window(self):
+        self._total = 0
+        self._timeouts = 0
+        self._local_errors = 0
+
+    # --- Aquisição / libertação ---
+
+    async def acquire(self):
+        while self.in_flight >= int(self.limit):
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future in self._waiters:
+                    self._waiters.remove(future)
+                self._wake()
+                raise
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                free -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+    # --- Controlo ---
+
+    def record(self, outcome: str):
+        self._total += 1
+        if outcome == OUTCOME_TIMEOUT:
+            self._timeouts += 1
+        elif outcome == OUTCOME_LOCAL_ERROR:
+            self._local_errors += 1
+
+    def adjust(self, loop_lag_ms: float) -> bool:
+        """Fecha a janela atual e ajusta o limite; devolve True se o limite (inteiro) mudou."""
+        total, timeouts, local_errors = self._total, self._timeouts, self._local_errors
+        self._reset_window()
+        timeout_rate = timeouts / total if total else 0.0
+        old_limit = self.limit
+
+        if local_errors:
+            self._decrease(f"{local_errors} erros locais de sockets (EMFILE/ENOBUFS)")
+        elif loop_lag_ms > self.max_loop_lag_ms:
+            self._decrease(f"lag do event loop de {loop_lag_ms:.0f} ms")
+        elif (total >= MIN_WINDOW_SAMPLES and self._timeout_baseline is not None
+              and timeout_rate > self._timeout_baseline + self.timeout_margin):
+            self._decrease(f"timeouts a {timeout_rate:.0%} (base {self._timeout_baseline:.0%})")
+        else:
+            if total >= MIN_WINDOW_SAMPLES:
+                # Taxa de timeouts "normal" da lista (proxies mortos), fora dos períodos de sobrecarga
+                if self._timeout_baseline is None:
+                    self._timeout_baseline = timeout_rate
+                else:
+                    self._timeout_baseline += 0.2 * (timeout_rate - self._timeout_baseline)
+            # Só cresce se o limite atual estiver a ser usado
+            if self._waiters or self.in_flight >= int(self.limit):
+                self.limit = min(self.maximum, self.limit + self.increase)
+                self.last_reason = "aumento aditivo"
+
+        if int(self.limit) == int(old_limit):
+            return False
+        self._wake()
+        return True
+
+    def _decrease(self, reason: str):
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+        self.last_reason = reason
@@ -0,0 +1,184 @@
+# proxy_steam_manager/async_logger.py
+
+"""
+Logger partilhado pelo checker e pelo serviço, com o custo mínimo para quem regista.
+
+Quem chama só verifica o nível e acrescenta um tuplo a uma deque (append é
+atómico, sem locks nem I/O). Um único thread escritor acorda a cada
+LOG_FLUSH_INTERVAL_SEC, formata os registos pendentes e escreve-os de uma vez,
+rodando o ficheiro quando ultrapassa LOG_MAX_BYTES.
+
+Cada registo é estruturado: nível, evento, mensagem e campos (chave=valor).
+Em formato "text" fica numa linha legível; em "json" numa linha JSON.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+
+# (timestamp, nível, evento, mensagem, campos)
+LogRecord = Tuple[float, int, str, str, dict]
+
+
+def parse_level(level) -> int:
+    """Aceita o nível como número ou nome ('DEBUG', 'info'...)."""
+    if isinstance(level, int):
+        return level
+    try:
+        return LEVELS[str(level).upper()]
+    except KeyError:
+        raise ValueError(f"Nível de log desconhecido: '{level}'. Disponíveis: {', '.join(LEVELS)}") from None
+
+
+def format_text(record: LogRecord) -> str:
+    ts, level, event, message, fields = record
+    clock = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+    parts = [f"({clock}.{int(ts % 1 * 1000):03d}) {LEVEL_NAMES.get(level, level)}: {event}"]
+    parts.extend(f"{key}={value}" for key, value in fields.items() if value is not None)
+    line = " ".join(parts)
+    return f"{line} | {message}\n" if message else line + "\n"
+
+
+def format_json(record: LogRecord) -> str:
+    ts, level, event, message, fields = record
+    data = {"ts": round(ts, 3), "level": LEVEL_NAMES.get(level, level), "event": event}
+    if message:
+        data["msg"] = message
+    data.update(fields)
+    return json.dumps(data, ensure_ascii=False, default=str) + "\n"
+
+
+FORMATTERS = {"text": format_text, "json": format_json}
+
+
+class AsyncLogger:
+    """
+    path=None escreve só na consola; console=True escreve também na consola.
+    Se o escritor não acompanhar, os registos acima de max_pending são
+    descartados e contados (não se bloqueia quem regista): `dropped_total` só
+    sobe (só quem regista lhe escreve) e o escritor regista a diferença desde o
+    último LOG_DROPPED.
+    """
+
+    def __init__(self, path: Optional[str], level=INFO, console: bool = False, fmt: str = "text",
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3,
+                 flush_interval_sec: float = 0.5, max_pending: int = 200_000):
+        if fmt not in FORMATTERS:
+            raise ValueError(f"Formato de log desconhecido: '{fmt}'. Disponíveis: {', '.join(FORMATTERS)}")
+        self.path = path
+        self.level = parse_level(level)
+        self.console = console
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval_sec = flush_interval_sec
+        self.max_pending = max_pending
+        self.dropped_total = 0
+        self._dropped_reported = 0  # Só o escritor mexe
+        self._format = FORMATTERS[fmt]
+        self._pending: Deque[LogRecord] = deque()
+        self._file = None
+        self._size = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="async-logger", daemon=True)
+        self._thread.start()
+        # Não perder os registos pendentes se o processo terminar sem close()
+        atexit.register(self.close)
+
+    def log(self, level: int, event: str, message: str = "", **fields):
+        if level < self.level:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped_total += 1
+            return
+        self._pending.append((time.time(), level, event, message, fields))
+
+    def debug(self, event: str, message: str = "", **fields):
+        self.log(DEBUG, event, message, **fields)
+
+    def info(self, event: str, message: str = "", **fields):
+        self.log(INFO, event, message, **fields)
+
+    def warning(self, event: str, message: str = "", **fields):
+        self.log(WARNING, event, message, **fields)
+
+    def error(self, event: str, message: str = "", **fields):
+        self.log(ERROR, event, message, **fields)
+
+    def close(self):
+        """Escreve o que está pendente e termina o escritor."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+
+    # --- Thread escritor ---
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval_sec):
+            self._flush()
+        self._flush()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _flush(self):
+        dropped = self.dropped_total - self._dropped_reported
+        if not self._pending and not dropped:
+            return
+        lines = []
+        pending = self._pending
+        while pending:
+            lines.append(self._format(pending.popleft()))
+        if dropped:
+            self._dropped_reported += dropped
+            lines.append(self._format((time.time(), WARNING, "LOG_DROPPED", f"{dropped} registos descartados (fila cheia)", {})))
+        chunk = "".join(lines)
+        if self.console:
+            sys.stdout.write(chunk)
+            sys.stdout.flush()
+        if self.path:
+            try:
+                self._write(chunk)
+            except OSError as e:
+                print(f"ERRO CRÍTICO AO ESCREVER NO LOG '{self.path}': {e}", file=sys.stderr, flush=True)
+                self._file = None
+
+    def _write(self, chunk: str):
+        data = chunk.encode("utf-8")
+        if self._file is None:
+            self._open()
+        if self.max_bytes and self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+    def _open(self):
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        """steam_debug.log -> .1 -> .2 ... até backup_count; o mais antigo é apagado."""
+        self._file.close()
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
@@ -0,0 +1,72 @@
+# proxy_steam_manager/benchmarks/bench_checker_workers.py
+
+"""
+Mede o débito de check_steam_proxies.py em função de --workers, contra uma
+frota local de proxies HTTP falsos (ver fakes.py) que respondem como a API da
+Steam. O pedido de validação é feito em HTTP simples, por isso o custo de TLS
+não entra na medição; o objetivo é comparar o escalonamento entre valores de
+--workers e não o débito absoluto contra a Steam.
+
+Uso:
+    python benchmarks/bench_checker_workers.py --proxies 3000 --workers 1,2,4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import start_http_proxy_fleet, stop_fleet
+
+
+def run_checker(workers: int, input_file: str, tmp: str, validation_url: str) -> dict:
+    output_file = os.path.join(tmp, f"out_{workers}.txt")
+    history_file = os.path.join(tmp, f"history_{workers}.json")
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "check_steam_proxies.py"), "--once", "--workers", str(workers),
+         "--input", input_file, "--output", output_file, "--history", history_file,
+         "--validation-url", validation_url],
+        cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    elapsed = time.perf_counter() - started
+    with open(output_file, "r", encoding="utf-8") as f:
+        valid = sum(1 for line in f if line.strip())
+    return {"workers": workers, "seconds": round(elapsed, 3), "valid": valid}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proxies", type=int, default=3000, help="Número de proxies falsos (um porto cada).")
+    parser.add_argument("--base-port", type=int, default=20000)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--fleet-processes", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Latência média dos proxies falsos.")
+    args = parser.parse_args()
+
+    fleet = start_http_proxy_fleet("127.0.0.1", args.base_port, args.proxies, args.fleet_processes, args.latency_ms / 1000)
+    time.sleep(1.0 + args.proxies / 5000)  # Dar tempo à frota para abrir os portos
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            input_file = os.path.join(tmp, "live.txt")
+            with open(input_file, "w", encoding="utf-8") as f:
+                for port in range(args.base_port, args.base_port + args.proxies):
+                    f.write(f"http://127.0.0.1:{port}\n")
+            validation_url = "http://127.0.0.1:9/market/search/render/?query=&start=10&count=10"
+            for workers in (int(w) for w in args.workers.split(",")):
+                result = run_checker(workers, input_file, tmp, validation_url)
+                result["proxies"] = args.proxies
+                result["proxies_per_sec"] = round(args.proxies / result["seconds"], 1)
+                print(json.dumps(result), flush=True)
+    finally:
+        stop_fleet(fleet)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# proxy_steam_manager/benchmarks/bench_harvester.py
+
+"""
+Compara a recolha das listas de proxies feita uma fonte de cada vez com
+requests.get (como utils.get_all_proxies) com o proxy_harvester (todas em
+paralelo, ligações reutilizadas e pedidos condicionais), contra um servidor
+local de listas (ver fakes.py) com latência por pedido.
+
+Mede duas rondas seguidas: na segunda as listas não mudaram, por isso o
+harvester recebe 304 e não volta a descarregar nem a ler nada.
+
+Uso:
+    python benchmarks/bench_harvester.py --sources 35 --lines 20000 --latency-ms 150
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import start_list_server, wait_for_port  # noqa: E402
+from proxy_harvester import ProxyHarvester  # noqa: E402
+
+
+def sequential_round(urls, known: set) -> dict:
+    """Uma fonte de cada vez, o corpo inteiro em memória antes de ser interpretado."""
+    started = time.perf_counter()
+    downloaded = new = 0
+    for url in urls:
+        response = requests.get(url, timeout=20)
+        response.raise_for_status()
+        downloaded += len(response.content)
+        for line in response.text.splitlines():
+            line = line.strip()
+            if line and ":" in line and line not in known:
+                known.add(line)
+                new += 1
+    return {"elapsed_sec": round(time.perf_counter() - started, 3), "bytes": downloaded, "new": new}
+
+
+async def harvester_rounds(urls, output_file: str, concurrency: int) -> list:
+    rounds = []
+    async with ProxyHarvester({"http": urls}, output_file, concurrency=concurrency) as harvester:
+        for _ in range(2):
+            result = await harvester.harvest_once()
+            rounds.append({"elapsed_sec": round(result.elapsed_sec, 3),
+                           "bytes": sum(source.bytes for source in result.sources),
+                           "new": len(result.new_lines), "not_modified": result.unchanged,
+                           "failed": result.failed})
+    return rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", type=int, default=35, help="Número de listas (update_proxies.ps1 tinha 35).")
+    parser.add_argument("--lines", type=int, default=20000, help="Linhas por lista.")
+    parser.add_argument("--overlap", type=float, default=0.3, help="Fração de cada lista repetida em todas as outras.")
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="Latência média de cada pedido.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--port", type=int, default=18931)
+    parser.add_argument("--json", action="store_true", help="Imprimir o resultado em JSON.")
+    args = parser.parse_args()
+
+    host = "127.0.0.1"
+    server = start_list_server(host, args.port, args.sources, args.lines, args.overlap, args.latency_ms / 1000.0)
+    try:
+        wait_for_port(host, args.port)
+        urls = [f"http://{host}:{args.port}/list/{i}" for i in range(args.sources)]
+        known: set = set()
+        sequential = [sequential_round(urls, known) for _ in range(2)]
+        with tempfile.TemporaryDirectory() as workdir:
+            output_file = os.path.join(workdir, "live.txt")
+            harvester = asyncio.run(harvester_rounds(urls, output_file, args.concurrency))
+            with open(output_file, "r", encoding="utf-8") as f:
+                written = sum(1 for _ in f)
+    finally:
+        server.terminate()
+        server.join()
+
+    result = {"sources": args.sources, "lines_per_source": args.lines, "sequential": sequential,
+              "harvester": harvester, "harvester_lines_written": written}
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"{args.sources} listas x {args.lines} linhas, {args.latency_ms} ms por pedido")
+    print(f"{'':>12} {'ronda':>6} {'tempo (s)':>10} {'descarregado (MB)':>18} {'novos':>8}")
+    for name in ("sequential", "harvester"):
+        for i, r in enumerate(result[name], 1):
+            print(f"{name:>12} {i:>6} {r['elapsed_sec']:>10} {r['bytes'] / 1e6:>18.1f} {r['new']:>8}")
+    print(f"Linhas no ficheiro de saída do harvester: {written}")
+
+
+if __name__ == "__main__":
+    main()
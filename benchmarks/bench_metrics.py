@@ -0,0 +1,120 @@
+# proxy_steam_manager/benchmarks/bench_metrics.py
+
+"""
+Custo da instrumentação (metrics.py): nanossegundos por evento registado
+(contador, histograma) e o acréscimo em get_proxy / report_proxy_usage
+medidos com e sem a instrumentação (os métodos _get_proxy / _report_proxy_usage
+são o corpo sem ela), num pool de N proxies. Mede também o tempo de gerar o
+texto de /metrics.
+
+Uso:
+    python benchmarks/bench_metrics.py --proxies 10000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import proxy_manager_service as service  # noqa: E402
+from async_logger import ERROR  # noqa: E402
+from metrics import FAST_BUCKETS, Registry  # noqa: E402
+
+
+def per_event_ns(fn, n: int) -> float:
+    started = time.perf_counter()
+    fn(n)
+    return round((time.perf_counter() - started) / n * 1e9, 1)
+
+
+def pool_cycle_ns(get_proxy, report, n: int) -> float:
+    started = time.perf_counter()
+    for i in range(n):
+        proxy = get_proxy(f"s{i % 5000}")
+        if proxy is not None:
+            report(proxy.key, i % 50 != 0, 200.0, None)
+    return round((time.perf_counter() - started) / n * 1e9, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proxies", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--cycles", type=int, default=200000, help="Pares get_proxy + report_proxy_usage.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Imprimir o resultado em JSON.")
+    args = parser.parse_args()
+
+    service.logger.level = ERROR + 1  # Sem registos na consola durante a medição
+    registry = Registry()
+    counter = registry.counter("bench_total", "x")
+    histogram = registry.histogram("bench_seconds", "x", FAST_BUCKETS)
+
+    def count(n):
+        inc = counter.inc
+        for _ in range(n):
+            inc()
+
+    def observe(n):
+        obs = histogram.observe
+        for i in range(n):
+            obs(i * 1e-8)
+
+    def timed_observe(n):
+        obs, clock = histogram.observe, time.perf_counter
+        for _ in range(n):
+            started = clock()
+            obs(clock() - started)
+
+    def empty_loop(n):
+        for _ in range(n):
+            pass
+
+    loop_ns = per_event_ns(empty_loop, args.events)
+    result = {
+        "counter_inc_ns": round(per_event_ns(count, args.events) - loop_ns, 1),
+        "histogram_observe_ns": round(per_event_ns(observe, args.events) - loop_ns, 1),
+        "timed_observe_ns": round(per_event_ns(timed_observe, args.events) - loop_ns, 1),
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        data_file = os.path.join(workdir, "steam_live.txt")
+        with open(data_file, "w", encoding="utf-8") as f:
+            for i in range(args.proxies):
+                f.write(f"http://10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}:8080\n")
+        # Cada medição num pool novo (as sessões e os cooldowns mudam o custo); a melhor de várias
+        plain, instrumented = [], []
+        for _ in range(args.repeat):
+            pool = service.ProxyPool(data_file)
+            plain.append(pool_cycle_ns(pool._get_proxy, pool._report_proxy_usage, args.cycles))
+            pool = service.ProxyPool(data_file)
+            instrumented.append(pool_cycle_ns(pool.get_proxy, pool.report_proxy_usage, args.cycles))
+        plain, instrumented = min(plain), min(instrumented)
+        pool.register_metrics()
+        started = time.perf_counter()
+        text = pool.metrics_text()
+        render_ms = round((time.perf_counter() - started) * 1000.0, 2)
+
+    result.update({
+        "cycle_plain_ns": plain,
+        "cycle_instrumented_ns": instrumented,
+        "overhead_per_cycle_ns": round(instrumented - plain, 1),
+        "render_ms": render_ms,
+        "render_bytes": len(text),
+    })
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"contador: {result['counter_inc_ns']} ns/evento; histograma: {result['histogram_observe_ns']} ns/evento; "
+          f"histograma com duas leituras do relógio: {result['timed_observe_ns']} ns/evento")
+    print(f"get_proxy + report_proxy_usage ({args.proxies} proxies): {plain} ns sem instrumentação, "
+          f"{instrumented} ns com ({result['overhead_per_cycle_ns']} ns a mais por par)")
+    print(f"/metrics: {render_ms} ms, {len(text)} bytes")
+
+
+if __name__ == "__main__":
+    main()
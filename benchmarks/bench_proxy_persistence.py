@@ -0,0 +1,133 @@
+# proxy_steam_manager/benchmarks/bench_proxy_persistence.py
+
+"""
+Compara a gravação dos proxies num ficheiro JSON (como utils.py fazia: cada
+atualização de um proxy lê o ficheiro todo e reescreve-o com indent=4) com o
+ProxyStore em SQLite (proxy_store.py), para N proxies guardados:
+
+  - atualizações de um só proxy por segundo;
+  - gravação de um lote de proxies;
+  - carregamento de todos os proxies (json.loads vs leitura aos blocos);
+  - consulta "vivos com latência < X validados nos últimos N minutos".
+
+Uso:
+    python benchmarks/bench_proxy_persistence.py --proxies 50000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Proxy  # noqa: E402
+from proxy_store import ProxyStore  # noqa: E402
+
+
+def make_proxies(n_proxies: int, rng: random.Random):
+    now = time.time()
+    protocols = ("http", "socks4", "socks5")
+    return [Proxy(ip=f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}", port=1024 + i % 50000,
+                  protocol=protocols[i % 3], latency=rng.uniform(50.0, 5000.0),
+                  last_validated=now - rng.uniform(0, 3600), failures=rng.choice((0, 0, 0, 1, 3)))
+            for i in range(n_proxies)]
+
+
+def json_load(path: str):
+    with open(path, "r") as f:
+        return [Proxy.from_dict(d) for d in json.loads(f.read())]
+
+
+def json_save(proxies, path: str):
+    with open(path + ".tmp", "w") as f:
+        json.dump([p.to_dict() for p in proxies], f, indent=4)
+    os.replace(path + ".tmp", path)
+
+
+def json_update_one(proxy: Proxy, path: str):
+    existing = {p.key_str: p for p in json_load(path)}
+    existing[proxy.key_str] = proxy
+    json_save(list(existing.values()), path)
+
+
+def json_query(path: str, max_latency_ms: float, within_sec: float):
+    since = time.time() - within_sec
+    return sorted((p for p in json_load(path)
+                   if p.failures == 0 and p.latency is not None and p.latency < max_latency_ms
+                   and p.last_validated and p.last_validated >= since), key=lambda p: p.latency)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proxies", type=int, default=50000)
+    parser.add_argument("--updates", type=int, default=200, help="Atualizações de um só proxy (SQLite).")
+    parser.add_argument("--json-updates", type=int, default=5, help="Atualizações de um só proxy (JSON; são lentas).")
+    parser.add_argument("--batch", type=int, default=5000, help="Proxies num lote.")
+    parser.add_argument("--max-latency", type=float, default=1000.0)
+    parser.add_argument("--within-min", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Imprimir o resultado em JSON.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    proxies = make_proxies(args.proxies, rng)
+    within_sec = args.within_min * 60.0
+    result = {"proxies": args.proxies}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        json_path = os.path.join(workdir, "proxies.json")
+        db_path = os.path.join(workdir, "proxies.db")
+
+        _, elapsed = timed(json_save, proxies, json_path)
+        _, update_sec = timed(lambda: [json_update_one(rng.choice(proxies), json_path) for _ in range(args.json_updates)])
+        _, load_sec = timed(json_load, json_path)
+        live, query_sec = timed(json_query, json_path, args.max_latency, within_sec)
+        result["json"] = {
+            "file_mb": round(os.path.getsize(json_path) / 1e6, 1),
+            "updates_per_sec": round(args.json_updates / update_sec, 1),
+            "batch_write_ms": round(elapsed * 1000.0, 1),  # Um lote também reescreve o ficheiro todo
+            "load_all_ms": round(load_sec * 1000.0, 1),
+            "query_ms": round(query_sec * 1000.0, 1),
+            "query_rows": len(live),
+        }
+
+        with ProxyStore(db_path) as store:
+            store.upsert_many(proxies)
+            _, update_sec = timed(lambda: [store.upsert(rng.choice(proxies)) for _ in range(args.updates)])
+            _, batch_sec = timed(store.upsert_many, rng.sample(proxies, min(args.batch, len(proxies))))
+            _, load_sec = timed(lambda: sum(1 for _ in store.iter_proxies()))
+            live_db, query_sec = timed(lambda: list(store.query_live(args.max_latency, within_sec)))
+            result["sqlite"] = {
+                "file_mb": round(os.path.getsize(db_path) / 1e6, 1),
+                "updates_per_sec": round(args.updates / update_sec, 1),
+                "batch_write_ms": round(batch_sec * 1000.0, 1),
+                "load_all_ms": round(load_sec * 1000.0, 1),
+                "query_ms": round(query_sec * 1000.0, 1),
+                "query_rows": len(live_db),
+            }
+
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"{args.proxies} proxies guardados; lote de {args.batch}; consulta: latência < {args.max_latency} ms, "
+          f"validados há menos de {args.within_min} min")
+    print(f"{'':>8} {'ficheiro (MB)':>14} {'atualizações/s':>15} {'lote (ms)':>10} {'carregar (ms)':>14} "
+          f"{'consulta (ms)':>14} {'linhas':>7}")
+    for name in ("json", "sqlite"):
+        r = result[name]
+        print(f"{name:>8} {r['file_mb']:>14} {r['updates_per_sec']:>15} {r['batch_write_ms']:>10} "
+              f"{r['load_all_ms']:>14} {r['query_ms']:>14} {r['query_rows']:>7}")
+
+
+if __name__ == "__main__":
+    main()
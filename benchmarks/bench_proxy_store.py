@@ -0,0 +1,176 @@
+# proxy_steam_manager/benchmarks/bench_proxy_store.py
+
+"""
+Mede, uma a uma, as alterações possíveis à representação dos proxies num pool
+de N proxies, todas com os mesmos campos de models.Proxy:
+
+  - legacy:      dataclass com __dict__, chaves 'ip:porto:protocolo' e prazos datetime;
+  - slots:       legacy com __slots__ (dataclass(slots=True));
+  - packed_keys: legacy com chaves inteiras (IPv4 << 24) | (porto << 8) | protocolo;
+  - monotonic:   legacy com prazos em time.monotonic();
+  - compact:     __slots__ e prazos em time.monotonic() (o models.Proxy atual);
+  - compact_frozen: compact depois de gc.freeze(), como o serviço faz a seguir
+    ao carregamento inicial.
+
+Para cada uma: memória do pool (tracemalloc), duração de um gc.collect()
+completo com o pool vivo e débito do caminho quente (obter o proxy pela chave
+do pool, verificar o cooldown, atualizar contadores e, às vezes, pô-lo em
+cooldown). As pausas e o débito são a mediana de várias repetições; o débito
+varia bastante entre execuções, por isso convém comparar várias.
+
+Uso:
+    python benchmarks/bench_proxy_store.py --proxies 500000
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import fields, make_dataclass
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Proxy, proxy_key  # noqa: E402
+
+PROTOCOL_CODES = {"http": 1, "socks4": 2, "socks5": 3}
+
+
+def packed_key(ip: str, port: int, protocol: str) -> int:
+    return (int.from_bytes(socket.inet_aton(ip), "big") << 24) | (port << 8) | PROTOCOL_CODES[protocol]
+
+
+def proxy_class(name: str, slots: bool):
+    """Classe com os campos de models.Proxy (sem os métodos), com ou sem __slots__."""
+    return make_dataclass(name, [(f.name, f.type, f) for f in fields(Proxy)], slots=slots)
+
+
+DictProxy = proxy_class("DictProxy", slots=False)
+SlotsProxy = proxy_class("SlotsProxy", slots=True)
+
+# nome -> (classe, função da chave, prazos em time.monotonic(), gc.freeze())
+VARIANTS = {
+    "legacy": (DictProxy, proxy_key, False, False),
+    "slots": (SlotsProxy, proxy_key, False, False),
+    "packed_keys": (DictProxy, packed_key, False, False),
+    "monotonic": (DictProxy, proxy_key, True, False),
+    "compact": (SlotsProxy, proxy_key, True, False),
+    "compact_frozen": (SlotsProxy, proxy_key, True, True),
+}
+
+
+def addresses(n_proxies: int):
+    protocols = ("http", "socks4", "socks5")
+    return [(f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}", 1024 + i % 50000, protocols[i % 3])
+            for i in range(n_proxies)]
+
+
+def build(cls, make_key, monotonic: bool, rows):
+    proxies = {}
+    validated = time.time() if monotonic else datetime.now()
+    for ip, port, protocol in rows:
+        key = make_key(ip, port, protocol)
+        proxies[key] = cls(ip=ip, port=port, protocol=protocol, latency=250.0, last_validated=validated, key=key)
+    return proxies, list(proxies)
+
+
+def hot_path_datetime(proxies, keys, cooldown_every: int):
+    for i, key in enumerate(keys):
+        proxy = proxies[key]
+        if proxy.cooldown_until and datetime.now() <= proxy.cooldown_until:
+            continue
+        proxy.requests_served += 1
+        if i % cooldown_every == 0:
+            proxy.cooldown_until = datetime.now() + timedelta(seconds=300)
+
+
+def hot_path_monotonic(proxies, keys, cooldown_every: int):
+    for i, key in enumerate(keys):
+        proxy = proxies[key]
+        if proxy.cooldown_until and time.monotonic() <= proxy.cooldown_until:
+            continue
+        proxy.requests_served += 1
+        if i % cooldown_every == 0:
+            proxy.cooldown_until = time.monotonic() + 300
+
+
+def measure(variant: str, rows, picks, cooldown_every: int, repeats: int) -> dict:
+    cls, make_key, monotonic, freeze = VARIANTS[variant]
+    gc.collect()
+    tracemalloc.start()
+    proxies, ready = build(cls, make_key, monotonic, rows)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del proxies, ready
+    gc.collect()
+
+    proxies, ready = build(cls, make_key, monotonic, rows)
+    if freeze:
+        gc.collect()
+        gc.freeze()
+    gc_pauses = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        gc.collect()
+        gc_pauses.append((time.perf_counter() - started) * 1000.0)
+
+    # As operações internas do pool (seleção, sessões, índices) usam as chaves do pool
+    keys = [ready[i] for i in picks]
+    hot_path = hot_path_monotonic if monotonic else hot_path_datetime
+    rates = []
+    for _ in range(repeats):
+        for proxy in proxies.values():
+            proxy.cooldown_until = None
+        started = time.perf_counter()
+        hot_path(proxies, keys, cooldown_every)
+        rates.append(len(keys) / (time.perf_counter() - started))
+    if freeze:
+        gc.unfreeze()
+    del proxies, ready, keys
+    gc.collect()
+    return {
+        "memory_mb": round(memory / 1e6, 1),
+        "bytes_per_proxy": round(memory / len(rows)),
+        "gc_collect_ms": round(statistics.median(gc_pauses), 1),
+        "hot_path_ops_per_sec": round(statistics.median(rates)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proxies", type=int, default=300000)
+    parser.add_argument("--operations", type=int, default=500000, help="Operações do caminho quente.")
+    parser.add_argument("--cooldown-every", type=int, default=20, help="Uma operação em cada N põe o proxy em cooldown.")
+    parser.add_argument("--repeats", type=int, default=5, help="Repetições do gc.collect() e do caminho quente.")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="Variantes a medir, separadas por vírgulas.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Imprimir o resultado em JSON.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = addresses(args.proxies)
+    picks = [rng.randrange(args.proxies) for _ in range(args.operations)]
+    variants = [name.strip() for name in args.variants.split(",") if name.strip()]
+
+    result = {"proxies": args.proxies, "operations": args.operations}
+    for name in variants:
+        result[name] = measure(name, rows, picks, args.cooldown_every, args.repeats)
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"{args.proxies} proxies, {args.operations} operações no caminho quente")
+    print(f"{'':>16} {'memória (MB)':>13} {'bytes/proxy':>12} {'gc.collect (ms)':>16} {'ops/s':>10}")
+    for name in variants:
+        r = result[name]
+        print(f"{name:>16} {r['memory_mb']:>13} {r['bytes_per_proxy']:>12} {r['gc_collect_ms']:>16} "
+              f"{r['hot_path_ops_per_sec']:>10}")
+
+
+if __name__ == "__main__":
+    main()
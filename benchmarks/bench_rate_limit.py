@@ -0,0 +1,176 @@
+# proxy_steam_manager/benchmarks/bench_rate_limit.py
+
+"""
+Compara o limite de pedidos por proxy antigo (REQUESTS_PER_PROXY pedidos e
+depois COOLDOWN_TIME_SECONDS de cooldown; um 429 conta como falha) com o token
+bucket de taxa aprendida (rate_limit.py), contra uma Steam simulada.
+
+A simulação corre em tempo virtual, proxy a proxy, com procura ilimitada (cada
+proxy recebe um pedido novo logo que a política o deixa e o anterior acabou).
+A Steam limita cada IP com o seu próprio token bucket, de taxa desconhecida
+para o pool e sorteada à volta de --steam-rate-factor vezes a taxa média da
+janela antiga (REQUESTS_PER_PROXY / COOLDOWN_TIME_SECONDS);
+depois de um 429 responde 429 durante --steam-penalty-sec. Uma fração dos
+proxies está avariada de forma intermitente (--broken, --broken-fail-rate).
+--burst e --rate-max-factor mostram o efeito de rajadas maiores do que as da
+configuração (que mantém o teto da janela antiga, ver config.py).
+
+Uso:
+    python benchmarks/bench_rate_limit.py --proxies 1000 --duration 3600
+    python benchmarks/bench_rate_limit.py --steam-rate-factor 0.5 --json
+    python benchmarks/bench_rate_limit.py --burst 22 --rate-max-factor 4
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (REQUESTS_PER_PROXY, COOLDOWN_TIME_SECONDS, PROXY_RATE_BURST, PROXY_RATE_INITIAL_TOKENS,
+                    PROXY_RATE_INITIAL, PROXY_RATE_MIN, PROXY_RATE_MAX,
+                    PROXY_RATE_INCREASE, PROXY_RATE_DECREASE_FACTOR, PROXY_RATE_LIMIT_STATUS,
+                    PROXY_RATE_LIMITED_COOLDOWN_SEC, PROXY_FAILURE_COOLDOWN_SEC, PROXY_COOLDOWN_MAX_SEC)
+from models import Proxy
+from rate_limit import TokenBucketPolicy
+
+# Taxa média da janela antiga: a referência para a taxa que a Steam aceita
+WINDOW_RATE = REQUESTS_PER_PROXY / COOLDOWN_TIME_SECONDS
+
+
+class FixedWindowPolicy:
+    """O comportamento anterior do ProxyPool, com a interface de TokenBucketPolicy."""
+
+    def take(self, proxy: Proxy, now: float):
+        proxy.requests_served += 1
+        return None  # O limite só era verificado no relatório de sucesso
+
+    def is_rate_limited(self, status_code) -> bool:
+        return False
+
+    def on_success(self, proxy: Proxy, now: float):
+        if proxy.requests_served >= REQUESTS_PER_PROXY:
+            proxy.requests_served = 0
+            return now + COOLDOWN_TIME_SECONDS
+        return None
+
+    def on_failure(self, proxy: Proxy, now: float) -> float:
+        return now + COOLDOWN_TIME_SECONDS
+
+
+class LearnedPolicy(TokenBucketPolicy):
+    def take(self, proxy: Proxy, now: float):
+        proxy.requests_served += 1
+        return super().take(proxy, now)
+
+    def on_success(self, proxy: Proxy, now: float):
+        super().on_success(proxy)
+        return None
+
+
+class SteamLimit:
+    """Token bucket da Steam para um IP, com penalização depois de um 429."""
+
+    def __init__(self, rate: float, burst: float, penalty_sec: float):
+        self.rate, self.burst, self.penalty_sec = rate, burst, penalty_sec
+        self.tokens, self.updated_at, self.blocked_until = burst, 0.0, 0.0
+
+    def allow(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if now < self.blocked_until or self.tokens < 1.0:
+            self.blocked_until = max(self.blocked_until, now + self.penalty_sec)
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+def simulate_proxy(policy, steam: SteamLimit, fail_rate: float, latency_sec: float, duration_sec: float,
+                   rng: random.Random) -> Dict[str, int]:
+    proxy = Proxy("10.0.0.1", 8080, "http")
+    counts = {"ok": 0, "rate_limited": 0, "failed": 0}
+    now = 0.0
+    while now < duration_sec:
+        cooldown_until = policy.take(proxy, now)
+        sent_at, now = now, now + latency_sec
+        if rng.random() < fail_rate:
+            counts["failed"] += 1
+            proxy.mark_failed()
+            cooldown_until = max(cooldown_until or 0.0, policy.on_failure(proxy, now))
+        elif not steam.allow(sent_at):
+            counts["rate_limited"] += 1
+            if policy.is_rate_limited(429):
+                cooldown_until = max(cooldown_until or 0.0, policy.on_rate_limited(proxy, now))
+            else:
+                proxy.mark_failed()
+                cooldown_until = max(cooldown_until or 0.0, policy.on_failure(proxy, now))
+        else:
+            counts["ok"] += 1
+            proxy.reset_failures()
+            cooldown_until = max(cooldown_until or 0.0, policy.on_success(proxy, now) or 0.0)
+        now = max(now, cooldown_until or 0.0)
+    return counts
+
+
+def run(name: str, policy, args) -> dict:
+    rng = random.Random(args.seed)
+    totals = {"ok": 0, "rate_limited": 0, "failed": 0}
+    sigma = args.steam_rate_spread
+    for i in range(args.proxies):
+        steam_rate = WINDOW_RATE * args.steam_rate_factor * rng.lognormvariate(-sigma * sigma / 2, sigma)
+        steam = SteamLimit(steam_rate, args.steam_burst, args.steam_penalty_sec)
+        fail_rate = args.broken_fail_rate if rng.random() < args.broken else 0.0
+        counts = simulate_proxy(policy, steam, fail_rate, args.latency_ms / 1000, args.duration, rng)
+        for outcome, count in counts.items():
+            totals[outcome] += count
+    sent = sum(totals.values())
+    return {
+        "policy": name,
+        "requests": sent,
+        "ok": totals["ok"],
+        "ok_per_proxy_per_min": round(totals["ok"] / args.proxies / (args.duration / 60), 3),
+        "rate_limited_ratio": round(totals["rate_limited"] / sent, 4) if sent else 0.0,
+        "failed_ratio": round(totals["failed"] / sent, 4) if sent else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proxies", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=3600.0, help="Segundos (virtuais) simulados.")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Duração de cada pedido.")
+    parser.add_argument("--steam-rate-factor", type=float, default=2.0,
+                        help="Taxa mediana que a Steam aceita por IP, em múltiplos da taxa média da janela antiga.")
+    parser.add_argument("--steam-rate-spread", type=float, default=0.5, help="Sigma (log-normal) da taxa por IP.")
+    parser.add_argument("--steam-burst", type=float, default=REQUESTS_PER_PROXY, help="Rajada aceite pela Steam por IP.")
+    parser.add_argument("--steam-penalty-sec", type=float, default=300.0, help="Tempo a responder 429 depois de um 429.")
+    parser.add_argument("--broken", type=float, default=0.1, help="Fração dos proxies avariados de forma intermitente.")
+    parser.add_argument("--broken-fail-rate", type=float, default=0.5, help="Probabilidade de falha desses proxies.")
+    parser.add_argument("--burst", type=float, default=PROXY_RATE_BURST, help="Capacidade do balde (PROXY_RATE_BURST).")
+    parser.add_argument("--rate-max-factor", type=float, default=PROXY_RATE_MAX / PROXY_RATE_INITIAL,
+                        help="PROXY_RATE_MAX em múltiplos de PROXY_RATE_INITIAL.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Imprimir os resultados em JSON.")
+    args = parser.parse_args()
+
+    learned = LearnedPolicy(args.burst, min(PROXY_RATE_INITIAL_TOKENS, args.burst), PROXY_RATE_INITIAL, PROXY_RATE_MIN,
+                            PROXY_RATE_INITIAL * args.rate_max_factor, PROXY_RATE_INCREASE, PROXY_RATE_DECREASE_FACTOR, PROXY_RATE_LIMIT_STATUS,
+                            PROXY_RATE_LIMITED_COOLDOWN_SEC, PROXY_FAILURE_COOLDOWN_SEC, PROXY_COOLDOWN_MAX_SEC)
+    results: List[dict] = [run("fixed", FixedWindowPolicy(), args), run("learned", learned, args)]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = list(results[0])
+    print("  ".join(f"{c:>20}" for c in columns))
+    for row in results:
+        print("  ".join(f"{str(row[c]):>20}" for c in columns))
+    if results[0]["ok"]:
+        print(f"Ganho do learned: {(results[1]['ok'] / results[0]['ok'] - 1) * 100:+.1f}% pedidos com sucesso")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# proxy_steam_manager/benchmarks/bench_revalidation.py
+
+"""
+Revalidação ativa do serviço (revalidator.py) contra uma Steam e uma frota de
+proxies falsas (ver fakes.py), sem rede.
+
+O pool recebe os proxies da frota (uma fração limitada pela Steam, que lhes
+responde 429) e --dead proxies em portos onde não há nada à escuta. Todos são
+reportados com falhas seguidas suficientes para a sonda ser imediata e para
+uma sonda falhada os retirar do pool; depois corre o ProxyRevalidator até não
+haver sondas na hora. No fim compara-se o estado de cada proxy com o esperado:
+os saudáveis voltam ao pool, os limitados ficam em cooldown e os mortos saem.
+
+Uso:
+    python benchmarks/bench_revalidation.py --http 300 --socks5 100 --dead 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fakes import fleet_endpoints, start_fake_steam, start_proxy_fleet, stop_fleet, wait_for_port  # noqa: E402
+import proxy_manager_service as service  # noqa: E402
+from async_logger import ERROR  # noqa: E402
+from revalidator import ProxyRevalidator  # noqa: E402
+
+HOST = "127.0.0.1"
+
+# Silenciar os registos do pool (falhas, cooldowns), que não interessam aqui
+service.logger.level = ERROR + 1
+
+
+def expected_state(port: int, limited: set, dead: set) -> str:
+    if port in dead:
+        return "evicted"
+    return "cooldown" if port in limited else "ready"
+
+
+async def revalidate(pool, args, validation_url: str) -> float:
+    revalidator = ProxyRevalidator(validation_url, service.CHECKER_VALIDATION_TEXT, service.CHECKER_HEADERS,
+                                   args.concurrency, args.timeout, 0.01)
+    async with revalidator:
+        started = time.perf_counter()
+        task = asyncio.create_task(revalidator.run(pool))
+        # Acaba quando não há sondas na hora nem em curso (as falhadas ficam agendadas para mais tarde)
+        while pool._probing or (pool._probe_heap and pool._probe_heap[0][0] <= time.monotonic()):
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--http", type=int, default=300, help="Proxies HTTP falsos.")
+    parser.add_argument("--socks4", type=int, default=0, help="Proxies SOCKS4 falsos.")
+    parser.add_argument("--socks5", type=int, default=100, help="Proxies SOCKS5 falsos.")
+    parser.add_argument("--dead", type=int, default=200, help="Proxies em portos sem nada à escuta.")
+    parser.add_argument("--rate-limited", type=float, default=0.1, help="Fração da frota a que a Steam responde 429.")
+    parser.add_argument("--base-port", type=int, default=22000, help="Primeiro porto da frota.")
+    parser.add_argument("--steam-port", type=int, default=21999)
+    parser.add_argument("--fleet-processes", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latência média de cada proxy falso.")
+    parser.add_argument("--concurrency", type=int, default=service.SERVICE_REVALIDATION_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=service.SERVICE_REVALIDATION_TIMEOUT_SEC)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Imprimir o resultado em JSON.")
+    args = parser.parse_args()
+
+    counts = {"http": args.http, "socks4": args.socks4, "socks5": args.socks5}
+    endpoints = fleet_endpoints(args.base_port, counts)
+    first_dead = args.base_port + len(endpoints)
+    dead_endpoints = [(first_dead + i, "http" if i % 2 else "socks5") for i in range(args.dead)]
+    dead = {port for port, _ in dead_endpoints}
+
+    steam = start_fake_steam(HOST, args.steam_port)
+    fleet, limited = start_proxy_fleet(HOST, args.base_port, counts, args.fleet_processes,
+                                       args.latency_ms / 1000, 0.0, args.rate_limited, args.seed)
+    try:
+        wait_for_port(HOST, args.steam_port)
+        for port, _ in endpoints[-args.fleet_processes:]:  # O último porto de cada processo
+            wait_for_port(HOST, port, 30.0)
+        with tempfile.TemporaryDirectory() as tmp:
+            data_file = os.path.join(tmp, "steam_live.txt")
+            with open(data_file, "w", encoding="utf-8") as f:
+                f.writelines(f"{protocol}://{HOST}:{port}\n" for port, protocol in endpoints + dead_endpoints)
+            pool = service.ProxyPool(data_file)
+        pool.revalidate = True
+        # Falhas seguidas: a sonda é imediata e, se falhar, o proxy sai do pool
+        failures = max(service.SERVICE_REVALIDATION_FAILURES, service.SERVICE_REVALIDATION_EVICT_FAILURES - 1)
+        for key in list(pool.proxies):
+            for _ in range(failures):
+                pool.report_proxy_usage(key, False)
+        validation_url = f"http://{HOST}:{args.steam_port}/market/search/render/?query=&start=10&count=10"
+        elapsed = asyncio.run(revalidate(pool, args, validation_url))
+    finally:
+        stop_fleet(fleet + [steam])
+
+    outcomes = Counter()
+    wrong = Counter()
+    latencies = []
+    for port, protocol in endpoints + dead_endpoints:
+        proxy = pool.proxies.get(f"{HOST}:{port}:{protocol}")
+        if proxy is None:
+            state = "evicted"
+        elif proxy.key in pool._ready_pos:
+            state = "ready"
+            latencies.append(proxy.latency)
+        else:
+            state = "cooldown"
+        outcomes[state] += 1
+        expected = expected_state(port, limited, dead)
+        if state != expected:
+            wrong[f"{expected}->{state}"] += 1
+
+    total = len(endpoints) + len(dead_endpoints)
+    result = {
+        "proxies": total,
+        "concurrency": args.concurrency,
+        "elapsed_sec": round(elapsed, 3),
+        "probes_per_sec": round(total / elapsed, 1) if elapsed else None,
+        "states": dict(outcomes),
+        "unexpected": dict(wrong),
+        "released_latency_mean_ms": round(sum(latencies) / len(latencies), 1) if latencies else None,
+    }
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"{total} proxies ({len(limited)} com 429, {len(dead)} mortos), {args.concurrency} sondas em simultâneo: "
+          f"{result['elapsed_sec']}s ({result['probes_per_sec']} sondas/s)")
+    print(f"  estado final: {result['states']}; latência média dos libertados: {result['released_latency_mean_ms']} ms")
+    print(f"  inesperados: {result['unexpected'] or 'nenhum'}")
+
+
+if __name__ == "__main__":
+    main()
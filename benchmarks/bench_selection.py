@@ -0,0 +1,197 @@
+# proxy_steam_manager/benchmarks/bench_selection.py
+
+"""
+Compara as estratégias de seleção do ProxyPool repetindo um trace de
+acquire/report.
+
+O trace é um ficheiro JSONL com eventos:
+    {"op": "acquire", "session_id": "job-1", "proxy_key": "1.2.3.4:80:http"}
+    {"op": "report", "proxy_key": "1.2.3.4:80:http", "success": true, "latency_ms": 312.5}
+
+Dos eventos "report" constrói-se o comportamento observado de cada proxy
+(latência e sucesso); os eventos "acquire" são repetidos por ordem contra cada
+estratégia e cada pedido servido recebe um resultado sorteado do histórico do
+proxy escolhido. Sem --trace é gerado um trace sintético (e gravado com --record).
+
+Uso:
+    python benchmarks/bench_selection.py --proxies 2000 --sessions 500 --requests 40
+    python benchmarks/bench_selection.py --trace trace.jsonl --json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import proxy_manager_service as service
+from async_logger import ERROR
+from selection import STRATEGIES
+
+# Silenciar os registos do pool (cooldowns, rotações), que não interessam aqui
+service.logger.level = ERROR + 1
+
+
+def generate_trace(n_proxies: int, n_sessions: int, requests_per_session: int, seed: int) -> List[dict]:
+    """Trace sintético: proxies com latências log-normais e taxas de falha variadas."""
+    rng = random.Random(seed)
+    profiles = {}
+    for i in range(n_proxies):
+        key = f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}:8080:http"
+        profiles[key] = (rng.lognormvariate(5.7, 0.8), rng.random() ** 3 * 0.6)
+    keys = list(profiles)
+    pending = [[f"job-{s}", requests_per_session] for s in range(n_sessions)]
+    events = []
+    while pending:
+        idx = rng.randrange(len(pending))
+        session = pending[idx]
+        key = rng.choice(keys)
+        median_latency, failure_rate = profiles[key]
+        events.append({"op": "acquire", "session_id": session[0], "proxy_key": key})
+        events.append({
+            "op": "report",
+            "proxy_key": key,
+            "success": rng.random() >= failure_rate,
+            "latency_ms": round(median_latency * rng.lognormvariate(0, 0.3), 1),
+        })
+        session[1] -= 1
+        if session[1] == 0:
+            pending[idx] = pending[-1]
+            pending.pop()
+    return events
+
+
+def load_trace(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_outcome_model(events: List[dict]) -> Dict[str, List[Tuple[bool, float]]]:
+    outcomes: Dict[str, List[Tuple[bool, float]]] = defaultdict(list)
+    for event in events:
+        if event["op"] == "report":
+            outcomes[event["proxy_key"]].append((bool(event["success"]), event.get("latency_ms") or 0.0))
+        elif event["op"] == "acquire" and event.get("proxy_key"):
+            outcomes.setdefault(event["proxy_key"], [])
+    return outcomes
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def replay(strategy: str, events: List[dict], outcomes: Dict[str, List[Tuple[bool, float]]],
+           data_file: str, concurrency: int, cooldown: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    pool = service.ProxyPool(data_file, strategy=strategy)
+    pool._rng.seed(seed)
+    policy = pool.rate_limit
+    policy.failure_sec = policy.max_cooldown_sec = cooldown
+    if not cooldown:
+        policy.capacity = policy.initial_tokens = float("inf")  # Sem cooldowns, também sem limite de pedidos por proxy
+
+    in_flight = deque()
+    usage = Counter()
+    latencies = []
+    successes = unavailable = 0
+    acquire_time = 0.0
+
+    def finish_oldest():
+        nonlocal successes
+        key, success, latency = in_flight.popleft()
+        pool.report_proxy_usage(key, success, latency)
+        if success:
+            successes += 1
+            latencies.append(latency)
+
+    for event in events:
+        if event["op"] != "acquire":
+            continue
+        started = time.perf_counter()
+        proxy = pool.get_proxy(event["session_id"])
+        acquire_time += time.perf_counter() - started
+        if proxy is None:
+            unavailable += 1
+            continue
+        key = f"{proxy.ip}:{proxy.port}:{proxy.protocol}"
+        usage[key] += 1
+        history = outcomes.get(key) or [(True, 1000.0)]
+        success, latency = rng.choice(history)
+        in_flight.append((key, success, latency))
+        if len(in_flight) >= concurrency:
+            finish_oldest()
+    while in_flight:
+        finish_oldest()
+
+    served = sum(usage.values())
+    counts = list(usage.values()) + [0] * (len(outcomes) - len(usage))
+    mean_usage = statistics.mean(counts) if counts else 0.0
+    return {
+        "strategy": strategy,
+        "served": served,
+        "unavailable": unavailable,
+        "success_ratio": round(successes / served, 4) if served else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50), 1),
+        "latency_p99_ms": round(percentile(latencies, 99), 1),
+        "latency_mean_ms": round(statistics.mean(latencies), 1) if latencies else 0.0,
+        "proxies_used": len(usage),
+        "usage_max_over_mean": round(max(counts) / mean_usage, 2) if mean_usage else 0.0,
+        "acquire_us": round(acquire_time / max(served + unavailable, 1) * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace", help="Trace JSONL gravado (acquire/report).")
+    parser.add_argument("--record", help="Gravar o trace sintético neste ficheiro.")
+    parser.add_argument("--proxies", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=40, help="Pedidos por sessão no trace sintético.")
+    parser.add_argument("--concurrency", type=int, default=64, help="Pedidos em curso antes de cada report.")
+    parser.add_argument("--cooldown", type=float, default=0,
+                        help="Cooldown (s) das falhas na repetição; com 0 também não há limite de pedidos por proxy.")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Imprimir os resultados em JSON.")
+    args = parser.parse_args()
+
+    if args.trace:
+        events = load_trace(args.trace)
+    else:
+        events = generate_trace(args.proxies, args.sessions, args.requests, args.seed)
+        if args.record:
+            with open(args.record, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(event) + "\n" for event in events)
+
+    outcomes = build_outcome_model(events)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, "steam_live.txt")
+        with open(data_file, "w", encoding="utf-8") as f:
+            for key in outcomes:
+                ip, port, protocol = key.rsplit(":", 2)
+                f.write(f"{protocol}://{ip}:{port}\n")
+        results = [replay(name, events, outcomes, data_file, args.concurrency, args.cooldown, args.seed)
+                   for name in args.strategies.split(",")]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    columns = list(results[0])
+    print("  ".join(f"{c:>18}" for c in columns))
+    for row in results:
+        print("  ".join(f"{str(row[c]):>18}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
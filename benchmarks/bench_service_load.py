@@ -0,0 +1,228 @@
+# proxy_steam_manager/benchmarks/bench_service_load.py
+
+"""
+Teste de carga do serviço: muitos clientes concorrentes a fazer acquire/report
+contra um uvicorn local, com recarregamentos frequentes do ficheiro de proxies
+a correr em simultâneo. Mede a latência (p50/p90/p99/máx) de cada endpoint.
+
+O servidor é arrancado num subprocesso a partir de --repo (por omissão, este
+repositório), o que permite comparar duas versões do serviço:
+    git worktree add /tmp/antes <commit>
+    python benchmarks/bench_service_load.py --repo /tmp/antes
+    python benchmarks/bench_service_load.py
+
+Com --workers N > 1 o serviço arranca com N workers e o coordenador do pool.
+Com --url usa um serviço já em execução (e não arranca nenhum). Com --batch N
+cada cliente usa /acquire_proxies e /report_proxy_usage/batch com N sessões
+por pedido, em vez de um par acquire/report por sessão.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import aiohttp
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Arranca o serviço de `repo` com o ficheiro de dados e o intervalo de reload do benchmark
+SERVER_CODE = """
+import sys
+repo, data_file, port, reload_interval = sys.argv[1:5]
+sys.path.insert(0, repo)
+import proxy_manager_service as service
+service.DATA_FILE = data_file
+service.RELOAD_INTERVAL_SECONDS = float(reload_interval)
+if getattr(service, "proxy_pool", None) is not None:
+    # Versões em que o pool é criado ao importar o módulo
+    service.proxy_pool.data_file = data_file
+    service.proxy_pool.load_proxies()
+import uvicorn
+uvicorn.run(service.app, host="127.0.0.1", port=int(port), log_level="warning", access_log=False)
+"""
+
+
+def write_proxy_file(path: str, n_proxies: int):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n_proxies):
+            f.write(f"http://10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}:8080\n")
+
+
+def start_server(repo: str, data_file: str, port: int, reload_interval: float, workdir: str,
+                 workers: int = 1) -> subprocess.Popen:
+    if workers > 1:
+        # Coordenador + workers, arrancados pelo próprio serviço (o intervalo de reload é o do serviço)
+        command = [sys.executable, os.path.join(repo, "proxy_manager_service.py"), "--host", "127.0.0.1",
+                   "--port", str(port), "--workers", str(workers), "--data-file", data_file,
+                   "--coordinator-address", os.path.join(workdir, "proxy_pool.sock")]
+    else:
+        command = [sys.executable, "-c", SERVER_CODE, repo, data_file, str(port), str(reload_interval)]
+    return subprocess.Popen(command, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_healthy(session: aiohttp.ClientSession, url: str, timeout_sec: float = 30.0):
+    deadline = time.monotonic() + timeout_sec
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{url}/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"O serviço em {url} não respondeu em {timeout_sec:.0f}s")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {"count": 0}
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p90_ms": round(percentile(latencies, 90), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+    }
+
+
+async def run_load(url: str, concurrency: int, n_requests: int, n_sessions: int, fail_rate: float, seed: int,
+                   batch: int = 1) -> dict:
+    rng = random.Random(seed)
+    latencies: Dict[str, List[float]] = {"acquire": [], "report": []}
+    counters = {"unavailable": 0, "errors": 0}
+    remaining = n_requests
+    served = 0
+
+    def make_report(proxy_key: str) -> dict:
+        return {"proxy_key": proxy_key, "success": rng.random() >= fail_rate, "latency_ms": rng.lognormvariate(5.5, 0.5)}
+
+    async def batch_client(session: aiohttp.ClientSession):
+        nonlocal remaining, served
+        while remaining > 0:
+            size = min(batch, remaining)
+            remaining -= size
+            session_ids = [f"job-{rng.randrange(n_sessions)}" for _ in range(size)]
+            try:
+                started = time.perf_counter()
+                async with session.post(f"{url}/acquire_proxies", json={"session_ids": session_ids}) as response:
+                    body = await response.json()
+                latencies["acquire"].append((time.perf_counter() - started) * 1000.0)
+                if response.status != 200:
+                    counters["unavailable"] += size
+                    continue
+                counters["unavailable"] += len(body["unavailable"])
+                served += len(body["proxies"])
+                reports = [make_report(item["proxy_key"]) for item in body["proxies"]]
+                started = time.perf_counter()
+                async with session.post(f"{url}/report_proxy_usage/batch", json={"reports": reports}) as response:
+                    await response.read()
+                latencies["report"].append((time.perf_counter() - started) * 1000.0)
+            except aiohttp.ClientError:
+                counters["errors"] += 1
+
+    async def client(session: aiohttp.ClientSession):
+        nonlocal remaining, served
+        while remaining > 0:
+            remaining -= 1
+            session_id = f"job-{rng.randrange(n_sessions)}"
+            try:
+                started = time.perf_counter()
+                async with session.get(f"{url}/acquire_proxy", params={"session_id": session_id}) as response:
+                    body = await response.json()
+                latencies["acquire"].append((time.perf_counter() - started) * 1000.0)
+                if response.status != 200:
+                    counters["unavailable"] += 1
+                    continue
+                served += 1
+                report = make_report(body["proxy_key"])
+                started = time.perf_counter()
+                async with session.post(f"{url}/report_proxy_usage", json=report) as response:
+                    await response.read()
+                latencies["report"].append((time.perf_counter() - started) * 1000.0)
+            except aiohttp.ClientError:
+                counters["errors"] += 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await wait_healthy(session, url)
+        started = time.perf_counter()
+        worker = batch_client if batch > 1 else client
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "batch": batch,
+        "elapsed_sec": round(elapsed, 2),
+        "proxies_per_sec": round(served / elapsed, 1),
+        "acquire": summarize(latencies["acquire"]),
+        "report": summarize(latencies["report"]),
+        **counters,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo", default=REPO_DIR, help="Diretório de onde é importado proxy_manager_service.")
+    parser.add_argument("--url", help="Usar um serviço já em execução em vez de arrancar um.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--proxies", type=int, default=20000, help="Proxies no ficheiro de dados.")
+    parser.add_argument("--reload-interval", type=float, default=1.0,
+                        help="RELOAD_INTERVAL_SECONDS do servidor (só com um worker).")
+    parser.add_argument("--workers", type=int, default=1, help="Workers do uvicorn (com coordenador se > 1).")
+    parser.add_argument("--concurrency", type=int, default=500, help="Clientes em simultâneo.")
+    parser.add_argument("--requests", type=int, default=20000, help="Total de pares acquire/report.")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=1, help="Sessões por pedido (usa os endpoints em lote se > 1).")
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Imprimir o resultado em JSON.")
+    args = parser.parse_args()
+
+    server = None
+    with tempfile.TemporaryDirectory() as workdir:
+        url = args.url
+        if not url:
+            data_file = os.path.join(workdir, "steam_live.txt")
+            write_proxy_file(data_file, args.proxies)
+            server = start_server(os.path.abspath(args.repo), data_file, args.port, args.reload_interval, workdir,
+                                  args.workers)
+            url = f"http://127.0.0.1:{args.port}"
+        try:
+            result = asyncio.run(run_load(url, args.concurrency, args.requests, args.sessions, args.fail_rate, args.seed, args.batch))
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+    result["repo"] = args.url or os.path.abspath(args.repo)
+    result["workers"] = args.workers
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"Serviço: {result['repo']} ({result['workers']} worker(s))")
+    print(f"{result['requests']} pares acquire/report, {result['concurrency']} clientes, lote {result['batch']}, "
+          f"{result['elapsed_sec']}s ({result['proxies_per_sec']} proxies/s); "
+          f"503: {result['unavailable']}, erros: {result['errors']}")
+    for op in ("acquire", "report"):
+        stats = result[op]
+        if stats["count"]:
+            print(f"  {op:>8}: p50={stats['p50_ms']:8.2f}  p90={stats['p90_ms']:8.2f}  "
+                  f"p99={stats['p99_ms']:8.2f}  máx={stats['max_ms']:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
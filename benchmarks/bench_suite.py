@@ -0,0 +1,227 @@
+# proxy_steam_manager/benchmarks/bench_suite.py
+
+"""
+Benchmark de ponta a ponta sem rede: arranca um endpoint
+/market/search/render/ falso e uma frota de proxies HTTP/SOCKS4/SOCKS5 falsos
+(ver fakes.py), corre uma ronda de check_steam_proxies.py contra eles e depois
+um teste de carga de proxy_manager_service.py (ver bench_service_load.py) com
+os proxies que o checker validou.
+
+O resultado (proxies/s do checker, acquires/s do serviço e percentis de
+latência de ambos) sai em JSON, com o commit e os parâmetros usados, para ser
+guardado e comparado com o de outro commit:
+    python benchmarks/bench_suite.py --output antes.json
+    git checkout <outro commit>
+    python benchmarks/bench_suite.py --compare antes.json
+
+--checker-concurrency e --checker-timeout substituem CHECKER_CONCURRENCY e
+CHECKER_TIMEOUT_SEC, para afinar esses valores sem a Steam nem proxies reais.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_service_load import REPO_DIR, run_load, start_server, summarize, write_proxy_file  # noqa: E402
+from fakes import fleet_endpoints, start_fake_steam, start_proxy_fleet, stop_fleet, wait_for_port  # noqa: E402
+
+HOST = "127.0.0.1"
+
+# (métrica, maior é melhor) comparadas por --compare
+COMPARED_METRICS = (
+    ("checker.proxies_per_sec", True),
+    ("checker.latency.p50_ms", False),
+    ("checker.latency.p99_ms", False),
+    ("service.acquires_per_sec", True),
+    ("service.acquire.p50_ms", False),
+    ("service.acquire.p90_ms", False),
+    ("service.acquire.p99_ms", False),
+    ("service.report.p99_ms", False),
+)
+
+
+def git_info(repo: str) -> dict:
+    def git(*args) -> str:
+        return subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or None, "subject": git("log", "-1", "--format=%s") or None,
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def run_checker(repo: str, workdir: str, input_file: str, validation_url: str, workers: int,
+                concurrency: Optional[int], timeout_sec: Optional[float]) -> dict:
+    output_file = os.path.join(workdir, "steam_live.txt")
+    results_file = os.path.join(workdir, "steam_live_results.jsonl")
+    command = [sys.executable, os.path.join(repo, "check_steam_proxies.py"), "--once", "--workers", str(workers),
+               "--input", input_file, "--output", output_file, "--results", results_file,
+               "--history", os.path.join(workdir, "steam_check_history.json"), "--validation-url", validation_url]
+    if concurrency is not None:
+        command += ["--concurrency", str(concurrency)]
+    if timeout_sec is not None:
+        command += ["--timeout", str(timeout_sec)]
+    started = time.perf_counter()
+    subprocess.run(command, cwd=workdir, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - started
+
+    outcomes: Counter = Counter()
+    latencies: List[float] = []
+    if os.path.exists(results_file):
+        with open(results_file, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                outcomes[record["outcome"]] += 1
+                if record["ok"] and "total_ms" in record:
+                    latencies.append(record["total_ms"])
+    valid = 0
+    if os.path.exists(output_file):
+        with open(output_file, "r", encoding="utf-8") as f:
+            valid = sum(1 for line in f if line.strip())
+    return {"elapsed_sec": round(elapsed, 3), "valid": valid, "outcomes": dict(outcomes),
+            "latency": summarize(latencies), "output_file": output_file}
+
+
+def get_path(result: dict, path: str) -> Optional[float]:
+    for name in path.split("."):
+        if not isinstance(result, dict) or name not in result:
+            return None
+        result = result[name]
+    return result
+
+
+def compare(previous: dict, current: dict) -> List[dict]:
+    rows = []
+    for path, higher_is_better in COMPARED_METRICS:
+        before, after = get_path(previous, path), get_path(current, path)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100.0 if before else None
+        better = None if change is None else (change > 0) == higher_is_better
+        rows.append({"metric": path, "before": before, "after": after,
+                     "change_pct": None if change is None else round(change, 1), "better": better})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo", default=REPO_DIR, help="Diretório de onde são corridos o checker e o serviço.")
+    parser.add_argument("--http", type=int, default=1000, help="Proxies HTTP falsos.")
+    parser.add_argument("--socks4", type=int, default=500, help="Proxies SOCKS4 falsos.")
+    parser.add_argument("--socks5", type=int, default=500, help="Proxies SOCKS5 falsos.")
+    parser.add_argument("--base-port", type=int, default=21000, help="Primeiro porto da frota.")
+    parser.add_argument("--steam-port", type=int, default=20999)
+    parser.add_argument("--fleet-processes", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latência média de cada proxy falso.")
+    parser.add_argument("--steam-latency-ms", type=float, default=10.0, help="Latência média da Steam falsa.")
+    parser.add_argument("--drop-rate", type=float, default=0.05, help="Fração das ligações cortadas sem resposta "
+                        "(o aiohttp repete uma vez um GET cortado, por isso falham ~drop_rate² das verificações).")
+    parser.add_argument("--rate-limited", type=float, default=0.1, help="Fração dos proxies a que a Steam responde 429.")
+    parser.add_argument("--checker-workers", type=int, default=1)
+    parser.add_argument("--checker-concurrency", type=int, help="Substitui CHECKER_CONCURRENCY.")
+    parser.add_argument("--checker-timeout", type=float, help="Substitui CHECKER_TIMEOUT_SEC.")
+    parser.add_argument("--service-port", type=int, default=8766)
+    parser.add_argument("--concurrency", type=int, default=200, help="Clientes do serviço em simultâneo.")
+    parser.add_argument("--requests", type=int, default=10000, help="Total de pares acquire/report.")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip-checker", action="store_true")
+    parser.add_argument("--skip-service", action="store_true")
+    parser.add_argument("--output", help="Gravar o resultado (JSON) neste ficheiro.")
+    parser.add_argument("--compare", help="Resultado anterior (JSON) com que comparar este.")
+    parser.add_argument("--json", action="store_true", help="Imprimir o resultado em JSON.")
+    args = parser.parse_args()
+
+    repo = os.path.abspath(args.repo)
+    counts = {"http": args.http, "socks4": args.socks4, "socks5": args.socks5}
+    params = {name: value for name, value in vars(args).items() if name not in ("repo", "output", "compare", "json")}
+    result: Dict[str, object] = {"git": git_info(repo), "timestamp": round(time.time()), "params": params}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        data_file = None
+        if not args.skip_checker:
+            endpoints = fleet_endpoints(args.base_port, counts)
+            steam = start_fake_steam(HOST, args.steam_port, args.steam_latency_ms / 1000)
+            fleet, limited = start_proxy_fleet(HOST, args.base_port, counts, args.fleet_processes,
+                                               args.latency_ms / 1000, args.drop_rate, args.rate_limited, args.seed)
+            try:
+                wait_for_port(HOST, args.steam_port)
+                for port, _ in endpoints[-args.fleet_processes:]:  # O último porto de cada processo
+                    wait_for_port(HOST, port, 30.0)
+                input_file = os.path.join(workdir, "live.txt")
+                with open(input_file, "w", encoding="utf-8") as f:
+                    f.writelines(f"{protocol}://{HOST}:{port}\n" for port, protocol in endpoints)
+                validation_url = f"http://{HOST}:{args.steam_port}/market/search/render/?query=&start=10&count=10"
+                checker = run_checker(repo, workdir, input_file, validation_url, args.checker_workers,
+                                      args.checker_concurrency, args.checker_timeout)
+            finally:
+                stop_fleet(fleet + [steam])
+            data_file = checker.pop("output_file")
+            checker["proxies"] = len(endpoints)
+            checker["rate_limited"] = len(limited)
+            checker["proxies_per_sec"] = round(len(endpoints) / checker["elapsed_sec"], 1)
+            result["checker"] = checker
+
+        if not args.skip_service:
+            # O serviço serve os proxies que o checker validou (ou proxies gerados, se não houver)
+            if data_file is None or not result["checker"]["valid"]:
+                data_file = os.path.join(workdir, "steam_live.txt")
+                write_proxy_file(data_file, max(1, args.http + args.socks4 + args.socks5))
+            server = start_server(repo, data_file, args.service_port, 1.0, workdir)
+            try:
+                service = asyncio.run(run_load(f"http://{HOST}:{args.service_port}", args.concurrency, args.requests,
+                                               args.sessions, args.fail_rate, args.seed))
+            finally:
+                server.terminate()
+                server.wait()
+            service["acquires_per_sec"] = round(service["acquire"]["count"] / service["elapsed_sec"], 1)
+            result["service"] = service
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        result["compare"] = {"against": previous.get("git", {}).get("commit"), "metrics": compare(previous, result)}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({name: value for name, value in result.items() if name != "compare"}, f, indent=2)
+
+    if args.json:
+        print(json.dumps(result))
+        return
+    git = result["git"]
+    print(f"Commit: {git['commit'] or '?'}{' (com alterações)' if git['dirty'] else ''}  {git['subject'] or ''}")
+    if "checker" in result:
+        checker = result["checker"]
+        latency = checker["latency"]
+        print(f"Checker: {checker['proxies']} proxies em {checker['elapsed_sec']}s ({checker['proxies_per_sec']} proxies/s), "
+              f"{checker['valid']} válidos, {checker['rate_limited']} com 429; resultados: {checker['outcomes']}")
+        if latency["count"]:
+            print(f"  latência: p50={latency['p50_ms']:8.2f}  p90={latency['p90_ms']:8.2f}  "
+                  f"p99={latency['p99_ms']:8.2f}  máx={latency['max_ms']:8.2f} ms")
+    if "service" in result:
+        service = result["service"]
+        print(f"Serviço: {service['requests']} pares acquire/report, {service['concurrency']} clientes, "
+              f"{service['elapsed_sec']}s ({service['acquires_per_sec']} acquires/s); "
+              f"503: {service['unavailable']}, erros: {service['errors']}")
+        for op in ("acquire", "report"):
+            stats = service[op]
+            if stats["count"]:
+                print(f"  {op:>8}: p50={stats['p50_ms']:8.2f}  p90={stats['p90_ms']:8.2f}  "
+                      f"p99={stats['p99_ms']:8.2f}  máx={stats['max_ms']:8.2f} ms")
+    if "compare" in result:
+        print(f"Comparação com {result['compare']['against'] or '?'}:")
+        for row in result["compare"]["metrics"]:
+            change = "" if row["change_pct"] is None else f"{row['change_pct']:+7.1f}%"
+            mark = {True: "melhor", False: "pior", None: ""}[row["better"]]
+            print(f"  {row['metric']:<28} {row['before']:>10} -> {row['after']:>10} {change:>9} {mark}")
+
+
+if __name__ == "__main__":
+    main()
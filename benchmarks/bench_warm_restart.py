@@ -0,0 +1,117 @@
+# proxy_steam_manager/benchmarks/bench_warm_restart.py
+
+"""
+Mede o custo de gravar e repor o estado do ProxyPool (pool_state.py): fotografia,
+lotes do journal e o arranque "a quente" (ler fotografia + journal e repor).
+
+Todos os proxies recebem relatórios antes da fotografia (o pior caso: nenhum
+fica no estado inicial) e uma fração volta a recebê-los depois, para o journal.
+
+Uso:
+    python benchmarks/bench_warm_restart.py --proxies 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import proxy_manager_service as service  # noqa: E402
+from async_logger import ERROR  # noqa: E402
+from pool_state import PoolStateStore  # noqa: E402
+
+
+def write_proxy_file(path: str, n_proxies: int):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n_proxies):
+            f.write(f"http://10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}:8080\n")
+
+
+def exercise(pool: service.ProxyPool, n_reports: int, fail_every: int):
+    for i in range(n_reports):
+        proxy = pool.get_proxy(f"job-{i}")
+        if proxy is None:
+            break
+        pool.report_proxy_usage(proxy.key, i % fail_every != 0, 250.0)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, round((time.perf_counter() - started) * 1000.0, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proxies", type=int, default=100000)
+    parser.add_argument("--journal-fraction", type=float, default=0.2,
+                        help="Relatórios depois da fotografia, em fração do número de proxies.")
+    parser.add_argument("--journal-batches", type=int, default=20, help="Lotes do journal em que se dividem.")
+    parser.add_argument("--fail-every", type=int, default=3, help="Um relatório em cada N é uma falha (cooldown).")
+    parser.add_argument("--json", action="store_true", help="Imprimir o resultado em JSON.")
+    args = parser.parse_args()
+
+    service.logger.level = ERROR + 1  # Sem registos na consola durante a medição
+
+    with tempfile.TemporaryDirectory() as workdir:
+        data_file = os.path.join(workdir, "steam_live.txt")
+        write_proxy_file(data_file, args.proxies)
+        store = PoolStateStore(os.path.join(workdir, "pool_state.json"), os.path.join(workdir, "pool_state.journal"))
+
+        pool = service.ProxyPool(data_file)
+        exercise(pool, args.proxies, args.fail_every)
+        # Em funcionamento normal as alterações vão para o journal a cada segundo,
+        # por isso a fotografia encontra poucas pendentes
+        first_batch, take_ms = timed(pool.take_state_changes)
+        store.append_journal(first_batch)
+        state, export_ms = timed(pool.export_state)
+        _, snapshot_ms = timed(store.write_snapshot, state)
+
+        per_batch = max(1, int(args.proxies * args.journal_fraction) // args.journal_batches)
+        journal_ms = 0.0
+        for _ in range(args.journal_batches):
+            exercise(pool, per_batch, args.fail_every)
+            changes = pool.take_state_changes()
+            _, elapsed = timed(store.append_journal, changes)
+            journal_ms += elapsed
+        expected = pool.get_metrics()
+
+        # Arranque: ler o ficheiro de proxies, depois o estado gravado, e repor
+        started = time.perf_counter()
+        restarted = service.ProxyPool(data_file)
+        load_file_ms = round((time.perf_counter() - started) * 1000.0, 1)
+        loaded, load_state_ms = timed(PoolStateStore(store.snapshot_path, store.journal_path).load)
+        _, restore_ms = timed(restarted.restore_state, loaded)
+        metrics = restarted.get_metrics()
+
+        result = {
+            "proxies": args.proxies,
+            "snapshot_bytes": os.path.getsize(store.snapshot_path),
+            "journal_bytes": os.path.getsize(store.journal_path),
+            "first_batch_take_ms": take_ms,
+            "export_ms": export_ms,
+            "snapshot_write_ms": snapshot_ms,
+            "journal_write_ms_per_batch": round(journal_ms / args.journal_batches, 1),
+            "startup_file_ms": load_file_ms,
+            "startup_state_load_ms": load_state_ms,
+            "startup_restore_ms": restore_ms,
+            "cooldown_matches": metrics["proxies_in_cooldown"] == expected["proxies_in_cooldown"],
+        }
+
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"{result['proxies']} proxies; fotografia {result['snapshot_bytes'] / 1e6:.1f} MB "
+          f"(exportar {result['export_ms']} ms, escrever {result['snapshot_write_ms']} ms; "
+          f"primeiro lote com todos os proxies: {result['first_batch_take_ms']} ms); "
+          f"journal {result['journal_bytes'] / 1e6:.1f} MB ({result['journal_write_ms_per_batch']} ms/lote)")
+    print(f"Arranque: ficheiro de proxies {result['startup_file_ms']} ms, ler estado {result['startup_state_load_ms']} ms, "
+          f"repor {result['startup_restore_ms']} ms; cooldown igual ao de antes: {result['cooldown_matches']}")
+
+
+if __name__ == "__main__":
+    main()
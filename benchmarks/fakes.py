@@ -0,0 +1,407 @@
+# proxy_steam_manager/benchmarks/fakes.py
+
+"""
+Substitutos locais para os benchmarks, a correr em processos separados para não
+competirem com o processo medido:
+
+  - uma frota de proxies HTTP falsos que aceitam CONNECT e respondem eles
+    próprios como se fossem o endpoint /market/search/render/ da Steam (sem TLS);
+  - um endpoint /market/search/render/ falso e uma frota de proxies
+    HTTP/SOCKS4/SOCKS5 que fazem mesmo o túnel até ele, com latência, ligações
+    cortadas e proxies "limitados" (a Steam responde-lhes 429) configuráveis;
+  - um servidor das listas de proxies que o proxy_harvester descarrega.
+"""
+
+import asyncio
+import multiprocessing
+import random
+import socket
+import struct
+import time
+import zlib
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+STEAM_BODY = b'{"success":true,"start":10,"pagesize":10,"total_count":0,"results":[]}'
+
+
+async def _read_head(reader: asyncio.StreamReader) -> bytes:
+    """Lê a linha de pedido e descarta os cabeçalhos; devolve a linha (ou b'' se a ligação fechou)."""
+    line = await reader.readline()
+    if not line:
+        return b""
+    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+        pass
+    return line
+
+
+async def _handle_http_proxy(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, latency_sec: float):
+    try:
+        line = await _read_head(reader)
+        if line.startswith(b"CONNECT"):
+            writer.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+            await writer.drain()
+            line = await _read_head(reader)
+        if not line:
+            return
+        if latency_sec:
+            await asyncio.sleep(latency_sec * random.uniform(0.5, 1.5))
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+                     % len(STEAM_BODY) + STEAM_BODY)
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_http_proxies(host: str, ports: List[int], latency_sec: float):
+    for port in ports:
+        await asyncio.start_server(lambda r, w: _handle_http_proxy(r, w, latency_sec), host, port, backlog=1024)
+    await asyncio.Event().wait()
+
+
+def _fleet_process(host: str, ports: List[int], latency_sec: float):
+    asyncio.run(serve_http_proxies(host, ports, latency_sec))
+
+
+def start_http_proxy_fleet(host: str, base_port: int, count: int, processes: int = 2,
+                           latency_sec: float = 0.0) -> List[multiprocessing.Process]:
+    """Arranca `count` proxies falsos em host:base_port.. repartidos por `processes` processos."""
+    ports = list(range(base_port, base_port + count))
+    fleet = []
+    for i in range(processes):
+        process = multiprocessing.Process(target=_fleet_process, args=(host, ports[i::processes], latency_sec), daemon=True)
+        process.start()
+        fleet.append(process)
+    return fleet
+
+
+def stop_fleet(fleet: List[multiprocessing.Process]):
+    for process in fleet:
+        process.terminate()
+        process.join()
+
+
+def wait_for_port(host: str, port: int, timeout_sec: float = 10.0):
+    deadline = time.monotonic() + timeout_sec
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
+
+async def _handle_steam_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, latency_sec: float):
+    try:
+        while True:
+            line = await _read_head(reader)
+            if not line:
+                return
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].startswith(b"http://"):
+                # Forma absoluta: os pedidos seguintes pela mesma ligação de um proxy HTTP chegam assim
+                parts[1] = b"/" + parts[1][len(b"http://"):].partition(b"/")[2]
+            if len(parts) < 2 or not parts[1].startswith(b"/market/search/render/"):
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+                continue
+            if latency_sec:
+                await asyncio.sleep(latency_sec * random.uniform(0.5, 1.5))
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+                         % len(STEAM_BODY) + STEAM_BODY)
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_steam(host: str, port: int, latency_sec: float):
+    await asyncio.start_server(lambda r, w: _handle_steam_request(r, w, latency_sec), host, port, backlog=4096)
+    await asyncio.Event().wait()
+
+
+def _steam_process(host: str, port: int, latency_sec: float):
+    asyncio.run(serve_steam(host, port, latency_sec))
+
+
+def start_fake_steam(host: str, port: int, latency_sec: float = 0.0) -> multiprocessing.Process:
+    """Endpoint http://host:port/market/search/render/ que responde '"success":true' (HTTP/1.1, keep-alive)."""
+    process = multiprocessing.Process(target=_steam_process, args=(host, port, latency_sec), daemon=True)
+    process.start()
+    return process
+
+
+# --- Frota de proxies HTTP/SOCKS4/SOCKS5 com túnel até ao destino pedido ---
+
+class FleetBehaviour:
+    """Comportamento de um proxy da frota (os parâmetros são os de start_proxy_fleet)."""
+    __slots__ = ("latency_sec", "drop_rate", "rate_limited")
+
+    def __init__(self, latency_sec: float, drop_rate: float, rate_limited: bool):
+        self.latency_sec = latency_sec
+        self.drop_rate = drop_rate
+        self.rate_limited = rate_limited
+
+
+async def _read_until_null(reader: asyncio.StreamReader) -> bytes:
+    return (await reader.readuntil(b"\x00"))[:-1]
+
+
+# Cada função recebe o primeiro byte já lido (que identifica o protocolo) e devolve
+# (host, porto, bytes a reenviar ao destino), ou None se o pedido não for válido
+
+async def _accept_http(first: bytes, reader: asyncio.StreamReader,
+                       writer: asyncio.StreamWriter) -> Optional[Tuple[str, int, bytes]]:
+    # CONNECT host:porto, ou um pedido com URI absoluto (reenviado na forma /caminho)
+    line = first + await reader.readline()
+    parts = line.split()
+    if len(parts) != 3 or not parts[2].startswith(b"HTTP/"):
+        return None
+    head = []
+    while True:
+        header = await reader.readline()
+        if header in (b"\r\n", b"\n", b""):
+            break
+        if not header.lower().startswith(b"proxy-"):
+            head.append(header)
+    if parts[0] == b"CONNECT":
+        host, _, port = parts[1].decode().rpartition(":")
+        writer.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+        return host, int(port), b""
+    if not parts[1].startswith(b"http://"):
+        return None
+    authority, _, path = parts[1][len(b"http://"):].partition(b"/")
+    host, _, port = authority.decode().partition(":")
+    request = b"%s /%s %s\r\n" % (parts[0], path, parts[2]) + b"".join(head) + b"\r\n"
+    return host, int(port or 80), request
+
+
+async def _accept_socks4(first: bytes, reader: asyncio.StreamReader,
+                         writer: asyncio.StreamWriter) -> Optional[Tuple[str, int, bytes]]:
+    version, command, port = struct.unpack(">BBH", first + await reader.readexactly(3))
+    address = await reader.readexactly(4)
+    if version != 0x04 or command != 0x01:
+        return None
+    await _read_until_null(reader)  # user id
+    if address[:3] == b"\x00\x00\x00" and address[3]:
+        host = (await _read_until_null(reader)).decode("idna")  # SOCKS4a
+    else:
+        host = socket.inet_ntoa(address)
+    writer.write(b"\x00\x5a" + struct.pack(">H", port) + address)
+    return host, port, b""
+
+
+async def _accept_socks5(first: bytes, reader: asyncio.StreamReader,
+                         writer: asyncio.StreamWriter) -> Optional[Tuple[str, int, bytes]]:
+    version, n_methods = first + await reader.readexactly(1)
+    methods = await reader.readexactly(n_methods)
+    if version != 0x05 or 0x00 not in methods:
+        return None
+    writer.write(b"\x05\x00")
+    await writer.drain()
+    version, command, _, address_type = await reader.readexactly(4)
+    if version != 0x05 or command != 0x01:
+        return None
+    if address_type == 0x01:
+        host = socket.inet_ntoa(await reader.readexactly(4))
+    elif address_type == 0x04:
+        host = socket.inet_ntop(socket.AF_INET6, await reader.readexactly(16))
+    elif address_type == 0x03:
+        host = (await reader.readexactly((await reader.readexactly(1))[0])).decode("idna")
+    else:
+        return None
+    port = struct.unpack(">H", await reader.readexactly(2))[0]
+    writer.write(b"\x05\x00\x00\x01\x00\x00\x00\x00\x00\x00")
+    return host, port, b""
+
+
+ACCEPTORS = {
+    "http": _accept_http,
+    "socks4": _accept_socks4,
+    "socks5": _accept_socks5,
+}
+# Primeiro byte que cada protocolo aceita: um handshake de outro protocolo é recusado logo
+# (como num proxy real), e não fica à espera de bytes que nunca chegam
+_FIRST_BYTE = {
+    "http": lambda b: b.isalpha(),
+    "socks4": lambda b: b == b"\x04",
+    "socks5": lambda b: b == b"\x05",
+}
+
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def _handle_fleet_proxy(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, protocol: str,
+                              behaviour: FleetBehaviour):
+    try:
+        first = await reader.readexactly(1)
+        if not _FIRST_BYTE[protocol](first):
+            return
+        if behaviour.latency_sec:
+            await asyncio.sleep(behaviour.latency_sec * random.uniform(0.5, 1.5))
+        target = await ACCEPTORS[protocol](first, reader, writer)
+        if target is None:
+            return
+        await writer.drain()
+        host, port, pending = target
+        if behaviour.rate_limited or (behaviour.drop_rate and random.random() < behaviour.drop_rate):
+            # Esperar pelo pedido: um proxy limitado recebe 429 da Steam; um cortado fecha sem resposta
+            if not pending and not await _read_head(reader):
+                return
+            if behaviour.rate_limited:
+                writer.write(b"HTTP/1.1 429 Too Many Requests\r\nRetry-After: 60\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+            return
+        upstream_reader, upstream_writer = await asyncio.open_connection(host, port)
+        if pending:
+            upstream_writer.write(pending)
+        await asyncio.gather(_pipe(reader, upstream_writer), _pipe(upstream_reader, writer))
+    except (ConnectionError, OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_proxy_fleet(host: str, endpoints: Sequence[Tuple[int, str]], behaviours: Dict[int, FleetBehaviour]):
+    for port, protocol in endpoints:
+        await asyncio.start_server(
+            lambda r, w, protocol=protocol, behaviour=behaviours[port]: _handle_fleet_proxy(r, w, protocol, behaviour),
+            host, port, backlog=1024,
+        )
+    await asyncio.Event().wait()
+
+
+def _proxy_fleet_process(host: str, endpoints: Sequence[Tuple[int, str]], behaviours: Dict[int, FleetBehaviour]):
+    asyncio.run(serve_proxy_fleet(host, endpoints, behaviours))
+
+
+def fleet_endpoints(base_port: int, counts: Dict[str, int]) -> List[Tuple[int, str]]:
+    """(porto, protocolo) de cada proxy da frota: os de cada protocolo em portos seguidos, a partir de base_port."""
+    endpoints = []
+    port = base_port
+    for protocol in ("http", "socks4", "socks5"):
+        for _ in range(counts.get(protocol, 0)):
+            endpoints.append((port, protocol))
+            port += 1
+    return endpoints
+
+
+def start_proxy_fleet(host: str, base_port: int, counts: Dict[str, int], processes: int = 2,
+                      latency_sec: float = 0.0, drop_rate: float = 0.0, rate_limited: float = 0.0,
+                      seed: int = 1) -> Tuple[List[multiprocessing.Process], Set[int]]:
+    """
+    Arranca counts[protocolo] proxies de cada protocolo (ver fleet_endpoints),
+    repartidos por `processes` processos. Cada proxy faz o túnel até ao destino
+    que o cliente pede, depois de uma latência média de `latency_sec`; uma
+    fração `drop_rate` das ligações é fechada sem resposta depois do pedido, e
+    uma fração `rate_limited` dos proxies (escolhida com `seed`) recebe sempre
+    429. Devolve os processos e os portos dos proxies limitados.
+    """
+    endpoints = fleet_endpoints(base_port, counts)
+    rng = random.Random(seed)
+    limited = set(rng.sample([port for port, _ in endpoints], int(len(endpoints) * rate_limited)))
+    behaviours = {port: FleetBehaviour(latency_sec, drop_rate, port in limited) for port, _ in endpoints}
+    fleet = []
+    for i in range(processes):
+        share = endpoints[i::processes]
+        process = multiprocessing.Process(
+            target=_proxy_fleet_process, args=(host, share, {port: behaviours[port] for port, _ in share}), daemon=True
+        )
+        process.start()
+        fleet.append(process)
+    return fleet, limited
+
+
+def fixture_list(index: int, lines: int, overlap: float) -> bytes:
+    """
+    Lista 'ip:porto' da fonte `index`: uma fração `overlap` das linhas é comum a
+    todas as fontes (proxies repetidos entre listas), o resto é só desta.
+    """
+    shared = int(lines * overlap)
+    rows = [f"10.200.{(i >> 8) & 255}.{i & 255}:{3128 + i % 1000}" for i in range(shared)]
+    base = (index + 1) << 16
+    rows += [f"10.{(base + i) >> 16 & 255}.{((base + i) >> 8) & 255}.{(base + i) & 255}:{8080 + i % 1000}"
+             for i in range(lines - shared)]
+    return ("\n".join(rows) + "\n").encode()
+
+
+async def _handle_list_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, lists: List[bytes],
+                               latency_sec: float, chunk_size: int):
+    # HTTP/1.1 com keep-alive: vários pedidos por ligação, como um servidor real
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            path = request_line.split()[1].decode()
+            if latency_sec:
+                await asyncio.sleep(latency_sec * random.uniform(0.5, 1.5))
+            try:
+                body = lists[int(path.rsplit("/", 1)[1])]
+            except (ValueError, IndexError):
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+                continue
+            etag = f'"{len(body)}-{zlib.crc32(body):x}"'
+            if headers.get("if-none-match") == etag:
+                writer.write(f"HTTP/1.1 304 Not Modified\r\nETag: {etag}\r\n\r\n".encode())
+                await writer.drain()
+                continue
+            writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\nETag: {etag}\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode())
+            # O corpo sai aos bocados, para o cliente poder interpretá-lo enquanto chega
+            for offset in range(0, len(body), chunk_size):
+                writer.write(body[offset:offset + chunk_size])
+                await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_source_lists(host: str, port: int, lists: List[bytes], latency_sec: float, chunk_size: int):
+    await asyncio.start_server(lambda r, w: _handle_list_request(r, w, lists, latency_sec, chunk_size),
+                               host, port, backlog=1024)
+    await asyncio.Event().wait()
+
+
+def _list_server_process(host: str, port: int, sources: int, lines: int, overlap: float, latency_sec: float,
+                         chunk_size: int):
+    lists = [fixture_list(i, lines, overlap) for i in range(sources)]
+    asyncio.run(serve_source_lists(host, port, lists, latency_sec, chunk_size))
+
+
+def start_list_server(host: str, port: int, sources: int, lines: int, overlap: float = 0.3,
+                      latency_sec: float = 0.0, chunk_size: int = 16384) -> multiprocessing.Process:
+    """
+    Servidor de listas de proxies (como as fontes de HARVESTER_SOURCES) em
+    http://host:port/list/<0..sources-1>, com ETag e respostas 304.
+    """
+    process = multiprocessing.Process(
+        target=_list_server_process, args=(host, port, sources, lines, overlap, latency_sec, chunk_size), daemon=True
+    )
+    process.start()
+    return process
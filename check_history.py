@@ -0,0 +1,105 @@
+# proxy_steam_manager/check_history.py
+
+"""
+Histórico persistente das verificações do checker, usado para decidir quando
+cada proxy volta a ser verificado.
+
+Proxies mortos são reverificados com backoff exponencial; proxies vivos com
+latência perto do limite são reverificados mais cedo do que os rápidos.
+"""
+
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Set
+
+
+@dataclass
+class CheckRecord:
+    url: Optional[str] = None        # 'protocolo://ip:porto' da última verificação bem-sucedida
+    ok: bool = False                 # Resultado da última verificação
+    failures: int = 0                # Falhas consecutivas
+    latency_ms: Optional[float] = None
+    last_checked: float = 0.0        # Timestamps Unix
+    next_check: float = 0.0
+
+    def to_list(self) -> list:
+        return [self.url, self.ok, self.failures, self.latency_ms, self.last_checked, self.next_check]
+
+    @classmethod
+    def from_list(cls, data: list) -> "CheckRecord":
+        return cls(*data)
+
+
+class CheckHistory:
+    def __init__(self, path: str, live_min_sec: float, live_max_sec: float, marginal_latency_ms: float,
+                 dead_base_sec: float, dead_max_sec: float):
+        self.path = path
+        self.live_min_sec = live_min_sec
+        self.live_max_sec = live_max_sec
+        self.marginal_latency_ms = marginal_latency_ms
+        self.dead_base_sec = dead_base_sec
+        self.dead_max_sec = dead_max_sec
+        self.records: Dict[str, CheckRecord] = {}
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.records = {key: CheckRecord.from_list(value) for key, value in data.items()}
+        except FileNotFoundError:
+            self.records = {}
+        except (ValueError, TypeError) as e:
+            print(f"Aviso: histórico '{self.path}' inválido, a começar do zero ({type(e).__name__}: {e})", flush=True)
+            self.records = {}
+
+    def save(self):
+        temp_file = self.path + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump({key: record.to_list() for key, record in self.records.items()}, f, separators=(",", ":"))
+        os.replace(temp_file, self.path)
+
+    def get(self, key: str) -> Optional[CheckRecord]:
+        return self.records.get(key)
+
+    def is_due(self, key: str, now: Optional[float] = None) -> bool:
+        record = self.records.get(key)
+        return record is None or record.next_check <= (now if now is not None else time.time())
+
+    def _next_interval(self, record: CheckRecord) -> float:
+        if not record.ok:
+            interval = min(self.dead_base_sec * 2 ** (record.failures - 1), self.dead_max_sec)
+        else:
+            # Quanto mais perto do limite de latência, mais cedo volta a ser verificado
+            latency = record.latency_ms or 0.0
+            closeness = min(1.0, latency / self.marginal_latency_ms) if self.marginal_latency_ms > 0 else 1.0
+            interval = self.live_max_sec - (self.live_max_sec - self.live_min_sec) * closeness
+        # Jitter de ±10% para não concentrar as reverificações na mesma ronda
+        return interval * random.uniform(0.9, 1.1)
+
+    def record(self, key: str, url: Optional[str], ok: bool, latency_ms: Optional[float] = None,
+               now: Optional[float] = None) -> CheckRecord:
+        now = now if now is not None else time.time()
+        record = self.records.get(key) or CheckRecord()
+        record.ok = ok
+        record.last_checked = now
+        if ok:
+            record.url = url
+            record.failures = 0
+            record.latency_ms = latency_ms
+        else:
+            record.failures += 1
+        record.next_check = now + self._next_interval(record)
+        self.records[key] = record
+        return record
+
+    def live_urls(self) -> Set[str]:
+        """'protocolo://ip:porto' dos proxies cuja última verificação foi bem-sucedida."""
+        return {record.url for record in self.records.values() if record.ok and record.url}
+
+    def prune(self, keep: Iterable[str]):
+        """Esquece os proxies que já não estão no ficheiro de entrada."""
+        keep = set(keep)
+        self.records = {key: record for key, record in self.records.items() if key in keep}
@@ -1,9 +1,15 @@
+import argparse
 import asyncio
+import json
+import multiprocessing
 import os
+import queue
 import sys
-import threading
+import time
+import zlib
 from contextlib import suppress
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime
 
 # --- Tenta importar as bibliotecas e avisa o utilizador se não estiverem instaladas ---
@@ -23,119 +29,693 @@ except ImportError:
     print("ERRO: O ficheiro 'config.py' não foi encontrado. Certifique-se de que ele está no mesmo diretório que este script.")
     sys.exit(1)
 
+from async_logger import DEBUG, AsyncLogger
+from adaptive_limiter import OUTCOME_FAIL, OUTCOME_OK, AdaptiveLimiter, classify_exception
+from check_history import CheckHistory
+from proxy_client import ResultPusher
+from proxy_probe import detect_protocol_timed, parse_target_url, split_endpoint
 
-log_lock = threading.Lock()
 
-def write_log_sync(log_message: str):
-    """Função síncrona que escreve no ficheiro. Será executada num thread separado."""
+# Logger de depuração deste processo, criado por setup_logging() só em CHECKER_DEBUG_MODE
+logger: Optional[AsyncLogger] = None
+
+
+def debug_log_file(shard_index: Optional[int] = None) -> str:
+    if shard_index is None:
+        return CHECKER_DEBUG_LOG_FILE
+    root, ext = os.path.splitext(CHECKER_DEBUG_LOG_FILE)
+    return f"{root}.shard{shard_index}{ext}"
+
+
+def setup_logging(shard_index: Optional[int] = None):
+    global logger
+    if CHECKER_DEBUG_MODE and logger is None:
+        logger = AsyncLogger(debug_log_file(shard_index), DEBUG, fmt=LOG_FORMAT, max_bytes=LOG_MAX_BYTES,
+                             backup_count=LOG_BACKUP_COUNT, flush_interval_sec=LOG_FLUSH_INTERVAL_SEC)
+
+
+def close_logging():
+    global logger
+    if logger is not None:
+        logger.close()
+        logger = None
+
+
+def log_debug(proxy: str, stage: str, details: str):
+    """Regista um evento de depuração sem bloquear: só acrescenta à fila do logger."""
+    if logger is not None:
+        logger.debug(stage, details, proxy=proxy)
+
+
+async def prefilter_proxy(line: str, target_host: str, target_port: int) -> Optional[Tuple[str, Dict[str, float]]]:
+    """
+    Primeira fase: apenas ligação TCP e handshake do protocolo do proxy, com um
+    timeout curto. Descobre também o protocolo que o endpoint fala (o esquema da
+    linha, se existir, é só a primeira tentativa) e devolve 'protocolo://ip:porto'
+    com a duração da ligação e do handshake, ou None se o proxy não responder.
+    Os que falham não chegam ao pedido à Steam.
+    """
+    log_debug(line, "TASK_START", "Iniciando verificação")
     try:
-        with log_lock:
-            with open(CHECKER_DEBUG_LOG_FILE, "a", encoding="utf-8") as f:
-                f.write(log_message)
+        hint, host, port = split_endpoint(line)
+    except ValueError as e:
+        log_debug(line, "INVALID_PROXY_FORMAT", f"{type(e).__name__}: {e}")
+        return None
+    detected = await detect_protocol_timed(host, port, target_host, target_port, CHECKER_PREFILTER_TIMEOUT_SEC, hint=hint)
+    if detected is None:
+        log_debug(line, "PREFILTER_FAIL", "Sem resposta a nenhum handshake (HTTP/SOCKS4/SOCKS5)")
+        return None
+    protocol, timing = detected
+    return f"{protocol}://{host}:{port}", {"tcp_ms": timing.connect_ms, "handshake_ms": timing.handshake_ms}
+
+
+# Fases cronometradas de cada verificação (ms):
+#  tcp / handshake - ligação TCP ao proxy e handshake do protocolo (pré-filtro);
+#  connect         - abertura da ligação pelo aiohttp, através do proxy, incluindo TLS;
+#  tls             - estimativa do TLS: connect - (tcp + handshake), só para URLs https;
+#  ttfb            - da ligação aberta até aos cabeçalhos da resposta;
+#  body            - leitura do corpo; total - do início do pedido ao fim do corpo.
+TIMING_STAGES = ("tcp_ms", "handshake_ms", "connect_ms", "tls_ms", "ttfb_ms", "body_ms", "total_ms")
+OUTCOME_PREFILTER_FAIL = "prefilter_fail"
+
+
+async def _trace_connection_create_start(session, ctx, params):
+    ctx.trace_request_ctx["_connect_start"] = time.perf_counter()
+
+
+async def _trace_connection_create_end(session, ctx, params):
+    timings = ctx.trace_request_ctx
+    timings["_connected"] = time.perf_counter()
+    timings["connect_ms"] = (timings["_connected"] - timings["_connect_start"]) * 1000.0
+
+
+async def _trace_request_end(session, ctx, params):
+    timings = ctx.trace_request_ctx
+    if "_connected" in timings:
+        timings["ttfb_ms"] = (time.perf_counter() - timings["_connected"]) * 1000.0
+
+
+TRACE_CONFIG = aiohttp.TraceConfig()
+TRACE_CONFIG.on_connection_create_start.append(_trace_connection_create_start)
+TRACE_CONFIG.on_connection_create_end.append(_trace_connection_create_end)
+TRACE_CONFIG.on_request_end.append(_trace_request_end)
+
+
+@dataclass
+class CheckResult:
+    outcome: str = OUTCOME_FAIL  # Ver adaptive_limiter.OUTCOME_* e OUTCOME_PREFILTER_FAIL
+    latency_ms: Optional[float] = None
+    timings: Dict[str, float] = field(default_factory=dict)  # Ver TIMING_STAGES
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome == OUTCOME_OK
+
+
+def _public_timings(trace: Dict[str, float]) -> Dict[str, float]:
+    return {stage: value for stage, value in trace.items() if not stage.startswith("_")}
+
+
+async def check_proxy(proxy: str, prefilter_timings: Optional[Dict[str, float]] = None) -> CheckResult:
+    """
+    Testa um proxy contra a API da Steam. O resultado traz a duração de cada fase
+    (ver TIMING_STAGES) e, em caso de sucesso, a latência total em ms.
+    """
+    log_debug(proxy, "CHECK_START", "Pedido à API da Steam")
+    trace: Dict[str, float] = dict(prefilter_timings or {})
+    try:
+        connector = ProxyConnector.from_url(proxy)
+    except Exception as e:
+        log_debug(proxy, "INVALID_PROXY_FORMAT", f"{type(e).__name__}: {e}")
+        return CheckResult(timings=_public_timings(trace))
+
+    try:
+        started = time.perf_counter()
+        timeout = aiohttp.ClientTimeout(total=CHECKER_TIMEOUT_SEC)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=[TRACE_CONFIG]) as session:
+            async with session.get(CHECKER_VALIDATION_URL, headers=CHECKER_HEADERS, trace_request_ctx=trace) as response:
+                log_debug(proxy, "HTTP_RESPONSE", f"Status: {response.status}")
+                if response.status == 200:
+                    body_started = time.perf_counter()
+                    text = await response.text()
+                    finished = time.perf_counter()
+                    trace["body_ms"] = (finished - body_started) * 1000.0
+                    trace["total_ms"] = (finished - started) * 1000.0
+                    if CHECKER_VALIDATION_URL.startswith("https") and "connect_ms" in trace and "tcp_ms" in trace:
+                        trace["tls_ms"] = max(0.0, trace["connect_ms"] - trace["tcp_ms"] - trace.get("handshake_ms", 0.0))
+                    if CHECKER_VALIDATION_TEXT in text:
+                        latency_ms = trace["total_ms"]
+                        log_debug(proxy, "SUCCESS", f"Proxy válido ✅ ({latency_ms:.0f} ms)")
+                        return CheckResult(OUTCOME_OK, latency_ms, _public_timings(trace))
+                    else:
+                        log_debug(proxy, "VALIDATION_FAIL", "Texto de validação não encontrado ❌")
+                else:
+                    log_debug(proxy, "BAD_STATUS", f"Recebido status {response.status}")
+    except asyncio.CancelledError:
+        log_debug(proxy, "CANCELLED", "Tarefa cancelada durante a execução.")
+        # É importante propagar o CancelledError para que o asyncio saiba que a tarefa foi cancelada.
+        raise
     except Exception as e:
-        print(f"ERRO CRÍTICO AO ESCREVER NO LOG: {e}", flush=True)
-
-async def log_debug(proxy: str, stage: str, details: str):
-    """Regista logs de forma segura e não-bloqueante."""
-    if not CHECKER_DEBUG_MODE:
-        return
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    log_message = f"[{timestamp}] PROXY {proxy} | {stage}\nDETAILS: {details}\n--- END ---\n\n"
+        error_type = type(e).__name__
+        log_debug(proxy, "ERROR", f"{error_type}: {e}")
+        return CheckResult(classify_exception(e), timings=_public_timings(trace))
+    return CheckResult(timings=_public_timings(trace))
+
+
+class LiveOutputWriter:
+    """
+    Proxies válidos da ronda e o ficheiro de saída (opcional) que os espelha.
+
+    Durante a ronda o ficheiro contém os proxies válidos da ronda anterior mais
+    os que já foram validados nesta, reescrito de forma atómica a cada flush.
+    No fim da ronda fica apenas com os proxies validados nesta ronda (vazio se
+    não houver nenhum: o serviço esvazia o pool em vez de dar o ficheiro como
+    em falta). `previous` são os válidos da ronda anterior; se não for dado, é
+    lido do ficheiro.
+    """
+
+    def __init__(self, output_file: Optional[str], previous: Optional[Set[str]] = None):
+        self.output_file = output_file
+        self.validated: Set[str] = set()
+        self.previous: Set[str] = set(previous) if previous is not None else set()
+        self._dirty = False
+        if previous is None and output_file:
+            with suppress(FileNotFoundError):
+                with open(output_file, "r", encoding="utf-8") as f:
+                    self.previous = {line.strip() for line in f if line.strip()}
+
+    def add(self, proxy: str):
+        self.validated.add(proxy)
+        if proxy not in self.previous:
+            self._dirty = True
+
+    def _write(self, proxies: Set[str]):
+        temp_file = self.output_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(sorted(proxies)))
+        os.replace(temp_file, self.output_file)
+
+    async def flush(self):
+        if not self._dirty or not self.output_file:
+            return
+        self._dirty = False
+        await asyncio.to_thread(self._write, self.previous | self.validated)
+
+    async def finalize(self):
+        if self.output_file:
+            await asyncio.to_thread(self._write, self.validated)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class RoundResults:
+    """
+    Grava o resultado de cada verificação da ronda, com a duração de cada fase,
+    em CHECKER_RESULTS_FILE (JSONL, uma linha por proxy) e junta as durações
+    dos proxies válidos para o resumo de percentis no fim da ronda.
+
+    As linhas são escritas à medida que chegam num ficheiro temporário, que
+    substitui o ficheiro final de forma atómica quando a ronda termina.
+    """
+
+    def __init__(self, results_file: Optional[str]):
+        self.results_file = results_file
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in TIMING_STAGES}
+        self.count = 0
+        self._file = open(results_file + ".tmp", "w", encoding="utf-8") if results_file else None
+
+    def add(self, proxy: str, result: CheckResult):
+        self.count += 1
+        if self._file:
+            record = {"proxy": proxy, "ok": result.ok, "outcome": result.outcome, "ts": round(time.time(), 3)}
+            record.update((stage, round(value, 1)) for stage, value in result.timings.items())
+            self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        if result.ok:
+            for stage, value in result.timings.items():
+                self.samples[stage].append(value)
+
+    def close(self, commit: bool = True):
+        if not self._file:
+            return
+        self._file.close()
+        self._file = None
+        temp_file = self.results_file + ".tmp"
+        # Uma ronda sem verificações (nenhum proxy na hora) não apaga a anterior
+        if commit and self.count:
+            os.replace(temp_file, self.results_file)
+        else:
+            with suppress(OSError):
+                os.remove(temp_file)
+
+    def summary(self) -> str:
+        lines = []
+        for stage in TIMING_STAGES:
+            values = self.samples[stage]
+            if values:
+                lines.append(f"   {stage[:-3]:>9}: p50={percentile(values, 50):7.0f}  p90={percentile(values, 90):7.0f}  "
+                             f"p99={percentile(values, 99):7.0f} ms  (n={len(values)})")
+        return "\n".join(lines)
+
+
+def create_history() -> CheckHistory:
+    history = CheckHistory(
+        CHECKER_HISTORY_FILE,
+        live_min_sec=CHECKER_RECHECK_LIVE_MIN_SEC,
+        live_max_sec=CHECKER_RECHECK_LIVE_MAX_SEC,
+        marginal_latency_ms=CHECKER_TIMEOUT_SEC * 1000 * CHECKER_RECHECK_MARGINAL_RATIO,
+        dead_base_sec=CHECKER_RECHECK_DEAD_BASE_SEC,
+        dead_max_sec=CHECKER_RECHECK_DEAD_MAX_SEC,
+    )
+    history.load()
+    return history
+
+
+class LocalRoundSink:
+    """
+    Aplica os resultados da ronda diretamente: ficheiro de saída, histórico,
+    barra de progresso e, com `pusher`, o envio de cada resultado ao serviço.
+    """
+
+    def __init__(self, writer: LiveOutputWriter, history: CheckHistory, results: RoundResults, progress_bar,
+                 pusher: Optional[ResultPusher] = None):
+        self.writer = writer
+        self.history = history
+        self.results = results
+        self.progress_bar = progress_bar
+        self.pusher = pusher
+        self.pushed_removals: Set[str] = set()
+        self.limits: Dict[int, int] = {}  # Limite de concorrência atual de cada shard
+
+    def carried(self, url: str):
+        """Proxy vivo que não precisou de ser verificado nesta ronda."""
+        self.writer.add(url)
+
+    def checked(self, key: str, url: Optional[str], result: CheckResult):
+        if self.pusher is not None:
+            if result.ok:
+                self.pusher.add(url, result.latency_ms, new=url not in self.writer.previous)
+            else:
+                # A linha que o serviço tem é a da última verificação bem-sucedida
+                record = self.history.get(key)
+                if record is not None and record.url in self.writer.previous:
+                    self.pusher.remove(record.url)
+                    self.pushed_removals.add(record.url)
+        if result.ok:
+            self.writer.add(url)
+        self.history.record(key, url, result.ok, result.latency_ms)
+        self.results.add(url or key, result)
+        self.progress_bar.update(1)
+        self._update_postfix()
+
+    def set_limit(self, limit: int, shard_index: int = 0):
+        self.limits[shard_index] = limit
+        self._update_postfix()
+
+    def _update_postfix(self):
+        postfix = {'Válidos': len(self.writer.validated)}
+        if self.limits:
+            postfix['Limite'] = sum(self.limits.values())
+        self.progress_bar.set_postfix(postfix, refresh=False)
+
+
+class ShardRoundSink:
+    """
+    Usado nos processos-filho do modo --workers: em vez de escrever ficheiros,
+    envia os resultados ao processo principal em lotes (por tamanho ou tempo).
+    """
+
+    def __init__(self, result_queue, shard_index: int, batch_size: int = 256, interval_sec: float = 0.2):
+        self.result_queue = result_queue
+        self.shard_index = shard_index
+        self.batch_size = batch_size
+        self.interval_sec = interval_sec
+        self.events = []
+        self.last_send = time.monotonic()
+
+    def carried(self, url: str):
+        self._push(("carried", url))
+
+    def checked(self, key: str, url: Optional[str], result: CheckResult):
+        self._push(("checked", key, url, result.outcome, result.latency_ms, result.timings))
+
+    def set_limit(self, limit: int, shard_index: int = 0):
+        self._push(("limit", limit, self.shard_index))
+
+    def _push(self, event: tuple):
+        self.events.append(event)
+        if len(self.events) >= self.batch_size or time.monotonic() - self.last_send >= self.interval_sec:
+            self.send()
+
+    def send(self):
+        if self.events:
+            self.result_queue.put(("events", self.events))
+            self.events = []
+        self.last_send = time.monotonic()
+
+
+async def produce_proxies(queue: asyncio.Queue, n_workers: int, by_endpoint: bool, history: CheckHistory,
+                          sink, shard_index: int = 0, shard_count: int = 1) -> Tuple[Set[str], int]:
+    """
+    Lê o ficheiro de entrada linha a linha e alimenta a fila com (chave, linha).
+    Com `by_endpoint`, linhas com o mesmo ip:porto e protocolos diferentes contam
+    como um só proxy (o protocolo é detetado no pré-filtro). Com `shard_count` > 1
+    só são considerados os proxies cuja chave pertence ao shard `shard_index`.
+
+    Só entram na fila os proxies cuja próxima verificação já chegou; os restantes
+    mantêm o último resultado (os vivos passam diretamente para a saída).
+    Devolve as chaves vistas e o número de proxies enviados para verificação.
+    """
+    seen: Set[str] = set()
+    due = 0
+    now = time.time()
+    with open(CHECKER_INPUT_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            proxy = line.strip()
+            if not proxy:
+                continue
+            key = proxy
+            if by_endpoint:
+                try:
+                    _, host, port = split_endpoint(proxy)
+                except ValueError:
+                    continue
+                key = f"{host}:{port}"
+            if shard_count > 1 and zlib.crc32(key.encode()) % shard_count != shard_index:
+                continue
+            if key in seen:
+                continue
+            seen.add(key)
+            if not history.is_due(key, now):
+                record = history.get(key)
+                if record.ok and record.url:
+                    sink.carried(record.url)
+                continue
+            due += 1
+            await queue.put((key, proxy))
+    for _ in range(n_workers):
+        await queue.put(None)  # Sinal de paragem para cada worker
+    return seen, due
+
+
+async def prefilter_worker(in_queue: asyncio.Queue, out_queue: asyncio.Queue, sink):
+    target_host, target_port = parse_target_url(CHECKER_VALIDATION_URL)
+    while True:
+        item = await in_queue.get()
+        if item is None:
+            return
+        key, line = item
+        prefiltered = await prefilter_proxy(line, target_host, target_port)
+        if prefiltered:
+            await out_queue.put((key, *prefiltered))
+        else:
+            sink.checked(key, None, CheckResult(OUTCOME_PREFILTER_FAIL))
+
+
+async def run_prefilter_stage(in_queue: asyncio.Queue, out_queue: asyncio.Queue, sink,
+                              n_prefilter_workers: int, n_check_workers: int):
+    """Corre os workers da primeira fase e, no fim, sinaliza a paragem da segunda."""
+    await asyncio.gather(*(prefilter_worker(in_queue, out_queue, sink) for _ in range(n_prefilter_workers)))
+    for _ in range(n_check_workers):
+        await out_queue.put(None)
+
+
+async def check_worker(queue: asyncio.Queue, sink, limiter: AdaptiveLimiter):
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+        key, proxy, *prefilter_timings = item
+        async with limiter:
+            result = await check_proxy(proxy, *prefilter_timings)
+        limiter.record(result.outcome)
+        sink.checked(key, proxy, result)
+
+
+def create_limiter(shard_count: int = 1) -> AdaptiveLimiter:
+    """Limite de concorrência da fase de pedidos à Steam, repartido pelos shards."""
+    def share(value: int) -> int:
+        return max(1, -(-value // shard_count))
+
+    if not CHECKER_ADAPTIVE_CONCURRENCY:
+        fixed = share(CHECKER_CONCURRENCY)
+        return AdaptiveLimiter(fixed, fixed, fixed, 0, 1.0, float("inf"), float("inf"))
+    return AdaptiveLimiter(
+        share(CHECKER_CONCURRENCY), share(CHECKER_CONCURRENCY_MIN), share(CHECKER_CONCURRENCY_MAX),
+        increase=CHECKER_AIMD_INCREASE,
+        decrease_factor=CHECKER_AIMD_DECREASE_FACTOR,
+        max_loop_lag_ms=CHECKER_AIMD_MAX_LOOP_LAG_MS,
+        timeout_margin=CHECKER_AIMD_TIMEOUT_MARGIN,
+    )
+
+
+async def control_concurrency(limiter: AdaptiveLimiter, sink):
+    """Mede o lag do event loop e ajusta o limite a cada CHECKER_AIMD_INTERVAL_SEC."""
     loop = asyncio.get_running_loop()
-    await loop.run_in_executor(None, write_log_sync, log_message)
+    while True:
+        started = loop.time()
+        await asyncio.sleep(CHECKER_AIMD_INTERVAL_SEC)
+        old_limit = int(limiter.limit)
+        if limiter.adjust((loop.time() - started - CHECKER_AIMD_INTERVAL_SEC) * 1000.0):
+            sink.set_limit(int(limiter.limit))
+            log_debug("N/A", "CONCURRENCY", f"Limite {old_limit} -> {int(limiter.limit)}: {limiter.last_reason}")
 
 
-async def check_proxy(proxy: str, sem: asyncio.Semaphore) -> Optional[str]:
-    """Testa um proxy contra a API da Steam, gerindo o semáforo."""
-    async with sem: # O semáforo agora é gerido aqui dentro
-        await log_debug(proxy, "TASK_START", "Iniciando verificação")
-        try:
-            connector = ProxyConnector.from_url(proxy)
-        except Exception as e:
-            await log_debug(proxy, "INVALID_PROXY_FORMAT", f"{type(e).__name__}: {e}")
-            return None
+async def run_round(sink, history: CheckHistory, limiter: AdaptiveLimiter, prefilter_concurrency: int,
+                    shard_index: int = 0, shard_count: int = 1) -> Tuple[Set[str], int]:
+    """
+    Uma ronda de verificação sobre o ficheiro de entrada (ou um shard dele).
 
-        try:
-            timeout = aiohttp.ClientTimeout(total=CHECKER_TIMEOUT_SEC)
-            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-                async with session.get(CHECKER_VALIDATION_URL, headers=CHECKER_HEADERS) as response:
-                    await log_debug(proxy, "HTTP_RESPONSE", f"Status: {response.status}")
-                    if response.status == 200:
-                        text = await response.text()
-                        if CHECKER_VALIDATION_TEXT in text:
-                            await log_debug(proxy, "SUCCESS", "Proxy válido ✅")
-                            return proxy
-                        else:
-                            await log_debug(proxy, "VALIDATION_FAIL", "Texto de validação não encontrado ❌")
-                    else:
-                        await log_debug(proxy, "BAD_STATUS", f"Recebido status {response.status}")
-        except asyncio.CancelledError:
-            await log_debug(proxy, "CANCELLED", "Tarefa cancelada durante a execução.")
-            # É importante propagar o CancelledError para que o asyncio saiba que a tarefa foi cancelada.
-            raise
-        except Exception as e:
-            error_type = type(e).__name__
-            await log_debug(proxy, "ERROR", f"{error_type}: {e}")
+    Pipeline produtor/consumidor: um leitor do ficheiro, um número fixo de
+    workers e filas limitadas entre eles, para que a memória não cresça com o
+    tamanho do ficheiro de entrada. Com o pré-filtro ativo há duas fases:
+    handshake barato com muita concorrência e, só para quem passa, o pedido
+    completo à Steam, uma única vez por ip:porto e apenas no protocolo detetado.
+    Só são verificados os proxies cuja próxima verificação (segundo o histórico)
+    já chegou; ver check_history.py.
+
+    O número de pedidos à Steam em simultâneo é controlado por `limiter` (AIMD,
+    ver adaptive_limiter.py); há sempre `limiter.maximum` workers à espera.
+    """
+    concurrency = limiter.maximum
+    check_queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    if CHECKER_PREFILTER_ENABLED:
+        input_queue: asyncio.Queue = asyncio.Queue(maxsize=prefilter_concurrency * 2)
+        producer = asyncio.create_task(produce_proxies(
+            input_queue, prefilter_concurrency, True, history, sink, shard_index, shard_count))
+        stages = [asyncio.create_task(run_prefilter_stage(
+            input_queue, check_queue, sink, prefilter_concurrency, concurrency))]
+    else:
+        producer = asyncio.create_task(produce_proxies(
+            check_queue, concurrency, False, history, sink, shard_index, shard_count))
+        stages = []
+    workers = [asyncio.create_task(check_worker(check_queue, sink, limiter)) for _ in range(concurrency)]
+    sink.set_limit(int(limiter.limit))
+    controller = asyncio.create_task(control_concurrency(limiter, sink)) if CHECKER_ADAPTIVE_CONCURRENCY else None
+
+    tasks = [producer, *stages, *workers]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        if controller:
+            controller.cancel()
+    return producer.result()
+
+
+async def flush_periodically(writer: LiveOutputWriter):
+    while True:
+        await asyncio.sleep(CHECKER_FLUSH_INTERVAL_SEC)
+        await writer.flush()
+
+
+# --- MODO MULTI-PROCESSO (--workers N) ---
+
+# Valores de configuração alterados pela linha de comandos; são reaplicados nos processos-filho.
+CONFIG_OVERRIDES: Dict[str, object] = {}
+
+
+def apply_overrides(overrides: Dict[str, object]):
+    CONFIG_OVERRIDES.update(overrides)
+    globals().update(overrides)
+
+
+async def _run_shard(shard_index: int, shard_count: int, result_queue):
+    history = create_history()  # Só leitura: o processo principal é o dono do histórico
+    sink = ShardRoundSink(result_queue, shard_index)
+    try:
+        seen, due = await run_round(
+            sink, history, create_limiter(shard_count),
+            max(1, -(-CHECKER_PREFILTER_CONCURRENCY // shard_count)),
+            shard_index, shard_count,
+        )
+        sink.send()
+        result_queue.put(("done", (list(seen), due)))
+    except Exception as e:
+        sink.send()
+        result_queue.put(("error", f"shard {shard_index}: {type(e).__name__}: {e}"))
+
+
+def shard_main(shard_index: int, shard_count: int, overrides: Dict[str, object], result_queue):
+    """Ponto de entrada de cada processo-filho: corre uma ronda sobre o seu shard."""
+    apply_overrides(overrides)
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    setup_logging(shard_index)
+    try:
+        with suppress(KeyboardInterrupt):
+            asyncio.run(_run_shard(shard_index, shard_count, result_queue))
+    finally:
+        close_logging()
+
+
+def _get_result(result_queue):
+    # Timeout curto para o thread do executor nunca ficar preso num get() após cancelamento
+    try:
+        return result_queue.get(timeout=0.5)
+    except queue.Empty:
         return None
 
 
-async def main():
+async def run_sharded_round(sink: LocalRoundSink, n_workers: int) -> Tuple[Set[str], int]:
+    """
+    Divide o ficheiro de entrada por `n_workers` processos (shard = crc32 da chave),
+    cada um com o seu loop e o seu limite de concorrência (limites de config / n_workers),
+    e junta os resultados neste processo, que é o único a escrever ficheiros.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    result_queue = ctx.Queue()
+    processes = [
+        ctx.Process(target=shard_main, args=(i, n_workers, CONFIG_OVERRIDES, result_queue), daemon=True)
+        for i in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+
+    loop = asyncio.get_running_loop()
+    seen: Set[str] = set()
+    due = 0
+    remaining = n_workers
+    try:
+        while remaining:
+            message = await loop.run_in_executor(None, _get_result, result_queue)
+            if message is None:
+                if not any(process.is_alive() for process in processes):
+                    raise RuntimeError("Os processos de verificação terminaram sem concluir a ronda")
+                continue
+            kind, payload = message
+            if kind == "events":
+                for event in payload:
+                    if event[0] == "checked":
+                        _, key, url, outcome, latency_ms, timings = event
+                        sink.checked(key, url, CheckResult(outcome, latency_ms, timings))
+                    elif event[0] == "limit":
+                        sink.set_limit(*event[1:])
+                    else:
+                        sink.carried(event[1])
+            elif kind == "done":
+                shard_seen, shard_due = payload
+                seen.update(shard_seen)
+                due += shard_due
+                remaining -= 1
+            elif kind == "error":
+                raise RuntimeError(payload)
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+    return seen, due
+
+
+async def main(n_workers: int = 1, once: bool = False):
     """Loop principal que lê, testa e guarda os proxies."""
     print("🚀 Iniciando verificação de proxies contra a API do Steam Market...", flush=True)
+    if n_workers > 1:
+        print(f"🧩 Modo multi-processo: {n_workers} workers.", flush=True)
     if CHECKER_DEBUG_MODE:
         print(f"🐛 MODO DEBUG ATIVO. Logs detalhados em '{CHECKER_DEBUG_LOG_FILE}'", flush=True)
-        with suppress(FileNotFoundError):
-            if os.path.exists(CHECKER_DEBUG_LOG_FILE):
-                os.remove(CHECKER_DEBUG_LOG_FILE)
+        for path in [debug_log_file()] + [debug_log_file(i) for i in range(n_workers if n_workers > 1 else 0)]:
+            with suppress(FileNotFoundError):
+                os.remove(path)
+        setup_logging()
+
+    history = create_history()
+    pusher = None
+    if CHECKER_PUSH_URL:
+        pusher = ResultPusher(CHECKER_PUSH_URL, CHECKER_PUSH_BATCH_SIZE, CHECKER_PUSH_FLUSH_SEC)
+        await pusher.start()
+        print(f"📡 Resultados enviados para {CHECKER_PUSH_URL}/ingest à medida que são verificados.", flush=True)
+    # Válidos da ronda anterior: na primeira, os do ficheiro de saída ou, sem ele, os do histórico
+    live: Optional[Set[str]] = None if CHECKER_OUTPUT_FILE else history.live_urls()
 
     while True:
         tasks = []
         try:
             timestamp = datetime.now().strftime("%H:%M:%S")
-            try:
-                with open(CHECKER_INPUT_FILE, "r", encoding="utf-8") as f:
-                    proxies_to_check = sorted(list(set(line.strip() for line in f if line.strip())))
-            except FileNotFoundError:
+            if not os.path.exists(CHECKER_INPUT_FILE):
                 print(f"[{timestamp}] Ficheiro '{CHECKER_INPUT_FILE}' não encontrado. Aguardando...", flush=True)
+                if once:
+                    break
                 await asyncio.sleep(CHECKER_LOOPSLEEP_SEC)
                 continue
-            if not proxies_to_check:
+            if os.path.getsize(CHECKER_INPUT_FILE) == 0:
                 print(f"[{timestamp}] Ficheiro '{CHECKER_INPUT_FILE}' está vazio. Verificando novamente...", flush=True)
+                if once:
+                    break
                 await asyncio.sleep(CHECKER_LOOPSLEEP_SEC)
                 continue
 
-            sem = asyncio.Semaphore(CHECKER_CONCURRENCY)
-            
-            # Criar todas as tarefas de uma vez
-            tasks = [asyncio.create_task(check_proxy(proxy, sem)) for proxy in proxies_to_check]
-            
-            validated_proxies = []
-            
-            # Usar tqdm com as_completed para a barra de progresso
-            progress_bar = tqdm(asyncio.as_completed(tasks), total=len(tasks), desc=f"[{timestamp}] Verificando", unit="proxy")
-            for task_future in progress_bar:
-                try:
-                    result = await task_future
-                    if result:
-                        validated_proxies.append(result)
-                    progress_bar.set_postfix({'Válidos': len(validated_proxies)})
-                except asyncio.CancelledError:
-                    # Se uma tarefa for cancelada, apenas o registamos e continuamos
-                    await log_debug("N/A", "CLEANUP", "Uma tarefa foi apanhada durante o cancelamento.")
-
-            # Escrita de resultados após a conclusão de todas as tarefas
+            writer = LiveOutputWriter(CHECKER_OUTPUT_FILE, live)
+            results = RoundResults(CHECKER_RESULTS_FILE)
+            progress_bar = tqdm(desc=f"[{timestamp}] Verificando", unit="proxy")
+            sink = LocalRoundSink(writer, history, results, progress_bar, pusher)
+            if n_workers > 1:
+                round_task = asyncio.create_task(run_sharded_round(sink, n_workers))
+            else:
+                round_task = asyncio.create_task(run_round(sink, history, create_limiter(), CHECKER_PREFILTER_CONCURRENCY))
+            flusher = asyncio.create_task(flush_periodically(writer))
+            tasks = [round_task, flusher]
+
+            try:
+                seen, total_checked = await round_task
+            except BaseException:
+                results.close(commit=False)
+                raise
+            finally:
+                flusher.cancel()
+                progress_bar.close()
+            results.close()
+
+            # Escrita final dos resultados da ronda
             timestamp_end = datetime.now().strftime("%H:%M:%S")
-            if validated_proxies:
-                print(f"\n[{timestamp_end}] {len(validated_proxies)} / {len(proxies_to_check)} proxies válidos ✅", flush=True)
-                temp_file = CHECKER_OUTPUT_FILE + ".tmp"
-                with open(temp_file, "w", encoding="utf-8") as f:
-                    f.write("\n".join(sorted(validated_proxies)))
-                os.replace(temp_file, CHECKER_OUTPUT_FILE)
+            if writer.validated:
+                print(f"\n[{timestamp_end}] {len(writer.validated)} / {len(seen)} proxies válidos ✅ "
+                      f"({total_checked} verificados nesta ronda)", flush=True)
             else:
                 print(f"\n[{timestamp_end}] Nenhum proxy válido encontrado ❌", flush=True)
-                with suppress(FileNotFoundError):
-                    if os.path.exists(CHECKER_OUTPUT_FILE):
-                        os.remove(CHECKER_OUTPUT_FILE)
+            summary = results.summary()
+            if summary:
+                print(f"⏱️  Latência por fase (proxies válidos):\n{summary}", flush=True)
+            await writer.finalize()
+            if pusher is not None:
+                # Os que saíram da entrada (ou mudaram de protocolo) também deixam o serviço
+                for url in writer.previous - writer.validated - sink.pushed_removals:
+                    pusher.remove(url)
+                if pusher.needs_sync:
+                    pusher.sync(writer.validated)
+                await pusher.flush()
+                if pusher.needs_sync:
+                    print(f"⚠️  Serviço inacessível em {CHECKER_PUSH_URL}; os resultados seguem quando voltar.", flush=True)
+            live = writer.validated
+            history.prune(seen)
+            await asyncio.to_thread(history.save)
                         
         except (KeyboardInterrupt, asyncio.CancelledError):
             print("\n🛑 Interrupção detetada. Cancelando tarefas pendentes de forma graciosa...", flush=True)
@@ -145,21 +725,55 @@ async def main():
                 task.cancel()
             # Esperar que todas as tarefas processem o cancelamento.
             await asyncio.gather(*tasks, return_exceptions=True)
+            # Guardar o que já foi verificado nesta ronda
+            with suppress(OSError):
+                history.save()
             print("✨ Limpeza concluída. A sair.", flush=True)
             break # Sai do loop while
 
         except Exception as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
             print(f"[{timestamp}] Erro geral no loop principal: {type(e).__name__}: {e}", flush=True)
-            
+
+        if once:
+            break
         print(f"⏳ Aguardando {CHECKER_LOOPSLEEP_SEC} segundos para a próxima ronda...\n", flush=True)
         await asyncio.sleep(CHECKER_LOOPSLEEP_SEC)
 
+    if pusher is not None:
+        await pusher.close()
+    close_logging()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Verifica proxies contra a API do Steam Market.")
+    parser.add_argument("--workers", type=int, default=CHECKER_WORKERS,
+                        help="Número de processos de verificação (cada um com o seu loop asyncio).")
+    parser.add_argument("--once", action="store_true", help="Fazer uma única ronda e sair.")
+    # As opções seguintes substituem os valores de config.py
+    parser.add_argument("--input", dest="CHECKER_INPUT_FILE", help="Ficheiro de entrada (CHECKER_INPUT_FILE).")
+    parser.add_argument("--output", dest="CHECKER_OUTPUT_FILE", help="Ficheiro de saída (CHECKER_OUTPUT_FILE); '' desativa.")
+    parser.add_argument("--history", dest="CHECKER_HISTORY_FILE", help="Ficheiro de histórico (CHECKER_HISTORY_FILE).")
+    parser.add_argument("--results", dest="CHECKER_RESULTS_FILE", help="Ficheiro de resultados por fase (CHECKER_RESULTS_FILE).")
+    parser.add_argument("--validation-url", dest="CHECKER_VALIDATION_URL", help="URL de validação (CHECKER_VALIDATION_URL).")
+    parser.add_argument("--concurrency", dest="CHECKER_CONCURRENCY", type=int,
+                        help="Verificações em simultâneo; limite inicial com concorrência adaptativa (CHECKER_CONCURRENCY).")
+    parser.add_argument("--timeout", dest="CHECKER_TIMEOUT_SEC", type=float,
+                        help="Timeout de cada verificação, em segundos (CHECKER_TIMEOUT_SEC).")
+    parser.add_argument("--push-url", dest="CHECKER_PUSH_URL",
+                        help="URL do serviço para onde enviar os resultados; '' desativa (CHECKER_PUSH_URL).")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
+    args = parse_args()
+    apply_overrides({name: value for name, value in vars(args).items() if name.startswith("CHECKER_") and value is not None})
     try:
         if sys.platform == "win32":
             asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-        asyncio.run(main())
+        asyncio.run(main(max(1, args.workers), args.once))
     except KeyboardInterrupt:
         # Este bloco serve apenas como uma segurança final, a lógica principal está no loop.
-        print("\n👋 Programa terminado.")
\ No newline at end of file
+        print("\n👋 Programa terminado.")
@@ -8,13 +8,213 @@
 REQUESTS_PER_PROXY = 22
 COOLDOWN_TIME_SECONDS = 301  # 5 minutos
 
+# Limite de pedidos por proxy (rate_limit.py): um token bucket com capacidade
+# PROXY_RATE_BURST (a rajada) e uma taxa de reposição aprendida, que começa em
+# PROXY_RATE_INITIAL. Cada sucesso soma PROXY_RATE_INCREASE à taxa, até
+# PROXY_RATE_MAX; cada resposta com um código de PROXY_RATE_LIMIT_STATUS (429)
+# multiplica-a por PROXY_RATE_DECREASE_FACTOR e esvazia o balde. Taxas em pedidos/s.
+#
+# Num intervalo de T segundos um proxy recebe no máximo PROXY_RATE_BURST +
+# PROXY_RATE_MAX * T pedidos (um proxy novo começa com PROXY_RATE_INITIAL_TOKENS,
+# no máximo a rajada). Os valores por omissão mantêm o teto da janela antiga,
+# REQUESTS_PER_PROXY pedidos em COOLDOWN_TIME_SECONDS: um quarto em rajada (uma
+# sessão faz até 5 pedidos seguidos no mesmo proxy) e o resto reposto ao longo da
+# janela (5 + 17 = 22 em 301 s); a taxa aprendida só desce com os 429 e volta a
+# subir até ao valor inicial. Uma rajada maior tira taxa à reposição (com 11, só
+# 11 por janela a longo prazo). Rajadas acima do teto são opcionais: subir
+# PROXY_RATE_BURST e/ou PROXY_RATE_MAX (ex.: PROXY_RATE_INITIAL * 4, para deixar a
+# taxa aprendida passar a da janela antiga) aumenta-o pela fórmula acima. Um balde
+# vazio só espera por um token (1 / taxa, ~18 s), não COOLDOWN_TIME_SECONDS.
+PROXY_RATE_BURST = REQUESTS_PER_PROXY // 4
+PROXY_RATE_INITIAL_TOKENS = PROXY_RATE_BURST
+PROXY_RATE_INITIAL = (REQUESTS_PER_PROXY - PROXY_RATE_BURST) / COOLDOWN_TIME_SECONDS
+PROXY_RATE_MIN = PROXY_RATE_INITIAL / 8
+PROXY_RATE_MAX = PROXY_RATE_INITIAL
+PROXY_RATE_INCREASE = PROXY_RATE_INITIAL / 100
+PROXY_RATE_DECREASE_FACTOR = 0.5
+PROXY_RATE_LIMIT_STATUS = (429,)
+# Cooldown depois de um 429 e depois de uma falha (proxy avariado); cada um
+# duplica a cada 429 / falha seguida, até PROXY_COOLDOWN_MAX_SEC.
+PROXY_RATE_LIMITED_COOLDOWN_SEC = COOLDOWN_TIME_SECONDS
+PROXY_FAILURE_COOLDOWN_SEC = 60
+PROXY_COOLDOWN_MAX_SEC = 3600
+
+# Afinidade sessão -> proxy: no máximo SESSION_MAX_COUNT sessões (as menos usadas
+# saem primeiro); sessões sem pedidos há mais de SESSION_IDLE_TTL_SECONDS expiram.
+SESSION_MAX_COUNT = 100_000
+SESSION_IDLE_TTL_SECONDS = 1800
+
+# Vários workers (python proxy_manager_service.py --workers N): o pool fica num
+# processo coordenador e os workers ligam-se a ele por este socket Unix, ou por
+# TCP em 127.0.0.1:POOL_COORDINATOR_TCP_PORT no Windows.
+POOL_COORDINATOR_SOCKET = "proxy_pool.sock"
+POOL_COORDINATOR_TCP_PORT = 8790
+
+# Estratégia usada para escolher um proxy novo para uma sessão:
+# "p2c" (power-of-two-choices), "weighted_random", "least_in_flight" ou "first".
+PROXY_SELECTION_STRATEGY = "p2c"
+# Peso das novas medições nas médias móveis de latência e taxa de sucesso
+PROXY_STATS_EWMA_ALPHA = 0.3
+# Um pedido entregue e nunca reportado (cliente que caiu, forward proxy sem
+# relatório) deixa de contar como "em curso" ao fim deste tempo; senão o custo do
+# proxy ficava inflacionado para sempre e as estratégias deixavam de o escolher.
+PROXY_IN_FLIGHT_LEASE_SEC = 120
+
+
+# Forward proxy rotativo (forward_proxy.py): o serviço também aceita ligações
+# HTTP CONNECT / SOCKS5 e escolhe um upstream do pool para cada uma. A sessão
+# vem do cabeçalho abaixo ou do utilizador da autenticação do proxy.
+FORWARD_PROXY_ENABLED = False
+FORWARD_PROXY_HOST = "127.0.0.1"
+FORWARD_PROXY_PORT = 8899
+FORWARD_PROXY_SESSION_HEADER = "X-Proxy-Session"
+FORWARD_PROXY_CONNECT_TIMEOUT_SEC = 5
+FORWARD_PROXY_MAX_ATTEMPTS = 3  # Upstreams tentados por ligação antes de desistir
+FORWARD_PROXY_IDLE_TIMEOUT_SEC = 300  # Ligação fechada sem tráfego em nenhum sentido durante este tempo
+
+# Logs do serviço: nível mínimo ("DEBUG" inclui um registo por pedido) e ficheiro
+# (None escreve só na consola). A consola recebe sempre os registos. Com --workers
+# só o coordenador escreve no ficheiro; os workers escrevem só na consola.
+SERVICE_LOG_LEVEL = "INFO"
+SERVICE_LOG_FILE = "proxy_service.log"
+
+# Métricas em GET /metrics (formato do Prometheus); o resumo antigo fica em
+# /metrics/summary. Com o profiler ativo, POST /admin/profiler/start liga um
+# profiler por amostragem do event loop, que se desliga sozinho ao fim de
+# SERVICE_PROFILER_MAX_SECONDS (GET /admin/profiler devolve as pilhas).
+SERVICE_PROFILER_ENABLED = False
+SERVICE_PROFILER_MAX_SECONDS = 300
+
+# POST /ingest recebe do checker os proxies validados/removidos e as latências
+# (ver CHECKER_PUSH_URL). Por omissão só aceita pedidos da própria máquina.
+SERVICE_INGEST_ALLOW_REMOTE = False
+
+# Revalidação ativa (revalidator.py; precisa de aiohttp e aiohttp_socks): os
+# proxies em cooldown por uma falha são sondados SERVICE_REVALIDATION_LEAD_SEC
+# antes do fim do cooldown ou, a partir de SERVICE_REVALIDATION_FAILURES falhas
+# seguidas, logo a seguir. Um proxy saudável volta logo ao pool; um que falhe a
+# sonda com SERVICE_REVALIDATION_EVICT_FAILURES falhas seguidas é retirado. Volta
+# só quando o checker o validar de novo: um "add" em POST /ingest (CHECKER_PUSH_URL)
+# ou a linha a voltar a entrar no ficheiro de proxies depois de ter saído (as
+# reescritas a meio da ronda, que mantêm as linhas antigas, não o trazem de volta).
+# O pedido é o do checker (SERVICE_REVALIDATION_URL None usa CHECKER_VALIDATION_URL).
+SERVICE_REVALIDATION_ENABLED = True
+SERVICE_REVALIDATION_URL = None
+SERVICE_REVALIDATION_CONCURRENCY = 20
+SERVICE_REVALIDATION_TIMEOUT_SEC = 4
+SERVICE_REVALIDATION_INTERVAL_SEC = 1  # Período da procura de sondas na hora
+SERVICE_REVALIDATION_LEAD_SEC = 15
+SERVICE_REVALIDATION_FAILURES = 2
+SERVICE_REVALIDATION_EVICT_FAILURES = 4
+
+
+# =======================================================
+# --- CLIENTE DO SERVIÇO (proxy_client.py) ---
+# =======================================================
+
+PROXY_SERVICE_URL = "http://127.0.0.1:8000"
+# Os relatórios de uso são acumulados e enviados em lote ao atingir este
+# número de relatórios ou ao fim deste intervalo, o que acontecer primeiro.
+PROXY_CLIENT_REPORT_BATCH_SIZE = 100
+PROXY_CLIENT_REPORT_FLUSH_SEC = 1.0
+
+
+# =======================================================
+# --- LOGS (async_logger.py, usado pelo serviço e pelo checker) ---
+# =======================================================
+
+# Os registos vão para uma fila em memória e um único thread escreve-os em lote
+LOG_FORMAT = "text"  # "text" (uma linha legível) ou "json" (uma linha JSON por registo)
+LOG_FLUSH_INTERVAL_SEC = 0.5
+LOG_MAX_BYTES = 10 * 1024 * 1024  # Roda o ficheiro ao atingir este tamanho
+LOG_BACKUP_COUNT = 3  # Ficheiros antigos mantidos (.1, .2, ...)
+
+
+# =======================================================
+# --- DETEÇÃO DE PROTOCOLO (utils.py) ---
+# =======================================================
+
+# Linhas 'ip:porto' sem protocolo são sondadas (HTTP CONNECT / SOCKS5 / SOCKS4)
+# para descobrir o protocolo, em vez de gerar um Proxy por cada protocolo.
+PROXY_SNIFF_TIMEOUT_SEC = 2
+PROXY_SNIFF_CONCURRENCY = 500
+
+
+# =======================================================
+# --- RECOLHA DE PROXIES (proxy_harvester.py) ---
+# =======================================================
+
+# Listas públicas descarregadas em paralelo a cada HARVESTER_INTERVAL_SEC; as
+# linhas 'ip:porto' ficam com o protocolo da lista. Só os proxies que ainda não
+# estão no ficheiro de saída (a entrada do checker) lhe são acrescentados.
+HARVESTER_SOURCES = {
+    "http": [
+        "https://api.proxyscrape.com/v2/?request=displayproxies&protocol=http",
+        "https://raw.githubusercontent.com/zloi-user/hideip.me/main/http.txt",
+        "https://raw.githubusercontent.com/zloi-user/hideip.me/main/https.txt",
+        "https://raw.githubusercontent.com/BreakingTechFr/Proxy_Free/main/proxies/http.txt",
+        "https://raw.githubusercontent.com/ErcinDedeoglu/proxies/main/proxies/http.txt",
+        "https://raw.githubusercontent.com/ErcinDedeoglu/proxies/main/proxies/https.txt",
+        "https://raw.githubusercontent.com/proxifly/free-proxy-list/main/proxies/protocols/http/data.txt",
+        "https://yakumo.rei.my.id/HTTP",
+        "https://raw.githubusercontent.com/vakhov/fresh-proxy-list/master/http.txt",
+        "https://raw.githubusercontent.com/vakhov/fresh-proxy-list/master/https.txt",
+        "https://raw.githubusercontent.com/officialputuid/KangProxy/KangProxy/http/http.txt",
+        "https://raw.githubusercontent.com/officialputuid/KangProxy/KangProxy/https/https.txt",
+        "https://sunny9577.github.io/proxy-scraper/generated/http_proxies.txt",
+        "https://raw.githubusercontent.com/TheSpeedX/SOCKS-List/master/http.txt",
+    ],
+    "socks4": [
+        "https://api.proxyscrape.com/v2/?request=displayproxies&protocol=socks4",
+        "https://raw.githubusercontent.com/zloi-user/hideip.me/main/socks4.txt",
+        "https://raw.githubusercontent.com/BreakingTechFr/Proxy_Free/main/proxies/socks4.txt",
+        "https://raw.githubusercontent.com/ErcinDedeoglu/proxies/main/proxies/socks4.txt",
+        "https://raw.githubusercontent.com/proxifly/free-proxy-list/main/proxies/protocols/socks4/data.txt",
+        "https://yakumo.rei.my.id/SOCKS4",
+        "https://raw.githubusercontent.com/vakhov/fresh-proxy-list/master/socks4.txt",
+        "https://raw.githubusercontent.com/officialputuid/KangProxy/KangProxy/socks4/socks4.txt",
+        "https://sunny9577.github.io/proxy-scraper/generated/socks4_proxies.txt",
+        "https://raw.githubusercontent.com/TheSpeedX/SOCKS-List/master/socks4.txt",
+    ],
+    "socks5": [
+        "https://api.proxyscrape.com/v2/?request=displayproxies&protocol=socks5",
+        "https://raw.githubusercontent.com/zloi-user/hideip.me/main/socks5.txt",
+        "https://raw.githubusercontent.com/hookzof/socks5_list/master/proxy.txt",
+        "https://raw.githubusercontent.com/BreakingTechFr/Proxy_Free/main/proxies/socks5.txt",
+        "https://raw.githubusercontent.com/ErcinDedeoglu/proxies/main/proxies/socks5.txt",
+        "https://raw.githubusercontent.com/proxifly/free-proxy-list/main/proxies/protocols/socks5/data.txt",
+        "https://yakumo.rei.my.id/SOCKS5",
+        "https://raw.githubusercontent.com/vakhov/fresh-proxy-list/master/socks5.txt",
+        "https://raw.githubusercontent.com/officialputuid/KangProxy/KangProxy/socks5/socks5.txt",
+        "https://sunny9577.github.io/proxy-scraper/generated/socks5_proxies.txt",
+        "https://raw.githubusercontent.com/TheSpeedX/SOCKS-List/master/socks5.txt",
+    ],
+}
+HARVESTER_OUTPUT_FILE = r".\live.txt"  # O mesmo que CHECKER_INPUT_FILE
+HARVESTER_INTERVAL_SEC = 60
+HARVESTER_CONCURRENCY = 16  # Descargas em simultâneo (ligações reutilizadas entre rondas)
+HARVESTER_TIMEOUT_SEC = 20
+# Máximo de proxies no ficheiro de saída: acima disto é reescrito só com os mais
+# recentes (as linhas mais antigas são as que as listas publicaram há mais tempo;
+# se voltarem a aparecer numa lista, entram de novo). None não limita.
+HARVESTER_MAX_LINES = 100000
+# ETag / Last-Modified de cada fonte, para pedidos condicionais (uma lista que
+# não mudou responde 304 sem corpo) também depois de reiniciar
+HARVESTER_CACHE_FILE = r".\harvester_cache.json"
+HARVESTER_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36"
+
 
 # =======================================================
 # --- CONFIGURAÇÕES DO PROXY CHECKER (check_steam_proxies.py) ---
 # =======================================================
 
 CHECKER_INPUT_FILE = r".\live.txt"
+# Cópia em ficheiro dos proxies válidos (lida pelo serviço no arranque e por
+# polling). Com CHECKER_PUSH_URL é só um espelho durável; None desativa-o.
 CHECKER_OUTPUT_FILE = r".\steam_live.txt"
+# Resultado de cada verificação da última ronda, com a duração de cada fase
+# (tcp, handshake, tls, ttfb, corpo...), uma linha JSON por proxy. None desativa.
+CHECKER_RESULTS_FILE = r".\steam_live_results.jsonl"
 
 CHECKER_VALIDATION_URL = "https://steamcommunity.com/market/search/render/?query=&start=10&count=10&search_descriptions=0&sort_column=popular&sort_dir=desc"
 
@@ -35,6 +235,63 @@ CHECKER_HEADERS = {
 CHECKER_CONCURRENCY = 500
 CHECKER_TIMEOUT_SEC = 4
 CHECKER_LOOPSLEEP_SEC = 2
+# Intervalo (segundos) entre escritas atómicas do ficheiro de saída durante uma ronda,
+# para que o serviço receba os proxies validados sem esperar pelo fim da ronda.
+CHECKER_FLUSH_INTERVAL_SEC = 5
+
+# Envio direto dos resultados para o serviço (POST /ingest em PROXY_SERVICE_URL):
+# cada proxy validado, removido ou com latência nova chega ao pool em
+# CHECKER_PUSH_FLUSH_SEC, sem esperar pelo ficheiro. None desativa o envio.
+CHECKER_PUSH_URL = PROXY_SERVICE_URL
+CHECKER_PUSH_BATCH_SIZE = 500
+CHECKER_PUSH_FLUSH_SEC = 0.2
+
+# Número de processos de verificação (equivalente a --workers). Com mais de um,
+# a entrada é dividida entre processos, cada um com o seu loop asyncio e com
+# uma parte igual (1 / CHECKER_WORKERS) dos limites de concorrência.
+CHECKER_WORKERS = 1
+
+# --- CONCORRÊNCIA ADAPTATIVA (AIMD) ---
+# Com CHECKER_ADAPTIVE_CONCURRENCY, CHECKER_CONCURRENCY é apenas o limite inicial:
+# a cada CHECKER_AIMD_INTERVAL_SEC o limite sobe CHECKER_AIMD_INCREASE (se estiver
+# a ser usado) ou é multiplicado por CHECKER_AIMD_DECREASE_FACTOR quando há erros
+# locais de sockets (EMFILE/ENOBUFS), lag do event loop acima de
+# CHECKER_AIMD_MAX_LOOP_LAG_MS ou a taxa de timeouts sobe mais de
+# CHECKER_AIMD_TIMEOUT_MARGIN acima da taxa de base. Fica sempre entre
+# CHECKER_CONCURRENCY_MIN e CHECKER_CONCURRENCY_MAX.
+CHECKER_ADAPTIVE_CONCURRENCY = True
+CHECKER_CONCURRENCY_MIN = 50
+CHECKER_CONCURRENCY_MAX = 1500
+CHECKER_AIMD_INTERVAL_SEC = 1.0
+CHECKER_AIMD_INCREASE = 10
+CHECKER_AIMD_DECREASE_FACTOR = 0.7
+CHECKER_AIMD_MAX_LOOP_LAG_MS = 100
+CHECKER_AIMD_TIMEOUT_MARGIN = 0.15
+
+# --- REVERIFICAÇÃO ADAPTATIVA ---
+# O resultado de cada verificação fica guardado em CHECKER_HISTORY_FILE e cada
+# ronda só verifica os proxies cuja próxima verificação já chegou:
+#  - vivos: entre CHECKER_RECHECK_LIVE_MAX_SEC (rápidos) e CHECKER_RECHECK_LIVE_MIN_SEC
+#    (latência igual ou acima de CHECKER_RECHECK_MARGINAL_RATIO x CHECKER_TIMEOUT_SEC);
+#  - mortos: CHECKER_RECHECK_DEAD_BASE_SEC, a duplicar a cada falha seguida,
+#    até CHECKER_RECHECK_DEAD_MAX_SEC.
+CHECKER_HISTORY_FILE = r".\steam_check_history.json"
+CHECKER_RECHECK_LIVE_MIN_SEC = 30
+CHECKER_RECHECK_LIVE_MAX_SEC = 300
+CHECKER_RECHECK_MARGINAL_RATIO = 0.6
+CHECKER_RECHECK_DEAD_BASE_SEC = 60
+CHECKER_RECHECK_DEAD_MAX_SEC = 6 * 3600
+
+# --- PRÉ-FILTRO (primeira fase) ---
+# Antes do pedido à Steam, cada proxy passa por uma ligação TCP + handshake
+# do protocolo (saudação SOCKS4/5 ou HTTP CONNECT), com timeout curto e muito
+# mais concorrência. Só os que respondem seguem para a verificação completa.
+# O pré-filtro deteta também o protocolo de cada ip:porto, pelo que linhas
+# repetidas com protocolos diferentes (ou sem protocolo) são verificadas uma vez.
+# Nota: no Windows o loop "selector" está limitado a ~512 sockets em simultâneo.
+CHECKER_PREFILTER_ENABLED = True
+CHECKER_PREFILTER_CONCURRENCY = 1500
+CHECKER_PREFILTER_TIMEOUT_SEC = 2
 
 # A variável CHECKER_RETRY_COUNT não é usada na versão atual do script aiohttp,
 # mas pode ser mantida aqui para uso futuro.
@@ -42,4 +299,4 @@ CHECKER_RETRY_COUNT = 1
 
 # --- MODO DE DEPURAÇÃO ---
 CHECKER_DEBUG_MODE = False
-CHECKER_DEBUG_LOG_FILE = "steam_debug.log"
\ No newline at end of file
+CHECKER_DEBUG_LOG_FILE = "steam_debug.log"  # No modo --workers, cada processo escreve em steam_debug.shardN.log
\ No newline at end of file
@@ -0,0 +1,421 @@
+# proxy_steam_manager/forward_proxy.py
+
+"""
+Forward proxy rotativo embutido no serviço (HTTP CONNECT, HTTP simples e SOCKS5).
+
+Os clientes usam o serviço diretamente como proxy; para cada ligação é escolhido
+um upstream do ProxyPool, é aberto o túnel até ao destino através dele e os
+dados são reencaminhados nos dois sentidos. O uso é reportado ao pool quando o
+upstream não consegue abrir o túnel (falha, e tenta-se outro) e no fim da
+ligação: falha se a leitura do upstream deu erro (ex.: ligação reposta) ou se o
+cliente enviou dados e o upstream fechou sem devolver nenhum; sucesso nos outros
+casos. É um resultado grosseiro: o conteúdo vai cifrado (TLS) dentro do túnel,
+por isso uma página 429/403 da Steam conta como sucesso. Uma ligação em que
+nenhum dos sentidos recebe dados durante `idle_timeout_sec` é fechada.
+
+Os pedidos HTTP simples (sem CONNECT) são reescritos sem os cabeçalhos dirigidos
+ao proxy e com "Connection: close": cada ligação leva um só pedido ao destino
+(com o corpo, se tiver) e termina com a resposta. Um segundo pedido na mesma
+ligação não é reencaminhado; o cliente vê a ligação fechar e repete-o noutra.
+
+Sessões (proxy fixo entre ligações, como em /acquire_proxy):
+  - HTTP: cabeçalho FORWARD_PROXY_SESSION_HEADER ou o utilizador do
+    Proxy-Authorization (Basic); a palavra-passe é ignorada;
+  - SOCKS5: o utilizador da autenticação utilizador/palavra-passe.
+Sem sessão, cada ligação recebe um proxy escolhido pela estratégia do pool.
+"""
+
+import asyncio
+import base64
+import ipaddress
+import struct
+import time
+from contextlib import suppress
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from async_logger import AsyncLogger
+from proxy_probe import ProxyProbeError, open_tunnel
+
+# Cabeçalhos só para o proxy, que não seguem para o destino
+HOP_HEADERS = {b"proxy-authorization", b"proxy-connection"}
+RELAY_CHUNK_SIZE = 64 * 1024
+MAX_HEAD_SIZE = 64 * 1024
+
+SOCKS5_NO_AUTH = 0x00
+SOCKS5_USER_PASS = 0x02
+SOCKS5_NO_ACCEPTABLE = 0xFF
+SOCKS5_GENERAL_FAILURE = 0x01
+SOCKS5_HOST_UNREACHABLE = 0x04
+SOCKS5_CMD_NOT_SUPPORTED = 0x07
+SOCKS5_ATYP_NOT_SUPPORTED = 0x08
+
+
+class NoUpstreamError(Exception):
+    """Não há proxies prontos no pool."""
+
+
+class UpstreamFailedError(Exception):
+    """Todas as tentativas de abrir o túnel através de um upstream falharam."""
+
+
+class ClientProtocolError(Exception):
+    """O cliente enviou um pedido que o forward proxy não entende."""
+
+
+class IdleTimer:
+    """
+    Inatividade de uma ligação, partilhada pelos dois sentidos do reencaminhamento:
+    um sentido parado (ex.: o cliente só recebe uma descarga longa) não fecha a
+    ligação enquanto o outro tiver tráfego.
+    """
+
+    def __init__(self, timeout_sec: float):
+        self.timeout_sec = timeout_sec
+        self.last_activity = time.monotonic()
+
+    async def read(self, reader: asyncio.StreamReader, size: int) -> bytes:
+        """reader.read(size); levanta asyncio.TimeoutError sem tráfego em nenhum sentido durante timeout_sec."""
+        while True:
+            remaining = self.last_activity + self.timeout_sec - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            try:
+                data = await asyncio.wait_for(reader.read(size), remaining)
+            except asyncio.TimeoutError:
+                continue  # Voltar a ver se o outro sentido teve tráfego entretanto
+            self.last_activity = time.monotonic()
+            return data
+
+
+async def relay(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                idle: Optional[IdleTimer] = None) -> Tuple[int, bool]:
+    """
+    Copia de `reader` para `writer` até EOF (ou até `idle` expirar), respeitando
+    o controlo de fluxo (drain). Em asyncio puro não há splice/sendfile entre
+    sockets: cada bloco passa uma vez pelo espaço do utilizador, em pedaços de
+    RELAY_CHUNK_SIZE. Devolve (bytes copiados, se a leitura de `reader` terminou com erro).
+    """
+    copied = 0
+    try:
+        while True:
+            try:
+                if idle is None:
+                    data = await reader.read(RELAY_CHUNK_SIZE)
+                else:
+                    data = await idle.read(reader, RELAY_CHUNK_SIZE)
+            except asyncio.TimeoutError:
+                break
+            except (ConnectionError, OSError):
+                return copied, True
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+            copied += len(data)
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        with suppress(Exception):
+            if writer.can_write_eof():
+                writer.write_eof()
+    return copied, False
+
+
+async def send_request_body(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: Dict[bytes, bytes],
+                            idle: Optional[IdleTimer] = None) -> Tuple[int, bool]:
+    """
+    Copia só o corpo do pedido HTTP/1.1 cujo cabeçalho já foi lido (Content-Length
+    ou chunked), sem ler o pedido seguinte da mesma ligação. Devolve (bytes
+    copiados, se o cliente falhou a meio: corpo incompleto, mal formado ou parado).
+    """
+    async def read_line() -> bytes:
+        line = await reader.readuntil(b"\r\n") if idle is None else \
+            await asyncio.wait_for(reader.readuntil(b"\r\n"), idle.timeout_sec)
+        writer.write(line)
+        return line
+
+    async def copy_exactly(size: int):
+        while size:
+            data = await reader.read(min(size, RELAY_CHUNK_SIZE)) if idle is None else \
+                await idle.read(reader, min(size, RELAY_CHUNK_SIZE))
+            if not data:
+                raise asyncio.IncompleteReadError(b"", size)
+            writer.write(data)
+            await writer.drain()
+            size -= len(data)
+
+    copied = 0
+    try:
+        if b"chunked" not in headers.get(b"transfer-encoding", b"").lower():
+            size = int(headers.get(b"content-length", b"0") or 0)
+            await copy_exactly(size)
+            return size, False
+        while True:
+            size_line = await read_line()
+            copied += len(size_line)
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                break
+            await copy_exactly(size + 2)  # O bloco e o \r\n que o termina
+            copied += size + 2
+        # Os trailers (se houver) acabam numa linha vazia
+        while True:
+            line = await read_line()
+            copied += len(line)
+            if line == b"\r\n":
+                break
+        await writer.drain()
+        return copied, False
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ValueError,
+            ConnectionError, OSError):
+        return copied, True
+
+
+def _session_from_basic_auth(value: str) -> Optional[str]:
+    scheme, _, credentials = value.partition(" ")
+    if scheme.lower() != "basic" or not credentials:
+        return None
+    try:
+        decoded = base64.b64decode(credentials.strip()).decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return decoded.split(":", 1)[0] or None
+
+
+def _parse_head(head: bytes) -> Tuple[str, str, str, Dict[bytes, bytes], list]:
+    """Devolve (método, alvo, versão, cabeçalhos em minúsculas, linhas de cabeçalho originais)."""
+    lines = head.split(b"\r\n")
+    try:
+        method, target, version = lines[0].decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise ClientProtocolError(f"Linha de pedido inválida: {lines[0][:60]!r}")
+    header_lines = [line for line in lines[1:] if line]
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(b":")
+        headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers, header_lines
+
+
+class ForwardProxyServer:
+    """
+    `pool` é o backend do pool (pool_backend.py), o mesmo que os endpoints usam.
+    """
+
+    def __init__(self, pool, logger: AsyncLogger, host: str, port: int, session_header: str,
+                 connect_timeout_sec: float, max_attempts: int, idle_timeout_sec: Optional[float] = None):
+        self.pool = pool
+        self.logger = logger
+        self.host = host
+        self.port = port
+        self.session_header = session_header.lower().encode("latin-1")
+        self.connect_timeout_sec = connect_timeout_sec
+        self.max_attempts = max(1, max_attempts)
+        self.idle_timeout_sec = idle_timeout_sec  # None: sem limite de inatividade
+        self.active_connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port, limit=MAX_HEAD_SIZE)
+        self.logger.info("FORWARD_PROXY_STARTED", "Forward proxy à escuta (HTTP CONNECT / SOCKS5)",
+                         host=self.host, port=self.port)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    # --- Upstreams ---
+
+    async def _connect_upstream(self, session_id: Optional[str], target_host: str, target_port: int):
+        """
+        Abre o túnel através de um proxy do pool, tentando outro quando o upstream
+        falha (a falha é reportada, o que o põe em cooldown e o tira dos prontos).
+        Devolve (chave do proxy, reader, writer, latência do túnel em ms).
+        """
+        last_error: Optional[Exception] = None
+        for _ in range(self.max_attempts):
+            proxy = await self.pool.acquire(session_id)
+            if proxy is None:
+                break
+            proxy_key = proxy.key_str
+            try:
+                reader, writer, timing = await open_tunnel(
+                    proxy.protocol, proxy.ip, proxy.port, target_host, target_port, self.connect_timeout_sec)
+            except (ProxyProbeError, OSError, asyncio.TimeoutError) as e:
+                last_error = e
+                await self.pool.report(proxy_key, False)
+                self.logger.debug("FORWARD_UPSTREAM_FAIL", f"{type(e).__name__}: {e}", proxy=proxy_key,
+                                  target=f"{target_host}:{target_port}")
+                continue
+            except BaseException:
+                await self.pool.report(proxy_key, False)
+                raise
+            return proxy_key, reader, writer, timing.connect_ms + timing.handshake_ms
+        if last_error is None:
+            raise NoUpstreamError("Nenhum proxy disponível no momento.")
+        raise UpstreamFailedError(f"Falharam {self.max_attempts} upstreams; último erro: {type(last_error).__name__}: {last_error}")
+
+    async def _bridge(self, proxy_key: str, latency_ms: float, client_reader, client_writer, upstream_reader,
+                      upstream_writer, request: bytes = b"", request_headers: Optional[Dict[bytes, bytes]] = None):
+        """
+        Reencaminha nos dois sentidos e reporta o uso. Com `request_headers` (pedido
+        HTTP simples) o cliente só envia `request` e o corpo desse pedido; o resto
+        da ligação não segue para o destino.
+        """
+        success = False  # Se o reencaminhamento levantar uma exceção
+        idle = IdleTimer(self.idle_timeout_sec) if self.idle_timeout_sec else None
+        try:
+            if request:
+                upstream_writer.write(request)
+            if request_headers is None:
+                client_side = relay(client_reader, upstream_writer, idle)
+            else:
+                client_side = self._send_request_body(client_reader, upstream_writer, request_headers, idle)
+            (sent, client_error), (received, upstream_error) = await asyncio.gather(
+                client_side, relay(upstream_reader, client_writer, idle))
+            sent += len(request)
+            if request_headers is not None and client_error:
+                success = True  # O cliente não acabou de enviar o pedido: o upstream não tem culpa
+            else:
+                # Grosseiro (ver a docstring do módulo): só se vê se o upstream respondeu
+                success = not upstream_error and (received > 0 or sent == 0)
+        finally:
+            upstream_writer.close()
+            # Com sucesso, a latência reportada é a da abertura do túnel
+            await self.pool.report(proxy_key, success, latency_ms if success else None)
+
+    @staticmethod
+    async def _send_request_body(client_reader, upstream_writer, headers: Dict[bytes, bytes],
+                                 idle: Optional[IdleTimer]) -> Tuple[int, bool]:
+        sent, client_error = await send_request_body(client_reader, upstream_writer, headers, idle)
+        if client_error:
+            upstream_writer.close()  # O destino ficaria à espera do resto do corpo
+        return sent, client_error
+
+    # --- Clientes ---
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.active_connections += 1
+        try:
+            first = await reader.readexactly(1)
+            if first == b"\x05":
+                await self._handle_socks5(reader, writer)
+            else:
+                await self._handle_http(first, reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ClientProtocolError as e:
+            self.logger.debug("FORWARD_BAD_REQUEST", str(e))
+        except Exception as e:
+            self.logger.error("FORWARD_ERROR", f"{type(e).__name__}: {e}")
+        finally:
+            self.active_connections -= 1
+            writer.close()
+            with suppress(Exception):
+                await writer.wait_closed()
+
+    async def _handle_http(self, first: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = first + await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            writer.write(b"HTTP/1.1 431 Request Header Fields Too Large\r\nConnection: close\r\n\r\n")
+            return
+        method, target, version, headers, header_lines = _parse_head(head[:-4])
+
+        session_id = headers.get(self.session_header, b"").decode("latin-1") or None
+        if session_id is None and b"proxy-authorization" in headers:
+            session_id = _session_from_basic_auth(headers[b"proxy-authorization"].decode("latin-1"))
+
+        if method.upper() == "CONNECT":
+            host, _, port = target.rpartition(":")
+            initial = b""
+            request_headers = None
+        else:
+            # Pedido HTTP simples em forma absoluta: túnel até ao destino e o pedido
+            # reescrito em forma de origem, sem os cabeçalhos dirigidos ao proxy (nem
+            # os que o Connection do cliente lista) e com "Connection: close", para o
+            # destino fechar depois da resposta (ver a docstring do módulo)
+            parts = urlsplit(target)
+            content_length = headers.get(b"content-length", b"0").strip()
+            if parts.scheme.lower() != "http" or not parts.hostname or not content_length.isdigit():
+                writer.write(b"HTTP/1.1 400 Bad Request\r\nConnection: close\r\n\r\n")
+                return
+            host, port = parts.hostname, str(parts.port or 80)
+            path = parts.path or "/"
+            if parts.query:
+                path += "?" + parts.query
+            dropped = HOP_HEADERS | {self.session_header, b"connection", b"keep-alive"}
+            dropped |= {name.strip().lower() for name in headers.get(b"connection", b"").split(b",")}
+            kept = [line for line in header_lines if line.partition(b":")[0].strip().lower() not in dropped]
+            kept.append(b"Connection: close")
+            initial = f"{method} {path} {version}\r\n".encode("latin-1") + b"\r\n".join(kept) + b"\r\n\r\n"
+            request_headers = headers
+        host = host.strip("[]")
+        if not host or not port.isdigit():
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nConnection: close\r\n\r\n")
+            return
+
+        try:
+            proxy_key, upstream_reader, upstream_writer, latency_ms = await self._connect_upstream(session_id, host, int(port))
+        except (NoUpstreamError, UpstreamFailedError) as e:
+            status = "503 Service Unavailable" if isinstance(e, NoUpstreamError) else "502 Bad Gateway"
+            writer.write(f"HTTP/1.1 {status}\r\nConnection: close\r\nContent-Length: 0\r\n\r\n".encode())
+            self.logger.debug("FORWARD_NO_UPSTREAM", str(e), target=f"{host}:{port}", session=session_id)
+            return
+        if not initial:
+            writer.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+        await self._bridge(proxy_key, latency_ms, reader, writer, upstream_reader, upstream_writer, initial,
+                           request_headers)
+
+    async def _handle_socks5(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        n_methods = (await reader.readexactly(1))[0]
+        methods = await reader.readexactly(n_methods)
+        session_id = None
+        if SOCKS5_USER_PASS in methods:
+            # Utilizador/palavra-passe (RFC 1929): o utilizador é a sessão
+            writer.write(bytes([0x05, SOCKS5_USER_PASS]))
+            await writer.drain()
+            version, user_len = await reader.readexactly(2)
+            username = await reader.readexactly(user_len)
+            password_len = (await reader.readexactly(1))[0]
+            await reader.readexactly(password_len)
+            writer.write(b"\x01\x00")
+            session_id = username.decode("utf-8", errors="replace") or None
+        elif SOCKS5_NO_AUTH in methods:
+            writer.write(bytes([0x05, SOCKS5_NO_AUTH]))
+        else:
+            writer.write(bytes([0x05, SOCKS5_NO_ACCEPTABLE]))
+            return
+
+        version, command, _, address_type = await reader.readexactly(4)
+        if address_type == 0x01:
+            host = str(ipaddress.IPv4Address(await reader.readexactly(4)))
+        elif address_type == 0x03:
+            host = (await reader.readexactly((await reader.readexactly(1))[0])).decode("idna")
+        elif address_type == 0x04:
+            host = str(ipaddress.IPv6Address(await reader.readexactly(16)))
+        else:
+            writer.write(self._socks5_reply(SOCKS5_ATYP_NOT_SUPPORTED))
+            return
+        port = struct.unpack(">H", await reader.readexactly(2))[0]
+        if command != 0x01:
+            writer.write(self._socks5_reply(SOCKS5_CMD_NOT_SUPPORTED))
+            return
+
+        try:
+            proxy_key, upstream_reader, upstream_writer, latency_ms = await self._connect_upstream(session_id, host, port)
+        except (NoUpstreamError, UpstreamFailedError) as e:
+            no_proxies = isinstance(e, NoUpstreamError)
+            writer.write(self._socks5_reply(SOCKS5_GENERAL_FAILURE if no_proxies else SOCKS5_HOST_UNREACHABLE))
+            self.logger.debug("FORWARD_NO_UPSTREAM", str(e), target=f"{host}:{port}", session=session_id)
+            return
+        writer.write(self._socks5_reply(0x00))
+        await self._bridge(proxy_key, latency_ms, reader, writer, upstream_reader, upstream_writer)
+
+    @staticmethod
+    def _socks5_reply(code: int) -> bytes:
+        # Endereço de ligação 0.0.0.0:0: o cliente não precisa dele para CONNECT
+        return bytes([0x05, code, 0x00, 0x01]) + b"\x00\x00\x00\x00\x00\x00"
@@ -0,0 +1,161 @@
+# proxy_steam_manager/metrics.py
+
+"""
+Instrumentação do serviço: contadores, gauges e histogramas com buckets fixos,
+exportados no formato de texto do Prometheus (GET /metrics).
+
+Registar um evento é só uma soma (e, nos histogramas, uma pesquisa binária nos
+limites dos buckets), sem locks: as métricas do pool só são atualizadas pelo
+thread do event loop que é dono dele. Os valores que já existem noutro lado
+(tamanho do pool, sessões...) não são copiados: são funções lidas no momento
+da recolha, que não podem percorrer o pool.
+"""
+
+import math
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Durações de operações em memória (get_proxy, report_proxy_usage), em segundos
+FAST_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3, 2.5e-2)
+# Durações de operações com I/O (recarregar o ficheiro, gravar o estado), em segundos
+SLOW_BUCKETS = (1e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Latências reportadas pelos clientes, em segundos
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+# Frações (taxa de sucesso)
+RATIO_BUCKETS = (0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    __slots__ = ("labels", "value")
+
+    def __init__(self, labels: Labels):
+        self.labels = labels
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+    def samples(self, name: str) -> List[str]:
+        return [f"{name}{_format_labels(self.labels)} {_format_value(self.value)}"]
+
+
+class Gauge:
+    __slots__ = ("labels", "value")
+
+    def __init__(self, labels: Labels):
+        self.labels = labels
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def samples(self, name: str) -> List[str]:
+        return [f"{name}{_format_labels(self.labels)} {_format_value(self.value)}"]
+
+
+class FunctionMetric:
+    """Gauge ou contador cujo valor é lido de uma função no momento da recolha."""
+    __slots__ = ("labels", "fn")
+
+    def __init__(self, labels: Labels, fn: Callable[[], float]):
+        self.labels = labels
+        self.fn = fn
+
+    def samples(self, name: str) -> List[str]:
+        return [f"{name}{_format_labels(self.labels)} {_format_value(self.fn())}"]
+
+
+class Histogram:
+    __slots__ = ("labels", "bounds", "counts", "sum", "count")
+
+    def __init__(self, labels: Labels, bounds: Sequence[float]):
+        self.labels = labels
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # O último é o bucket +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(self.labels, ('le', _format_value(bound)))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(self.labels)} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{_format_labels(self.labels)} {self.count}")
+        return lines
+
+
+class Registry:
+    """Famílias de métricas (nome, tipo, ajuda) com uma métrica por conjunto de labels."""
+
+    def __init__(self):
+        self._families: Dict[str, Tuple[str, str, Dict[Labels, object]]] = {}
+
+    def _get(self, kind: str, name: str, help_text: str, labels: Optional[Dict[str, str]], create):
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = (kind, help_text, {})
+        elif family[0] != kind:
+            raise ValueError(f"A métrica {name} já existe com o tipo {family[0]}")
+        key = tuple(sorted((labels or {}).items()))
+        metric = family[2].get(key)
+        if metric is None:
+            metric = family[2][key] = create(key)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Optional[Dict[str, str]] = None) -> Counter:
+        return self._get("counter", name, help_text, labels, Counter)
+
+    def gauge(self, name: str, help_text: str, labels: Optional[Dict[str, str]] = None) -> Gauge:
+        return self._get("gauge", name, help_text, labels, Gauge)
+
+    def histogram(self, name: str, help_text: str, bounds: Sequence[float],
+                  labels: Optional[Dict[str, str]] = None) -> Histogram:
+        return self._get("histogram", name, help_text, labels, lambda key: Histogram(key, bounds))
+
+    def gauge_function(self, name: str, help_text: str, fn: Callable[[], float],
+                       labels: Optional[Dict[str, str]] = None, kind: str = "gauge"):
+        """Regista (ou substitui, ex.: um pool novo) uma métrica lida de `fn`; kind="counter" para totais."""
+        metric = self._get(kind, name, help_text, labels, lambda key: FunctionMetric(key, fn))
+        metric.fn = fn
+
+    def render(self) -> str:
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        lines = []
+        for name, (kind, help_text, metrics) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for metric in metrics.values():
+                lines.extend(metric.samples(name))
+        return "\n".join(lines) + "\n"
+
+
+# Registo do processo; no modo com vários workers o do coordenador é o que tem o pool
+REGISTRY = Registry()
@@ -1,22 +1,67 @@
+import sys
+import time
+from collections import deque
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
-from typing import Literal, Optional
+from datetime import datetime
+from typing import Deque, Literal, Optional
 
-@dataclass
+# Chave de um proxy no pool: 'ip:porto:protocolo', o mesmo formato da API
+ProxyKey = str
+
+
+def proxy_key(ip: str, port: int, protocol: str) -> ProxyKey:
+    return f"{ip}:{port}:{protocol}"
+
+
+def _monotonic_to_datetime(value: float) -> datetime:
+    return datetime.fromtimestamp(value - time.monotonic() + time.time())
+
+
+def _datetime_to_monotonic(value: datetime) -> float:
+    return value.timestamp() - time.time() + time.monotonic()
+
+
+# slots=True (sem __dict__ por instância) só existe a partir do Python 3.10
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class Proxy:
     ip: str
     port: int
     protocol: Literal["http", "socks4", "socks5"]
     latency: Optional[float] = None
-    last_validated: Optional[datetime] = None
+    last_validated: Optional[float] = None  # Timestamp Unix (time.time())
     failures: int = 0
-    # Para sticky sessions e cooldown
+    # Total de pedidos entregues por este processo (só informativo: não é gravado no estado do pool)
     requests_served: int = 0
-    cooldown_until: Optional[datetime] = None
+    cooldown_until: Optional[float] = None  # Prazo em time.monotonic()
+    # Para a seleção de proxies (ver selection.py)
+    success_rate: float = 1.0
+    in_flight: int = 0
+    # Instantes (time.monotonic()) dos pedidos entregues e ainda não reportados, do mais antigo
+    # para o mais recente; in_flight == len(leases). Os que nunca são reportados expiram (ver ProxyPool)
+    leases: Optional[Deque[float]] = field(default=None, repr=False, compare=False)
+    # Token bucket (ver rate_limit.py): tokens=None são os tokens iniciais, rate=None a taxa inicial
+    tokens: Optional[float] = None
+    tokens_at: float = 0.0  # Última reposição, em time.monotonic()
+    rate: Optional[float] = None  # Taxa aprendida, em pedidos/s
+    rate_cut_at: Optional[float] = None  # Último corte da taxa por um 429, em time.monotonic()
+    rate_limited: int = 0  # 429 seguidos
+    # Chave do pool, calculada uma só vez (quem já a tem pode passá-la)
+    key: Optional[ProxyKey] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.key is None:
+            self.key = proxy_key(self.ip, self.port, self.protocol)
+
+    @property
+    def key_str(self) -> str:
+        return self.key
 
     def is_active(self) -> bool:
         if self.cooldown_until:
-            return datetime.now() > self.cooldown_until
+            return time.monotonic() > self.cooldown_until
         return True
 
     def mark_failed(self):
@@ -31,16 +76,17 @@ class Proxy:
             "port": self.port,
             "protocol": self.protocol,
             "latency": self.latency,
-            "last_validated": self.last_validated.isoformat() if self.last_validated else None,
+            "last_validated": datetime.fromtimestamp(self.last_validated).isoformat() if self.last_validated else None,
             "failures": self.failures,
             "requests_served": self.requests_served,
-            "cooldown_until": self.cooldown_until.isoformat() if self.cooldown_until else None,
+            "cooldown_until": _monotonic_to_datetime(self.cooldown_until).isoformat() if self.cooldown_until else None,
+            "success_rate": self.success_rate,
         }
 
     @classmethod
     def from_dict(cls, data: dict):
-        last_validated = datetime.fromisoformat(data["last_validated"]) if data.get("last_validated") else None
-        cooldown_until = datetime.fromisoformat(data["cooldown_until"]) if data.get("cooldown_until") else None
+        last_validated = datetime.fromisoformat(data["last_validated"]).timestamp() if data.get("last_validated") else None
+        cooldown_until = _datetime_to_monotonic(datetime.fromisoformat(data["cooldown_until"])) if data.get("cooldown_until") else None
         return cls(
             ip=data["ip"],
             port=data["port"],
@@ -50,6 +96,5 @@ class Proxy:
             failures=data.get("failures", 0),
             requests_served=data.get("requests_served", 0),
             cooldown_until=cooldown_until,
+            success_rate=data.get("success_rate", 1.0),
         )
-
-
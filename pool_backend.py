@@ -0,0 +1,269 @@
+# proxy_steam_manager/pool_backend.py
+
+"""
+Acesso ao ProxyPool a partir dos endpoints e do forward proxy.
+
+Com um só processo, LocalPoolBackend chama o pool diretamente. Com vários
+workers do uvicorn cada worker é um processo, e um ProxyPool em cada um
+entregaria o mesmo proxy a sessões diferentes e aplicaria o limite de pedidos
+por proxy (rate_limit.py) N vezes. Nesse caso o pool existe só num processo
+coordenador (o único dono, como no modo local) e os workers usam
+CoordinatorPoolBackend, que lhe envia os pedidos por um socket Unix, ou por TCP
+em 127.0.0.1 onde não há sockets Unix (Windows).
+
+Protocolo: uma linha JSON por pedido, [operação, argumentos], e uma linha por
+resposta, [ok, resultado]. O coordenador responde pela ordem dos pedidos, por
+isso cada worker usa uma só ligação com vários pedidos em curso.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from typing import Deque, List, Optional, Sequence, Tuple
+
+from async_logger import AsyncLogger
+from models import Proxy
+
+# Pedidos em lote podem ter MAX_BATCH_SIZE entradas
+MAX_LINE_SIZE = 4 * 1024 * 1024
+
+# (proxy_key, success, latency_ms, status_code)
+Report = Tuple[str, bool, Optional[float], Optional[int]]
+# (operação, 'protocolo://ip:porto', latency_ms); ver ProxyPool.ingest
+CheckerEvent = Tuple[str, str, Optional[float]]
+
+
+class CoordinatorError(Exception):
+    """O coordenador não está acessível ou não conseguiu executar o pedido."""
+
+
+def default_coordinator_address(socket_path: str, tcp_port: int) -> str:
+    if sys.platform != "win32":
+        return socket_path
+    return f"127.0.0.1:{tcp_port}"
+
+
+def parse_address(address: str) -> Tuple[Optional[str], Optional[int], Optional[str]]:
+    """'host:porto' -> (host, porto, None); qualquer outra coisa é o caminho de um socket Unix."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and os.sep not in host:
+        return host, int(port), None
+    return None, None, address
+
+
+def _encode_proxy(proxy: Optional[Proxy]) -> Optional[list]:
+    return [proxy.ip, proxy.port, proxy.protocol] if proxy is not None else None
+
+
+def _decode_proxy(data: Optional[list]) -> Optional[Proxy]:
+    return Proxy(ip=data[0], port=data[1], protocol=data[2]) if data is not None else None
+
+
+class LocalPoolBackend:
+    """O pool deste processo; só pode ser usado a partir do event loop que é dono dele."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def acquire(self, session_id: Optional[str]) -> Optional[Proxy]:
+        return self.pool.get_proxy(session_id)
+
+    async def acquire_many(self, session_ids: Sequence[str]) -> List[Optional[Proxy]]:
+        return [self.pool.get_proxy(session_id) for session_id in session_ids]
+
+    async def acquire_for_session(self, session_id: str, count: int) -> List[Proxy]:
+        return self.pool.get_proxies(session_id, count)
+
+    async def report(self, proxy_key: str, success: bool, latency_ms: Optional[float] = None,
+                     status_code: Optional[int] = None) -> bool:
+        return self.pool.report_proxy_usage(proxy_key, success, latency_ms, status_code)
+
+    async def report_many(self, reports: Sequence[Report]) -> int:
+        return sum(self.pool.report_proxy_usage(*report) for report in reports)
+
+    async def ingest(self, events: Sequence[CheckerEvent]) -> dict:
+        return self.pool.ingest(events)
+
+    async def metrics(self) -> dict:
+        return self.pool.get_metrics()
+
+    async def metrics_text(self) -> str:
+        return self.pool.metrics_text()
+
+    async def close(self):
+        pass
+
+
+class CoordinatorPoolBackend:
+    """Cliente do coordenador, com a mesma interface que LocalPoolBackend."""
+
+    def __init__(self, address: str, connect_timeout_sec: float = 15.0):
+        self.address = address
+        self.connect_timeout_sec = connect_timeout_sec
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: Deque[asyncio.Future] = deque()
+        self._receiver: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+
+    async def connect(self):
+        """Liga ao coordenador, tentando de novo enquanto ele ainda está a arrancar."""
+        host, port, path = parse_address(self.address)
+        deadline = time.monotonic() + self.connect_timeout_sec
+        while True:
+            try:
+                if path is not None:
+                    self._reader, self._writer = await asyncio.open_unix_connection(path, limit=MAX_LINE_SIZE)
+                else:
+                    self._reader, self._writer = await asyncio.open_connection(host, port, limit=MAX_LINE_SIZE)
+                break
+            except OSError as e:
+                if time.monotonic() >= deadline:
+                    raise CoordinatorError(f"Coordenador inacessível em {self.address}: {e}") from e
+                await asyncio.sleep(0.2)
+        self._receiver = asyncio.create_task(self._receive())
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._receiver is not None:
+            self._receiver.cancel()
+            await asyncio.gather(self._receiver, return_exceptions=True)
+            self._receiver = None
+        self._fail_pending(CoordinatorError("Ligação ao coordenador fechada."))
+
+    async def _call(self, op: str, *args):
+        if self._writer is None or self._writer.is_closing():
+            # Restabelecer a ligação depois de o coordenador reiniciar
+            async with self._connect_lock:
+                if self._writer is None or self._writer.is_closing():
+                    await self.close()
+                    await self.connect()
+        future = asyncio.get_running_loop().create_future()
+        # A resposta chega pela ordem do pedido: a fila e o envio têm de ficar na mesma ordem
+        self._pending.append(future)
+        self._writer.write(json.dumps([op, args], separators=(",", ":")).encode() + b"\n")
+        await self._writer.drain()
+        ok, result = await future
+        if not ok:
+            raise CoordinatorError(result)
+        return result
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                future = self._pending.popleft()
+                if not future.done():
+                    future.set_result(json.loads(line))
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+            self._fail_pending(CoordinatorError(f"{type(e).__name__}: {e}"))
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+            self._fail_pending(CoordinatorError("O coordenador fechou a ligação."))
+
+    def _fail_pending(self, error: Exception):
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    async def acquire(self, session_id: Optional[str]) -> Optional[Proxy]:
+        return _decode_proxy(await self._call("acquire", session_id))
+
+    async def acquire_many(self, session_ids: Sequence[str]) -> List[Optional[Proxy]]:
+        return [_decode_proxy(item) for item in await self._call("acquire_many", list(session_ids))]
+
+    async def acquire_for_session(self, session_id: str, count: int) -> List[Proxy]:
+        return [_decode_proxy(item) for item in await self._call("acquire_for_session", session_id, count)]
+
+    async def report(self, proxy_key: str, success: bool, latency_ms: Optional[float] = None,
+                     status_code: Optional[int] = None) -> bool:
+        return await self._call("report_many", [[proxy_key, success, latency_ms, status_code]]) == 1
+
+    async def report_many(self, reports: Sequence[Report]) -> int:
+        return await self._call("report_many", [list(report) for report in reports])
+
+    async def ingest(self, events: Sequence[CheckerEvent]) -> dict:
+        return await self._call("ingest", [list(event) for event in events])
+
+    async def metrics(self) -> dict:
+        return await self._call("metrics")
+
+    async def metrics_text(self) -> str:
+        return await self._call("metrics_text")
+
+
+class PoolCoordinator:
+    """Servidor do coordenador: executa no pool local os pedidos dos workers, um de cada vez."""
+
+    def __init__(self, pool, logger: AsyncLogger, address: str):
+        self.pool = pool
+        self.logger = logger
+        self.address = address
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        host, port, path = parse_address(self.address)
+        if path is not None:
+            if os.path.exists(path):
+                os.remove(path)  # Socket deixado por um coordenador anterior
+            self._server = await asyncio.start_unix_server(self._handle_worker, path, limit=MAX_LINE_SIZE)
+        else:
+            self._server = await asyncio.start_server(self._handle_worker, host, port, limit=MAX_LINE_SIZE)
+        self.logger.info("COORDINATOR_STARTED", "Coordenador do pool à escuta", address=self.address)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            _, _, path = parse_address(self.address)
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+
+    async def _handle_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    op, args = json.loads(line)
+                    response = [True, self._dispatch(op, args)]
+                except Exception as e:
+                    response = [False, f"{type(e).__name__}: {e}"]
+                writer.write(json.dumps(response, separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+            self.logger.warning("COORDINATOR_WORKER_ERROR", f"{type(e).__name__}: {e}")
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def _dispatch(self, op: str, args: list):
+        pool = self.pool
+        if op == "acquire":
+            return _encode_proxy(pool.get_proxy(args[0]))
+        if op == "acquire_many":
+            return [_encode_proxy(pool.get_proxy(session_id)) for session_id in args[0]]
+        if op == "acquire_for_session":
+            return [_encode_proxy(proxy) for proxy in pool.get_proxies(args[0], args[1])]
+        if op == "report_many":
+            return sum(pool.report_proxy_usage(*report) for report in args[0])
+        if op == "ingest":
+            return pool.ingest(args[0])
+        if op == "metrics":
+            return pool.get_metrics()
+        if op == "metrics_text":
+            return pool.metrics_text()
+        raise ValueError(f"Operação desconhecida: {op!r}")
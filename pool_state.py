@@ -0,0 +1,139 @@
+# proxy_steam_manager/pool_state.py
+
+"""
+Estado persistente do ProxyPool, para o serviço recomeçar "a quente".
+
+Guarda-se periodicamente uma fotografia compacta (JSON) do estado dos proxies
+que não estão no estado inicial (falhas, cooldown, estatísticas e taxa
+aprendida) e das sessões. Entre fotografias, o estado dos proxies alterados
+pelos relatórios de uso é acrescentado a um journal, um lote por linha, com um
+número de sequência crescente. No arranque lê-se a fotografia e aplicam-se por
+cima as linhas do journal com sequência maior do que a dela; as restantes são
+de antes da fotografia (ex.: o serviço parou entre escrevê-la e limpar o journal).
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from models import Proxy
+
+STATE_VERSION = 1
+
+
+def proxy_state(proxy: Proxy) -> Optional[list]:
+    """
+    [falhas, 0, fim do cooldown (timestamp Unix), taxa de sucesso, latência, taxa
+    de pedidos aprendida], ou None se for o estado inicial. O segundo elemento era
+    o número de pedidos servidos da janela antiga; já não é gravado (seria uma
+    alteração por pedido), mas a posição mantém-se para ler estados antigos.
+    """
+    # O prazo do cooldown está em time.monotonic(), que não sobrevive a um reinício
+    cooldown = proxy.cooldown_until - time.monotonic() + time.time() if proxy.cooldown_until else None
+    if not (proxy.failures or cooldown or proxy.success_rate != 1.0 or proxy.latency is not None
+            or proxy.rate is not None):
+        return None
+    return [proxy.failures, 0, cooldown, proxy.success_rate, proxy.latency, proxy.rate]
+
+
+def apply_proxy_state(proxy: Proxy, state: Optional[list], now: float):
+    """
+    Repõe o estado de `proxy_state` (`now` = time.time()); um cooldown que já
+    terminou não é reposto. O balde de tokens recomeça com os tokens iniciais (o cooldown, se
+    ainda durar, é reposto); estados antigos, sem a taxa aprendida, são aceites.
+    """
+    proxy.tokens, proxy.rate_cut_at, proxy.rate_limited = None, None, 0
+    if state is None:
+        proxy.failures, proxy.cooldown_until = 0, None
+        proxy.success_rate, proxy.latency, proxy.rate = 1.0, None, None
+        return
+    failures, _, cooldown, success_rate, latency, *rest = state
+    proxy.failures = failures
+    proxy.cooldown_until = cooldown - now + time.monotonic() if cooldown and cooldown > now else None
+    proxy.success_rate = success_rate
+    proxy.latency = latency
+    proxy.rate = rest[0] if rest else None
+
+
+@dataclass
+class PoolState:
+    seq: int = 0                     # Sequência do último lote do journal incluído
+    written_at: float = 0.0          # Timestamp Unix da fotografia
+    proxies: Dict[str, Optional[list]] = field(default_factory=dict)
+    # [session_id, proxy_key, segundos sem uso], da sessão menos usada para a mais usada
+    sessions: List[list] = field(default_factory=list)
+    journal_batches: int = 0         # Lotes do journal aplicados ao carregar
+
+
+class PoolStateStore:
+    """
+    Leitura e escrita dos ficheiros; é bloqueante, por isso o serviço chama-a em
+    asyncio.to_thread. O lock garante que uma escrita que continue no thread depois
+    de a tarefa ser cancelada não se mistura com a fotografia final.
+    """
+
+    def __init__(self, snapshot_path: str, journal_path: str):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.seq = 0  # Sequência do último lote escrito (ou lido) do journal
+        self._lock = threading.Lock()
+
+    def load(self) -> PoolState:
+        with self._lock:
+            state = self._load()
+            self.seq = state.seq
+            return state
+
+    def _load(self) -> PoolState:
+        state = self._load_snapshot()
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        seq, changes = json.loads(line)
+                    except ValueError:
+                        break  # Última linha cortada (o serviço parou a meio da escrita)
+                    if seq <= state.seq:
+                        continue
+                    state.proxies.update(changes)
+                    state.seq = seq
+                    state.journal_batches += 1
+        except FileNotFoundError:
+            pass
+        return state
+
+    def _load_snapshot(self) -> PoolState:
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return PoolState()
+        if data.get("version") != STATE_VERSION:
+            return PoolState()
+        return PoolState(seq=data["seq"], written_at=data["written_at"], proxies=data["proxies"],
+                         sessions=data["sessions"])
+
+    def write_snapshot(self, state: PoolState):
+        """
+        Escreve a fotografia (de forma atómica) e só depois limpa o journal. A
+        fotografia fica com a sequência do último lote, que passa a ser ignorado.
+        """
+        with self._lock:
+            temp_file = self.snapshot_path + ".tmp"
+            # json.dumps usa o codificador em C; json.dump para um ficheiro não
+            data = json.dumps({"version": STATE_VERSION, "seq": self.seq, "written_at": state.written_at or time.time(),
+                               "proxies": state.proxies, "sessions": state.sessions}, separators=(",", ":"))
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_file, self.snapshot_path)
+            open(self.journal_path, "w").close()
+
+    def append_journal(self, changes: Dict[str, Optional[list]]):
+        with self._lock:
+            line = json.dumps([self.seq + 1, changes], separators=(",", ":")) + "\n"
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.seq += 1
@@ -0,0 +1,289 @@
+# proxy_steam_manager/proxy_client.py
+
+"""
+Cliente fino do Proxy Manager Service para os workers de scraping.
+
+Os relatórios de uso não são enviados um a um: ficam num buffer e seguem em
+lote para /report_proxy_usage/batch quando atingem PROXY_CLIENT_REPORT_BATCH_SIZE
+ou a cada PROXY_CLIENT_REPORT_FLUSH_SEC. Para obter vários proxies num só
+pedido existem acquire_many() e acquire_for_session().
+
+Uso:
+    async with ProxyClient() as client:
+        proxy = await client.acquire("job-1")
+        ...  # pedido à Steam através de proxy.url
+        client.report(proxy.proxy_key, status_code=200, latency_ms=312.5)
+
+ResultPusher é o lado do checker: envia para /ingest os proxies validados,
+os que deixaram de o ser e as latências medidas, à medida que são verificados.
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from config import PROXY_SERVICE_URL, PROXY_CLIENT_REPORT_BATCH_SIZE, PROXY_CLIENT_REPORT_FLUSH_SEC
+
+# Limite do serviço por pedido em lote (MAX_BATCH_SIZE em proxy_manager_service.py)
+SERVICE_MAX_BATCH_SIZE = 1000
+
+
+class NoProxyAvailable(Exception):
+    """O serviço respondeu 503: não há proxies prontos."""
+
+
+@dataclass
+class AcquiredProxy:
+    ip: str
+    port: int
+    protocol: str
+    proxy_key: str
+    session_id: str
+
+    @property
+    def url(self) -> str:
+        return f"{self.protocol}://{self.ip}:{self.port}"
+
+
+class ProxyClient:
+    """
+    Os relatórios que não for possível enviar voltam ao buffer e seguem no envio
+    seguinte; acima de `max_buffer` os mais antigos são descartados (ver `dropped`).
+    """
+
+    def __init__(self, base_url: str = PROXY_SERVICE_URL, batch_size: int = PROXY_CLIENT_REPORT_BATCH_SIZE,
+                 flush_interval_sec: float = PROXY_CLIENT_REPORT_FLUSH_SEC, max_buffer: int = 10_000,
+                 timeout_sec: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.batch_size = max(1, min(batch_size, SERVICE_MAX_BATCH_SIZE))
+        self.flush_interval_sec = flush_interval_sec
+        self.max_buffer = max_buffer
+        self.timeout_sec = timeout_sec
+        self.dropped = 0
+        self._reports: Deque[dict] = deque()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "ProxyClient":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout_sec))
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        """Envia os relatórios pendentes e fecha a sessão HTTP."""
+        if self._session is None:
+            return
+        self._flusher.cancel()
+        await asyncio.gather(self._flusher, return_exceptions=True)
+        await self.flush()
+        await self._session.close()
+        self._session = None
+
+    # --- Obtenção de proxies ---
+
+    async def acquire(self, session_id: str) -> AcquiredProxy:
+        async with self._session.get(f"{self.base_url}/acquire_proxy", params={"session_id": session_id}) as response:
+            data = await self._json(response)
+        return AcquiredProxy(session_id=session_id, **data)
+
+    async def acquire_many(self, session_ids: List[str]) -> Dict[str, AcquiredProxy]:
+        """Um proxy por sessão; as sessões sem proxy disponível ficam de fora do resultado."""
+        acquired: Dict[str, AcquiredProxy] = {}
+        for start in range(0, len(session_ids), SERVICE_MAX_BATCH_SIZE):
+            chunk = session_ids[start:start + SERVICE_MAX_BATCH_SIZE]
+            try:
+                data = await self._post("/acquire_proxies", {"session_ids": chunk})
+            except NoProxyAvailable:
+                break
+            for item in data["proxies"]:
+                acquired[item["session_id"]] = AcquiredProxy(**item)
+        return acquired
+
+    async def acquire_for_session(self, session_id: str, count: int) -> List[AcquiredProxy]:
+        """Até `count` proxies distintos para a mesma sessão (o primeiro é o da sessão)."""
+        data = await self._post("/acquire_proxies", {"session_id": session_id, "count": count})
+        return [AcquiredProxy(**item) for item in data["proxies"]]
+
+    # --- Relatórios ---
+
+    def report(self, proxy_key: str, success: Optional[bool] = None, latency_ms: Optional[float] = None,
+               status_code: Optional[int] = None):
+        """Acrescenta um relatório ao buffer; não faz I/O. Sem `success`, o serviço usa `status_code`."""
+        if success is None and status_code is None:
+            raise ValueError("Indique 'success' ou 'status_code'.")
+        self._reports.append({"proxy_key": proxy_key, "success": success, "latency_ms": latency_ms,
+                              "status_code": status_code})
+        self._trim()
+        if len(self._reports) >= self.batch_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """Envia já todos os relatórios do buffer, em lotes de `batch_size`."""
+        async with self._flush_lock:
+            while self._reports:
+                batch = [self._reports.popleft() for _ in range(min(self.batch_size, len(self._reports)))]
+                try:
+                    await self._post("/report_proxy_usage/batch", {"reports": batch})
+                except aiohttp.ClientResponseError as e:
+                    if e.status >= 500:
+                        self._reports.extendleft(reversed(batch))
+                        self._trim()
+                        return
+                    # Lote rejeitado pelo serviço (4xx): reenviar não adianta
+                    self.dropped += len(batch)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    # Devolver ao início do buffer, pela ordem original, e tentar no próximo envio
+                    self._reports.extendleft(reversed(batch))
+                    self._trim()
+                    return
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval_sec)
+            await self.flush()
+
+    def _trim(self):
+        while len(self._reports) > self.max_buffer:
+            self._reports.popleft()
+            self.dropped += 1
+
+    # --- HTTP ---
+
+    async def _post(self, path: str, payload: dict) -> dict:
+        async with self._session.post(f"{self.base_url}{path}", json=payload) as response:
+            return await self._json(response)
+
+    @staticmethod
+    async def _json(response: aiohttp.ClientResponse) -> dict:
+        if response.status == 503:
+            raise NoProxyAvailable(await response.text())
+        response.raise_for_status()
+        return await response.json()
+
+
+class ResultPusher:
+    """
+    Eventos do checker para o serviço (POST /ingest), em lotes de `batch_size`
+    a cada `flush_interval_sec` (ou logo que se junta um lote).
+
+    Os eventos pendentes ficam num dicionário por proxy, por isso só segue o
+    último de cada um e o buffer nunca passa do número de proxies. Um lote que
+    falhe volta ao buffer (sem se sobrepor a eventos mais recentes) e marca
+    `needs_sync`: o serviço pode ter reiniciado e perdido o que já tinha
+    recebido, e quem usa o pusher deve voltar a enviar o conjunto atual (sync).
+    """
+
+    def __init__(self, base_url: str, batch_size: int = 500, flush_interval_sec: float = 0.2,
+                 timeout_sec: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.batch_size = max(1, min(batch_size, SERVICE_MAX_BATCH_SIZE))
+        self.flush_interval_sec = flush_interval_sec
+        self.timeout_sec = timeout_sec
+        self.needs_sync = True  # Ao arrancar não se sabe o que o serviço já tem
+        self.sent = 0
+        self.dropped = 0
+        self.failures = 0
+        # proxy -> (operação, latência em ms)
+        self._pending: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "ResultPusher":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout_sec))
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        """Tenta enviar os eventos pendentes e fecha a sessão HTTP."""
+        if self._session is None:
+            return
+        self._flusher.cancel()
+        await asyncio.gather(self._flusher, return_exceptions=True)
+        await self.flush()
+        await self._session.close()
+        self._session = None
+
+    # --- Eventos (não fazem I/O) ---
+
+    def add(self, proxy: str, latency_ms: Optional[float] = None, new: bool = True):
+        """Proxy validado; `new`=False se o serviço já o devia ter (só a latência mudou)."""
+        self._push(proxy, "add" if new else "latency", latency_ms)
+
+    def remove(self, proxy: str):
+        self._push(proxy, "remove", None)
+
+    def sync(self, proxies: Iterable[str]):
+        """Volta a enviar `proxies` como validados (depois de needs_sync)."""
+        for proxy in proxies:
+            self._pending.setdefault(proxy, ("add", None))
+        self.needs_sync = False
+        self._schedule()
+
+    def _push(self, proxy: str, op: str, latency_ms: Optional[float]):
+        self._pending.pop(proxy, None)  # O evento mais recente vai para o fim da fila
+        self._pending[proxy] = (op, latency_ms)
+        self._schedule()
+
+    def _schedule(self):
+        if len(self._pending) >= self.batch_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    # --- Envio ---
+
+    async def flush(self):
+        """Envia já todos os eventos pendentes, em lotes de `batch_size`."""
+        async with self._flush_lock:
+            while self._pending:
+                batch = []
+                for proxy in self._pending:
+                    batch.append(proxy)
+                    if len(batch) >= self.batch_size:
+                        break
+                events = [(proxy, self._pending.pop(proxy)) for proxy in batch]
+                payload = {"events": [{"op": op, "proxy": proxy, "latency_ms": latency_ms}
+                                      for proxy, (op, latency_ms) in events]}
+                try:
+                    async with self._session.post(f"{self.base_url}/ingest", json=payload) as response:
+                        response.raise_for_status()
+                    self.sent += len(events)
+                except aiohttp.ClientResponseError as e:
+                    if e.status >= 500:
+                        self._requeue(events)
+                        return
+                    # Lote rejeitado pelo serviço (4xx): reenviar não adianta
+                    self.dropped += len(events)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    self._requeue(events)
+                    return
+
+    def _requeue(self, events: List[Tuple[str, Tuple[str, Optional[float]]]]):
+        self.failures += 1
+        self.needs_sync = True
+        for proxy, event in events:
+            self._pending.setdefault(proxy, event)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval_sec)
+            await self.flush()
@@ -0,0 +1,123 @@
+# proxy_steam_manager/proxy_file.py
+
+"""
+Leitura incremental do ficheiro de proxies do serviço (steam_live.txt).
+
+Guarda o estado da última leitura (mtime/tamanho, hash do conteúdo e o conjunto
+de linhas) e, em cada reload, devolve apenas a diferença: nada se o ficheiro
+não mudou, e caso contrário os proxies das linhas novas e as chaves que
+deixaram de aparecer. Só as linhas acrescentadas ou removidas são
+interpretadas, e só para as chaves novas se cria um Proxy, pelo que o custo de
+um reload acompanha o que mudou e não o tamanho do ficheiro.
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from models import Proxy, ProxyKey, proxy_key
+
+SUPPORTED_PROTOCOLS = ("http", "https", "socks4", "socks5")
+
+
+def parse_proxy_line(line: str) -> Optional[Tuple[ProxyKey, str, int, str]]:
+    """
+    Interpreta 'protocolo://ip:porto' e devolve (chave do pool, ip, porto, protocolo), com
+    https normalizado para http. Devolve None para linhas a ignorar (vazias, sem
+    protocolo ou com protocolo não suportado) e levanta ValueError se estiver mal formatada.
+    """
+    if not line or "://" not in line:
+        return None
+    protocol_part, address_part = line.split("://", 1)
+    protocol = protocol_part.lower()
+    if protocol not in SUPPORTED_PROTOCOLS:
+        return None
+    if protocol == "https":
+        protocol = "http"
+    ip, port_str = address_part.split(":", 1)
+    port = int(port_str)
+    return proxy_key(ip, port, protocol), ip, port, protocol
+
+
+@dataclass
+class ProxyFileState:
+    """Estado da última leitura; só deve ser usado por uma leitura de cada vez."""
+    mtime_ns: int = -1
+    size: int = -1
+    digest: bytes = b""
+    lines: Set[str] = field(default_factory=set)
+    # Linhas diferentes podem dar a mesma chave (ex.: http:// e https://)
+    key_counts: Dict[ProxyKey, int] = field(default_factory=dict)
+
+
+@dataclass
+class ProxyFileDiff:
+    added: Dict[ProxyKey, Proxy]
+    removed: Set[ProxyKey]
+    bad_lines: List[str]
+    missing: bool = False
+
+
+def diff_proxy_file(file_path: str, state: ProxyFileState) -> Optional[ProxyFileDiff]:
+    """
+    Compara o ficheiro com `state` (que é atualizado) e devolve a diferença, ou None
+    se o conteúdo não mudou. Um ficheiro inexistente conta como vazio.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if (stat.st_mtime_ns, stat.st_size) == (state.mtime_ns, state.size):
+                return None
+            data = f.read()
+    except FileNotFoundError:
+        stat, data = None, None
+
+    digest = hashlib.blake2b(data, digest_size=16).digest() if data is not None else b"missing"
+    state.mtime_ns, state.size = (stat.st_mtime_ns, stat.st_size) if stat else (-1, -1)
+    if digest == state.digest:
+        return None  # Reescrito com o mesmo conteúdo (ex.: escrita atómica do checker)
+    state.digest = digest
+
+    lines = {line.strip() for line in data.decode("utf-8", errors="replace").splitlines()} if data else set()
+    lines.discard("")
+    added_lines = lines - state.lines
+    removed_lines = state.lines - lines
+    state.lines = lines
+
+    counts = state.key_counts
+    removed: Set[ProxyKey] = set()
+    added: Dict[ProxyKey, Proxy] = {}
+    bad_lines: List[str] = []
+    for line in removed_lines:
+        parsed = _parse_or_none(line)
+        if parsed is None:
+            continue
+        key = parsed[0]
+        counts[key] -= 1
+        if counts[key] == 0:
+            del counts[key]
+            removed.add(key)
+    for line in added_lines:
+        try:
+            parsed = parse_proxy_line(line)
+        except (ValueError, IndexError):
+            bad_lines.append(line)
+            continue
+        if parsed is None:
+            continue
+        key, ip, port, protocol = parsed
+        counts[key] = counts.get(key, 0) + 1
+        if counts[key] == 1:
+            if key in removed:
+                removed.discard(key)  # A chave continua no ficheiro, noutra linha: manter o Proxy atual
+            else:
+                added[key] = Proxy(ip=ip, port=port, protocol=protocol, key=key)
+    return ProxyFileDiff(added, removed, bad_lines, missing=data is None)
+
+
+def _parse_or_none(line: str) -> Optional[Tuple[ProxyKey, str, int, str]]:
+    try:
+        return parse_proxy_line(line)
+    except (ValueError, IndexError):
+        return None
@@ -0,0 +1,332 @@
+# proxy_steam_manager/proxy_harvester.py
+
+"""
+Recolha de proxies das listas públicas (substitui update_proxies.ps1).
+
+Todas as fontes de HARVESTER_SOURCES são descarregadas em paralelo numa sessão
+aiohttp, com as ligações reutilizadas entre rondas. Cada pedido leva o ETag /
+Last-Modified da resposta anterior, por isso uma lista que não mudou responde
+304 e não é descarregada nem lida. O corpo é interpretado linha a linha à
+medida que chega; os proxies são deduplicados (entre fontes e contra o ficheiro
+de saída) pela chave do pool (models.proxy_key) e só os novos são
+acrescentados ao ficheiro, normalmente live.txt, a entrada do checker. Com
+mais de HARVESTER_MAX_LINES proxies o ficheiro é reescrito (de forma atómica)
+só com os mais recentes, para não crescer sem limite entre rondas do checker.
+
+Uso:
+    python proxy_harvester.py            # ronda a cada HARVESTER_INTERVAL_SEC
+    python proxy_harvester.py --once
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+try:
+    import aiohttp
+except ImportError:
+    print("Erro: Biblioteca necessária não encontrada. Por favor, instale-a com:")
+    print("python -m pip install aiohttp")
+    sys.exit(1)
+
+from config import (HARVESTER_SOURCES, HARVESTER_OUTPUT_FILE, HARVESTER_INTERVAL_SEC, HARVESTER_CONCURRENCY,
+                    HARVESTER_TIMEOUT_SEC, HARVESTER_MAX_LINES, HARVESTER_CACHE_FILE, HARVESTER_USER_AGENT,
+                    LOG_FORMAT)
+from async_logger import AsyncLogger
+from models import ProxyKey, proxy_key
+from proxy_file import parse_proxy_line
+
+# As listas têm linhas curtas; uma linha maior do que isto não é uma lista de proxies
+MAX_LINE_SIZE = 64 * 1024
+
+
+def parse_source_line(line: str, protocol: str) -> Optional[Tuple[ProxyKey, str]]:
+    """
+    'ip:porto' (com o protocolo da lista) ou 'protocolo://ip:porto' -> (chave,
+    'protocolo://ip:porto'), ou None se a linha não for um proxy.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    try:
+        if "://" in line:
+            parsed = parse_proxy_line(line.split()[0])
+            if parsed is None:
+                return None
+            key, ip, port, protocol = parsed
+        else:
+            # Algumas listas acrescentam colunas (país, anonimato...) depois do endereço
+            ip, port_str = line.split()[0].split(":")
+            port = int(port_str)
+            key = proxy_key(ip, port, protocol)
+    except ValueError:
+        return None
+    if not ip or not 0 < port <= 0xFFFF:
+        return None
+    return key, f"{protocol}://{ip}:{port}"
+
+
+def _endpoint_key(line: str) -> Optional[ProxyKey]:
+    """Chave de uma linha já existente no ficheiro de saída (sem protocolo conta como http)."""
+    parsed = parse_source_line(line, "http")
+    return parsed[0] if parsed is not None else None
+
+
+@dataclass
+class SourceResult:
+    url: str
+    status: Optional[int] = None  # None: o pedido falhou (ver error)
+    lines: int = 0
+    new: int = 0
+    bytes: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class HarvestResult:
+    sources: List[SourceResult] = field(default_factory=list)
+    new_lines: List[str] = field(default_factory=list)
+    trimmed: int = 0  # Linhas antigas retiradas do ficheiro de saída (HARVESTER_MAX_LINES)
+    elapsed_sec: float = 0.0
+
+    @property
+    def unchanged(self) -> int:
+        return sum(1 for source in self.sources if source.status == 304)
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for source in self.sources if source.status is None or source.status >= 400)
+
+
+class ProxyHarvester:
+    """
+    Uma ronda de cada vez (harvest_once). Os pedidos correm todos no mesmo event
+    loop, por isso o conjunto de chaves conhecidas é partilhado sem locks.
+    """
+
+    def __init__(self, sources: Mapping[str, Sequence[str]], output_file: str, cache_file: Optional[str] = None,
+                 concurrency: int = HARVESTER_CONCURRENCY, timeout_sec: float = HARVESTER_TIMEOUT_SEC,
+                 max_lines: Optional[int] = HARVESTER_MAX_LINES, logger: Optional[AsyncLogger] = None):
+        self.sources = [(url, protocol) for protocol, urls in sources.items() for url in urls]
+        self.output_file = output_file
+        self.cache_file = cache_file
+        self.concurrency = concurrency
+        self.timeout_sec = timeout_sec
+        self.max_lines = max_lines
+        self.logger = logger
+        # url -> {"etag": ..., "last_modified": ...}
+        self.validators: Dict[str, Dict[str, str]] = {}
+        self.known: Set[ProxyKey] = set()
+        self._output_stat: Optional[Tuple[int, int]] = None  # (tamanho, mtime_ns) depois da nossa última escrita
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        if self.cache_file:
+            self.validators = await asyncio.to_thread(self._load_cache)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(
+            connector=connector, headers={"User-Agent": HARVESTER_USER_AGENT},
+            timeout=aiohttp.ClientTimeout(total=self.timeout_sec),
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _load_cache(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_cache(self, validators: Dict[str, Dict[str, str]]):
+        temp_file = self.cache_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(validators, f)
+        os.replace(temp_file, self.cache_file)
+
+    def _stat_output(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.output_file)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _load_known(self) -> Set[ProxyKey]:
+        known: Set[ProxyKey] = set()
+        with suppress(FileNotFoundError):
+            with open(self.output_file, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    key = _endpoint_key(line)
+                    if key is not None:
+                        known.add(key)
+        return known
+
+    def _append(self, lines: List[str]) -> Optional[Tuple[int, int]]:
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        with open(self.output_file, "a+b") as f:
+            size = f.tell()
+            if size:
+                # Não colar a primeira linha nova à última do ficheiro, se esta não acabar em \n
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data
+            f.write(data)
+        return self._stat_output()
+
+    def _trim(self) -> Optional[Tuple[Set[ProxyKey], int]]:
+        """
+        Reescreve o ficheiro de saída só com os `max_lines` proxies mais recentes (os
+        do fim); devolve as chaves que ficaram e quantas linhas saíram, ou None se o
+        ficheiro não pôde ser substituído (no Windows, aberto por outro processo).
+        """
+        with open(self.output_file, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+        kept: Dict[ProxyKey, str] = {}
+        for line in reversed(lines):
+            key = _endpoint_key(line)
+            if key is not None and key not in kept:
+                kept[key] = line.strip()
+                if len(kept) == self.max_lines:
+                    break
+        temp_file = self.output_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in reversed(list(kept.values()))))
+        try:
+            os.replace(temp_file, self.output_file)
+        except PermissionError:
+            os.remove(temp_file)
+            return None
+        return set(kept), len(lines) - len(kept)
+
+    @staticmethod
+    def _add_lines(lines: List[bytes], protocol: str, known: Set[ProxyKey], new_lines: List[str],
+                   result: SourceResult):
+        for raw in lines:
+            parsed = parse_source_line(raw.decode("utf-8", "replace"), protocol)
+            if parsed is None:
+                continue
+            result.lines += 1
+            key, line = parsed
+            if key not in known:
+                known.add(key)
+                new_lines.append(line)
+                result.new += 1
+
+    async def _fetch(self, url: str, protocol: str, semaphore: asyncio.Semaphore,
+                     new_lines: List[str]) -> SourceResult:
+        result = SourceResult(url)
+        headers = {}
+        cached = self.validators.get(url, {})
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        try:
+            async with semaphore:
+                async with self._session.get(url, headers=headers) as resp:
+                    result.status = resp.status
+                    if resp.status != 200:
+                        return result
+                    # Interpretar à medida que chega, bloco a bloco (ler linha a linha pelo
+                    # aiohttp custa mais do que a própria interpretação); o conjunto é partilhado
+                    known = self.known
+                    pending = b""
+                    async for chunk in resp.content.iter_any():
+                        result.bytes += len(chunk)
+                        lines = (pending + chunk).split(b"\n")
+                        pending = lines.pop()
+                        if len(pending) > MAX_LINE_SIZE:
+                            raise ValueError("Linha demasiado longa")
+                        self._add_lines(lines, protocol, known, new_lines, result)
+                    self._add_lines([pending], protocol, known, new_lines, result)
+                    # Só depois de ler o corpo todo: uma descarga cortada repete-se na ronda seguinte
+                    validators = {name: resp.headers[header] for name, header in
+                                  (("etag", "ETag"), ("last_modified", "Last-Modified")) if header in resp.headers}
+                    if validators:
+                        self.validators[url] = validators
+                    else:
+                        self.validators.pop(url, None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            result.status = None
+            result.error = f"{type(e).__name__}: {e}"
+        return result
+
+    async def harvest_once(self) -> HarvestResult:
+        started = time.perf_counter()
+        # Reler o ficheiro de saída se outro processo o alterou (ex.: foi limpo)
+        current_stat = await asyncio.to_thread(self._stat_output)
+        if current_stat is None or current_stat != self._output_stat:
+            self.known = await asyncio.to_thread(self._load_known)
+
+        harvest = HarvestResult()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        harvest.sources = await asyncio.gather(
+            *(self._fetch(url, protocol, semaphore, harvest.new_lines) for url, protocol in self.sources)
+        )
+        if harvest.new_lines:
+            self._output_stat = await asyncio.to_thread(self._append, harvest.new_lines)
+        else:
+            self._output_stat = current_stat
+        if self.max_lines is not None and len(self.known) > self.max_lines:
+            trimmed = await asyncio.to_thread(self._trim)
+            if trimmed is not None:
+                self.known, harvest.trimmed = trimmed
+                self._output_stat = await asyncio.to_thread(self._stat_output)
+            elif self.logger is not None:
+                self.logger.warning("TRIM_FAILED", "Ficheiro de saída em uso; a limitar na próxima ronda",
+                                    path=self.output_file, known=len(self.known))
+        if self.cache_file:
+            await asyncio.to_thread(self._save_cache, dict(self.validators))
+        harvest.elapsed_sec = time.perf_counter() - started
+
+        if self.logger is not None:
+            for source in harvest.sources:
+                if source.status is None or source.status >= 400:
+                    self.logger.warning("SOURCE_FAILED", source.error or f"HTTP {source.status}", url=source.url)
+            self.logger.info("HARVEST_DONE", "Recolha concluída", sources=len(harvest.sources),
+                             unchanged=harvest.unchanged, failed=harvest.failed, new=len(harvest.new_lines),
+                             trimmed=harvest.trimmed, known=len(self.known), elapsed_sec=round(harvest.elapsed_sec, 2))
+        return harvest
+
+
+async def run(once: bool, interval_sec: float, output_file: str):
+    logger = AsyncLogger(None, "INFO", console=True, fmt=LOG_FORMAT)
+    try:
+        async with ProxyHarvester(HARVESTER_SOURCES, output_file, HARVESTER_CACHE_FILE, logger=logger) as harvester:
+            while True:
+                await harvester.harvest_once()
+                if once:
+                    break
+                await asyncio.sleep(interval_sec)
+    finally:
+        logger.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recolhe proxies das listas públicas para o ficheiro de entrada do checker.")
+    parser.add_argument("--once", action="store_true", help="Fazer uma só ronda e sair.")
+    parser.add_argument("--interval", type=float, default=HARVESTER_INTERVAL_SEC, help="Segundos entre rondas.")
+    parser.add_argument("--output", default=HARVESTER_OUTPUT_FILE, help="Ficheiro a que se acrescentam os proxies novos.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with suppress(KeyboardInterrupt):
+        asyncio.run(run(args.once, args.interval, args.output))
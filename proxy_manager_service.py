@@ -1,27 +1,160 @@
 # proxy_steam_manager/proxy_manager_service.py
 
+import argparse
+import asyncio
+import gc
+import signal
+import subprocess
 import sys
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
 import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Literal, Optional, Sequence, Set, Tuple
+import heapq
+import random
 import time
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
 
 # Adicionar o diretório pai ao sys.path para permitir importações relativas
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import REQUESTS_PER_PROXY, COOLDOWN_TIME_SECONDS
-from models import Proxy
+from config import (PROXY_SELECTION_STRATEGY, PROXY_STATS_EWMA_ALPHA, PROXY_IN_FLIGHT_LEASE_SEC, PROXY_RATE_BURST,
+                    PROXY_RATE_INITIAL_TOKENS, PROXY_RATE_INITIAL,
+                    PROXY_RATE_MIN, PROXY_RATE_MAX, PROXY_RATE_INCREASE, PROXY_RATE_DECREASE_FACTOR,
+                    PROXY_RATE_LIMIT_STATUS, PROXY_RATE_LIMITED_COOLDOWN_SEC, PROXY_FAILURE_COOLDOWN_SEC,
+                    PROXY_COOLDOWN_MAX_SEC, CHECKER_VALIDATION_URL, CHECKER_VALIDATION_TEXT, CHECKER_HEADERS,
+                    SERVICE_REVALIDATION_ENABLED, SERVICE_REVALIDATION_URL, SERVICE_REVALIDATION_CONCURRENCY,
+                    SERVICE_REVALIDATION_TIMEOUT_SEC, SERVICE_REVALIDATION_INTERVAL_SEC, SERVICE_REVALIDATION_LEAD_SEC,
+                    SERVICE_REVALIDATION_FAILURES, SERVICE_REVALIDATION_EVICT_FAILURES,
+                    SERVICE_LOG_LEVEL, SERVICE_LOG_FILE, LOG_FORMAT, LOG_FLUSH_INTERVAL_SEC, LOG_MAX_BYTES, LOG_BACKUP_COUNT,
+                    FORWARD_PROXY_ENABLED, FORWARD_PROXY_HOST, FORWARD_PROXY_PORT, FORWARD_PROXY_SESSION_HEADER,
+                    FORWARD_PROXY_CONNECT_TIMEOUT_SEC, FORWARD_PROXY_MAX_ATTEMPTS, FORWARD_PROXY_IDLE_TIMEOUT_SEC,
+                    SESSION_MAX_COUNT, SESSION_IDLE_TTL_SECONDS,
+                    POOL_COORDINATOR_SOCKET, POOL_COORDINATOR_TCP_PORT, SERVICE_PROFILER_ENABLED,
+                    SERVICE_PROFILER_MAX_SECONDS, SERVICE_INGEST_ALLOW_REMOTE)
+from async_logger import AsyncLogger
+from forward_proxy import ForwardProxyServer
+from models import Proxy, ProxyKey
+from selection import get_strategy, update_proxy_stats
+from rate_limit import TokenBucketPolicy
+from session_map import SessionMap
+from proxy_file import ProxyFileDiff, ProxyFileState, diff_proxy_file, parse_proxy_line
+from pool_state import PoolState, PoolStateStore, apply_proxy_state, proxy_state
+from pool_backend import CoordinatorPoolBackend, LocalPoolBackend, PoolCoordinator, default_coordinator_address
+from metrics import FAST_BUCKETS, LATENCY_BUCKETS, RATIO_BUCKETS, REGISTRY, SLOW_BUCKETS
+from sampling_profiler import SamplingProfiler
+from adaptive_limiter import OUTCOME_LOCAL_ERROR, OUTCOME_OK
+
+try:
+    from watchfiles import awatch
+except ImportError:  # Dependência opcional: sem ela, as alterações são detetadas só por polling
+    awatch = None
+
+try:
+    from revalidator import OUTCOME_RATE_LIMITED, ProxyRevalidator
+except ImportError:  # Dependências opcionais (aiohttp, aiohttp_socks): sem elas não há revalidação ativa
+    OUTCOME_RATE_LIMITED, ProxyRevalidator = "rate_limited", None
 
 # --- CONFIGURAÇÃO PRINCIPAL ---
 DATA_FILE = r".\steam_live.txt"
-COOLDOWN_PROXIES_FILE = "cooldown_proxies.txt"
-RELOAD_INTERVAL_SECONDS = 8
-COOLDOWN_FILE_UPDATE_INTERVAL_SECONDS = 5 
+# Estado do pool para recomeçar "a quente" (ver pool_state.py): fotografia + journal
+STATE_SNAPSHOT_FILE = "pool_state.json"
+STATE_JOURNAL_FILE = "pool_state.journal"
+STATE_SNAPSHOT_INTERVAL_SECONDS = 60
+STATE_JOURNAL_FLUSH_INTERVAL_SECONDS = 1
+RELOAD_INTERVAL_SECONDS = 8  # Polling do ficheiro de proxies (um stat; só é lido se tiver mudado)
+RELOAD_WATCH_FILE = True  # Recarregar logo que o ficheiro muda, se o pacote watchfiles estiver instalado
+MAX_BATCH_SIZE = 1000  # Máximo de sessões/proxies/relatórios por pedido nos endpoints em lote
+# Se definida, os endpoints usam o pool do coordenador neste endereço (ver pool_backend.py)
+POOL_COORDINATOR_ENV = "PROXY_POOL_COORDINATOR"
+LOOP_LAG_INTERVAL_SECONDS = 0.5  # Período da medição do atraso do event loop
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")  # Clientes aceites em POST /ingest (ver SERVICE_INGEST_ALLOW_REMOTE)
+
+# Os registos só entram numa fila; a escrita (consola e ficheiro) é feita por um thread à parte.
+# Até ao arranque só na consola: todos os processos (o pai do uvicorn, os workers,
+# o coordenador) importam este módulo, e só o dono do pool abre o ficheiro (ver open_service_log)
+logger = AsyncLogger(None, SERVICE_LOG_LEVEL, console=True, fmt=LOG_FORMAT, flush_interval_sec=LOG_FLUSH_INTERVAL_SEC)
+
+
+def open_service_log():
+    """
+    Passa a escrever também em SERVICE_LOG_FILE. Só no processo dono do pool
+    (serviço com um worker ou coordenador): com vários processos no mesmo ficheiro
+    as linhas misturavam-se e a rotação de um perdia as linhas dos outros. Os
+    workers ficam só com a consola.
+    """
+    global logger
+    if not SERVICE_LOG_FILE or logger.path:
+        return
+    console_only = logger
+    logger = AsyncLogger(SERVICE_LOG_FILE, console_only.level, console=True, fmt=LOG_FORMAT, max_bytes=LOG_MAX_BYTES,
+                         backup_count=LOG_BACKUP_COUNT, flush_interval_sec=LOG_FLUSH_INTERVAL_SEC)
+    logger.dropped_total = console_only.dropped_total  # O contador exportado não pode descer
+    console_only.close()
+
+# --- MÉTRICAS (metrics.py) ---
+
+# Atualizadas só no loop do dono do pool; a rotação por minuto e os cooldowns por
+# minuto são rate() destes contadores no Prometheus
+ACQUIRE_SECONDS = REGISTRY.histogram("proxy_pool_acquire_seconds", "Duração de ProxyPool.get_proxy.", FAST_BUCKETS)
+ACQUIRES = {result: REGISTRY.counter(
+    "proxy_pool_acquires_total",
+    "Proxies entregues: sticky (o da sessão), rotated (a sessão mudou de proxy), new (sessão nova ou sem sessão); "
+    "unavailable quando não havia nenhum.", {"result": result})
+    for result in ("sticky", "rotated", "new", "unavailable")}
+REPORT_SECONDS = REGISTRY.histogram("proxy_pool_report_seconds", "Duração de ProxyPool.report_proxy_usage.", FAST_BUCKETS)
+REPORTS = {result: REGISTRY.counter(
+    "proxy_pool_reports_total",
+    "Relatórios de uso: success, failure (proxy avariado), rate_limited (429 da Steam) ou unknown "
+    "(o proxy já não está no pool).", {"result": result})
+    for result in ("success", "failure", "rate_limited", "unknown")}
+REPORTED_LATENCY = REGISTRY.histogram("proxy_pool_reported_latency_seconds", "Latência reportada pelos clientes.",
+                                      LATENCY_BUCKETS)
+SUCCESS_RATE = REGISTRY.histogram("proxy_pool_proxy_success_rate",
+                                  "Taxa de sucesso (média móvel) de cada proxy depois de cada relatório.", RATIO_BUCKETS)
+LEASES_EXPIRED = REGISTRY.counter("proxy_pool_leases_expired_total",
+                                  "Pedidos entregues que nunca foram reportados (deixaram de contar como em curso).")
+COOLDOWNS = {reason: REGISTRY.counter(
+    "proxy_pool_cooldowns_total",
+    "Entradas em cooldown: failure (falha reportada), rate_limited (429) ou limit (sem tokens no balde).",
+    {"reason": reason}) for reason in ("failure", "rate_limited", "limit")}
+RATE_LIMIT_RATE = REGISTRY.histogram("proxy_pool_rate_limit_requests_per_second",
+                                     "Taxa de pedidos aprendida de cada proxy depois de cada 429.",
+                                     sorted({PROXY_RATE_MIN, PROXY_RATE_INITIAL / 4, PROXY_RATE_INITIAL / 2,
+                                             PROXY_RATE_INITIAL, PROXY_RATE_INITIAL * 2, PROXY_RATE_MAX}))
+LOAD_SECONDS = REGISTRY.histogram("proxy_pool_load_seconds",
+                                  "Duração de uma leitura do ficheiro de proxies, com a aplicação da diferença.",
+                                  SLOW_BUCKETS)
+RELOADS = {result: REGISTRY.counter("proxy_pool_reloads_total", "Leituras do ficheiro de proxies.", {"result": result})
+           for result in ("changed", "unchanged", "error")}
+PROXIES_ADDED = REGISTRY.counter("proxy_pool_proxies_added_total", "Proxies acrescentados ao pool pelo ficheiro.")
+PROXIES_REMOVED = REGISTRY.counter("proxy_pool_proxies_removed_total", "Proxies retirados do pool pelo ficheiro.")
+INGESTED = {result: REGISTRY.counter(
+    "proxy_pool_ingested_total",
+    "Eventos do checker (POST /ingest): add (proxy novo no pool), latency (já estava), remove (retirado), "
+    "ignored (remoção de um proxy que não estava no pool) ou invalid (linha ou operação inválida).", {"result": result})
+    for result in ("add", "latency", "remove", "ignored", "invalid")}
+REVALIDATIONS = {action: REGISTRY.counter(
+    "proxy_pool_revalidations_total",
+    "Sondas da revalidação ativa: released (saudável, voltou ao pool), rate_limited (429), failed (cooldown "
+    "prolongado), evicted (retirado do pool), retry (erro local, repete) ou stale (o proxy já não esperava a sonda).",
+    {"action": action}) for action in ("released", "rate_limited", "failed", "evicted", "retry", "stale")}
+STATE_WRITE_SECONDS = {kind: REGISTRY.histogram(
+    "proxy_pool_state_write_seconds", "Gravação do estado do pool (exportar no loop + escrever no thread).",
+    SLOW_BUCKETS, {"kind": kind}) for kind in ("journal", "snapshot")}
+STATE_WRITE_ERRORS = REGISTRY.counter("proxy_pool_state_write_errors_total", "Falhas ao gravar o estado do pool.")
+LOOP_LAG = REGISTRY.histogram("service_event_loop_lag_seconds",
+                              "Atraso do event loop: quanto um sleep acorda depois do previsto.", SLOW_BUCKETS)
+REGISTRY.gauge_function("service_log_records_dropped_total", "Registos de log descartados com a fila cheia.",
+                        lambda: logger.dropped_total, kind="counter")
+
+# Profiler por amostragem do event loop deste processo (endpoints /admin/profiler)
+profiler = SamplingProfiler()
 
 # --- LÓGICA DO PROXY POOL ---
 
@@ -32,142 +165,803 @@ def load_proxies_from_text_file(file_path: str) -> List[Proxy]:
     """
     proxies: List[Proxy] = []
     if not os.path.exists(file_path):
-        print(f"ERRO: Ficheiro de proxies não encontrado em {file_path}")
+        logger.error("PROXY_FILE_NOT_FOUND", "Ficheiro de proxies não encontrado", path=file_path)
         return proxies
     
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             for line in f:
                 line = line.strip()
-                if not line or '://' not in line:
-                    continue
                 try:
-                    protocol_part, address_part = line.split('://', 1)
-                    ip, port_str = address_part.split(':', 1)
-                    port = int(port_str)
-                    protocol = protocol_part.lower()
-                    if protocol in ['http', 'https', 'socks4', 'socks5']:
-                        if protocol == 'https':
-                            protocol = 'http'
-                        proxies.append(Proxy(ip=ip, port=port, protocol=protocol))
+                    parsed = parse_proxy_line(line)
                 except (ValueError, IndexError):
-                    print(f"Aviso: Ignorando linha mal formatada: {line}")
+                    logger.warning("BAD_PROXY_LINE", "Ignorando linha mal formatada", line=line)
+                    continue
+                if parsed:
+                    _, ip, port, protocol = parsed
+                    proxies.append(Proxy(ip=ip, port=port, protocol=protocol))
     except Exception as e:
-        print(f"ERRO ao ler o ficheiro de proxies: {e}")
+        logger.error("PROXY_FILE_ERROR", f"Erro ao ler o ficheiro de proxies: {e}", path=file_path)
     return proxies
 
 class ProxyPool:
-    def __init__(self, data_file):
+    """
+    Estado do pool com um único dono: o thread do event loop do serviço.
+
+    Todos os métodos são síncronos, curtos (O(1) por pedido) e não fazem I/O, por
+    isso cada chamada a partir de um endpoint `async def` é atómica em relação às
+    outras sem precisar de lock. O trabalho bloqueante (ler e interpretar o
+    ficheiro, gravar o estado) é feito noutro thread e o resultado
+    é aplicado de uma só vez no loop (ver `reload`).
+    """
+
+    def __init__(self, data_file, strategy: str = PROXY_SELECTION_STRATEGY):
         self.data_file = data_file
-        self.proxies: Dict[str, Proxy] = {}
-        self.session_proxy_map: Dict[str, str] = {}
-        self.lock = threading.Lock()  # Lock para garantir a atomicidade na obtenção de proxies
+        self.select_proxy = get_strategy(strategy)
+        self._rng = random.Random()
+        # Limite de pedidos por proxy, com a taxa aprendida dos 429 (rate_limit.py)
+        self.rate_limit = TokenBucketPolicy(
+            PROXY_RATE_BURST, PROXY_RATE_INITIAL_TOKENS, PROXY_RATE_INITIAL, PROXY_RATE_MIN, PROXY_RATE_MAX,
+            PROXY_RATE_INCREASE, PROXY_RATE_DECREASE_FACTOR, PROXY_RATE_LIMIT_STATUS, PROXY_RATE_LIMITED_COOLDOWN_SEC,
+            PROXY_FAILURE_COOLDOWN_SEC, PROXY_COOLDOWN_MAX_SEC)
+        # Chaves 'ip:porto:protocolo' (models.proxy_key), as mesmas da API
+        self.proxies: Dict[ProxyKey, Proxy] = {}
+        # Afinidade sessão -> proxy, limitada (TTL de inatividade + LRU)
+        self.sessions = SessionMap(SESSION_MAX_COUNT, SESSION_IDLE_TTL_SECONDS)
+        # Estado da última leitura do ficheiro, para os reloads aplicarem só a diferença
+        self._file_state = ProxyFileState()
+        self._reload_lock = asyncio.Lock()
+        # Índice dos proxies prontos a usar: lista + posição de cada chave,
+        # para inserir, remover e escolher em O(1) sem percorrer o pool.
+        self._ready: List[ProxyKey] = []
+        self._ready_pos: Dict[ProxyKey, int] = {}
+        # Proxies em cooldown: prazo atual de cada chave e um min-heap ordenado
+        # por esse prazo. Entradas do heap cujo prazo já não coincide com o de
+        # `_cooldown_deadline` estão obsoletas e são descartadas ao sair do heap.
+        self._cooldown_deadline: Dict[ProxyKey, float] = {}
+        self._cooldown_heap: List[Tuple[float, ProxyKey]] = []
+        # Revalidação ativa (revalidator.py), ligada pelo dono do pool: hora da
+        # próxima sonda de cada proxy em cooldown por falhas, com um min-heap
+        # como o do cooldown, e as sondas em curso
+        self.revalidate = False
+        self._probe_at: Dict[ProxyKey, float] = {}
+        self._probe_heap: List[Tuple[float, ProxyKey]] = []
+        self._probing: Set[ProxyKey] = set()
+        # Pedidos entregues e ainda não reportados de todos os proxies, por ordem de
+        # entrega (ver Proxy.leases): os que passam de PROXY_IN_FLIGHT_LEASE_SEC expiram
+        self._leases: Deque[Tuple[float, ProxyKey]] = deque()
+        # Chaves retiradas pela revalidação ou por POST /ingest que o ficheiro ainda
+        # pode listar (o checker reescreve-o a meio da ronda com as linhas antigas):
+        # só voltam quando o checker as validar de novo, ou seja, quando a linha
+        # volta a entrar no ficheiro (diff.added) ou chega um "add" em /ingest
+        self._evicted: Set[ProxyKey] = set()
+        # Proxies alterados por relatórios desde o último lote do journal, e o
+        # último estado gravado de cada proxy (só os que não estão no estado inicial)
+        self._state_changes: Set[ProxyKey] = set()
+        self._saved_state: Dict[str, list] = {}
         self.load_proxies()
 
+    # --- Manutenção dos índices ---
+
+    def _add_ready(self, key: ProxyKey):
+        if key in self._ready_pos:
+            return
+        self._ready_pos[key] = len(self._ready)
+        self._ready.append(key)
+
+    def _remove_ready(self, key: ProxyKey):
+        pos = self._ready_pos.pop(key, None)
+        if pos is None:
+            return
+        last_key = self._ready.pop()
+        if last_key != key:
+            # Troca com o último elemento para remover em O(1)
+            self._ready[pos] = last_key
+            self._ready_pos[last_key] = pos
+
+    def _enter_cooldown(self, key: ProxyKey, proxy: Proxy, until: float):
+        """`until` é um prazo em time.monotonic()."""
+        proxy.cooldown_until = until
+        deadline = until
+        self._remove_ready(key)
+        # As sessões deste proxy passam a outro no próximo pedido
+        self.sessions.drop_proxy(key)
+        self._cooldown_deadline[key] = deadline
+        heapq.heappush(self._cooldown_heap, (deadline, key))
+        # Compactar o heap se acumular demasiadas entradas obsoletas
+        if len(self._cooldown_heap) > 2 * len(self._cooldown_deadline) + 64:
+            self._cooldown_heap = [(d, k) for k, d in self._cooldown_deadline.items()]
+            heapq.heapify(self._cooldown_heap)
+
+    def _release_expired(self, now: float):
+        """Devolve ao conjunto de prontos os proxies cujo cooldown já terminou."""
+        heap = self._cooldown_heap
+        while heap and heap[0][0] <= now:
+            deadline, key = heapq.heappop(heap)
+            if self._cooldown_deadline.get(key) != deadline:
+                continue  # Entrada obsoleta (cooldown renovado ou proxy removido)
+            del self._cooldown_deadline[key]
+            self._add_ready(key)
+
+    def _lease(self, key: ProxyKey, proxy: Proxy, now: float):
+        if proxy.leases is None:
+            proxy.leases = deque()
+        proxy.leases.append(now)
+        proxy.in_flight += 1
+        self._leases.append((now, key))
+
+    def _end_lease(self, proxy: Proxy):
+        """Um relatório não diz a que pedido se refere: termina o mais antigo."""
+        if proxy.leases:
+            proxy.leases.popleft()
+            proxy.in_flight -= 1
+
+    def _expire_leases(self, now: float):
+        """Deixa de contar os pedidos entregues há mais de PROXY_IN_FLIGHT_LEASE_SEC e nunca reportados."""
+        leases = self._leases
+        oldest_valid = now - PROXY_IN_FLIGHT_LEASE_SEC
+        while leases and leases[0][0] <= oldest_valid:
+            leased_at, key = leases.popleft()
+            proxy = self.proxies.get(key)
+            # Se o mais antigo do proxy é mais recente, este já foi reportado (ou o proxy foi substituído)
+            if proxy is not None and proxy.leases and proxy.leases[0] <= leased_at:
+                self._end_lease(proxy)
+                LEASES_EXPIRED.inc()
+
+    def _track(self, key: ProxyKey, proxy: Proxy):
+        if proxy.is_active():
+            self._add_ready(key)
+        else:
+            self._enter_cooldown(key, proxy, proxy.cooldown_until)
+
+    def _rebuild_indexes(self, now: float):
+        """Reconstrói os índices de uma só vez a partir do estado dos proxies (usado ao repor o estado)."""
+        self._ready = []
+        self._cooldown_deadline = {}
+        for key, proxy in self.proxies.items():
+            deadline = proxy.cooldown_until or 0.0
+            if deadline > now:
+                self._cooldown_deadline[key] = deadline
+            else:
+                self._ready.append(key)
+        self._ready_pos = {key: pos for pos, key in enumerate(self._ready)}
+        self._cooldown_heap = [(d, k) for k, d in self._cooldown_deadline.items()]
+        heapq.heapify(self._cooldown_heap)
+
+    def _untrack(self, key: ProxyKey):
+        self._remove_ready(key)
+        self.sessions.drop_proxy(key)
+        self._cooldown_deadline.pop(key, None)
+        self._probe_at.pop(key, None)
+        self._probing.discard(key)
+
+    def _schedule_probe(self, key: ProxyKey, proxy: Proxy, not_before: float, after_failure: bool):
+        """Sonda perto do fim do cooldown ou, depois de falhas seguidas reportadas, logo a seguir (`not_before`)."""
+        if not self.revalidate:
+            return
+        if after_failure and proxy.failures >= SERVICE_REVALIDATION_FAILURES:
+            at = not_before
+        else:
+            at = max(not_before, proxy.cooldown_until - SERVICE_REVALIDATION_LEAD_SEC)
+        self._probe_at[key] = at
+        heapq.heappush(self._probe_heap, (at, key))
+        if len(self._probe_heap) > 2 * len(self._probe_at) + 64:
+            self._probe_heap = [(a, k) for k, a in self._probe_at.items()]
+            heapq.heapify(self._probe_heap)
+
+    # --- API pública ---
+
     def load_proxies(self):
-        loaded_proxies = load_proxies_from_text_file(self.data_file)
-        new_proxies_map = {f"{p.ip}:{p.port}:{p.protocol}": p for p in loaded_proxies}
-        for key in new_proxies_map:
+        """Leitura síncrona do ficheiro; usar só fora do loop (arranque, benchmarks)."""
+        started = time.perf_counter()
+        changed = self.apply_file_diff(diff_proxy_file(self.data_file, self._file_state))
+        LOAD_SECONDS.observe(time.perf_counter() - started)
+        RELOADS["changed" if changed else "unchanged"].inc()
+
+    async def reload(self) -> bool:
+        """
+        Compara o ficheiro com a última leitura num thread à parte e aplica no loop
+        só a diferença, de uma só vez. Se o ficheiro não mudou (mtime/tamanho ou
+        hash iguais) não há nada a aplicar. Devolve True se houve alterações.
+        """
+        # O estado da leitura só pode ser usado por um reload de cada vez
+        async with self._reload_lock:
+            started = time.perf_counter()
+            diff = await asyncio.to_thread(diff_proxy_file, self.data_file, self._file_state)
+            changed = self.apply_file_diff(diff)
+            LOAD_SECONDS.observe(time.perf_counter() - started)
+            RELOADS["changed" if changed else "unchanged"].inc()
+            return changed
+
+    def apply_file_diff(self, diff: Optional[ProxyFileDiff]) -> bool:
+        if diff is None:
+            return False
+        if diff.missing:
+            logger.error("PROXY_FILE_NOT_FOUND", "Ficheiro de proxies não encontrado", path=self.data_file)
+        for line in diff.bad_lines:
+            logger.warning("BAD_PROXY_LINE", "Ignorando linha mal formatada", line=line)
+        # Uma chave retirada cuja linha se manteve continua fora; volta se a linha
+        # saiu e voltou a entrar (validada de novo), e é esquecida se saiu de vez
+        if self._evicted:
+            self._evicted.difference_update(diff.added)
+            self._evicted.difference_update(diff.removed)
+        self.apply_diff(diff.added, diff.removed)
+        return True
+
+    def apply_diff(self, added: Dict[ProxyKey, Proxy], removed: Set[ProxyKey]):
+        # Só se tocam as chaves acrescentadas e removidas; os restantes proxies
+        # mantêm o objeto e o estado atual (cooldown, falhas, estatísticas).
+        # Contam-se só as chaves que entraram ou saíram mesmo (ex.: não as que
+        # POST /ingest já tinha acrescentado)
+        inserted = untracked = 0
+        for key, proxy in added.items():
             if key in self.proxies:
-                # Mantém o estado atual (cooldown, falhas) do proxy se ele já existir
-                new_proxies_map[key] = self.proxies[key]
-        self.proxies = new_proxies_map
-        print(f"({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) Proxies carregados/recarregados. Total no pool: {len(self.proxies)}")
+                continue
+            self.proxies[key] = proxy
+            self._track(key, proxy)
+            inserted += 1
+        for key in removed:
+            if key in self.proxies:
+                # Também larga as sessões associadas ao proxy
+                self._untrack(key)
+                del self.proxies[key]
+                self._state_changes.add(key)
+                untracked += 1
+        PROXIES_ADDED.inc(inserted)
+        PROXIES_REMOVED.inc(untracked)
+        logger.info("PROXIES_LOADED", "Proxies carregados/recarregados", total=len(self.proxies),
+                    added=inserted, removed=untracked)
+
+    def ingest(self, events: Sequence[Tuple[str, str, Optional[float]]]) -> Dict[str, int]:
+        """
+        Aplica eventos do checker, (operação, 'protocolo://ip:porto', latência em ms):
+        "add"/"latency" acrescentam o proxy se ainda não estiver no pool e juntam a
+        latência medida à do proxy; "remove" retira-o (até o checker o voltar a
+        validar, ver apply_file_diff). Devolve quantos eventos tiveram cada
+        resultado (ver INGESTED).
+        """
+        counts = dict.fromkeys(INGESTED, 0)
+        now = time.time()
+        for op, line, latency_ms in events:
+            try:
+                parsed = parse_proxy_line(line)
+            except (ValueError, IndexError):
+                parsed = None
+            if parsed is None or op not in ("add", "latency", "remove"):
+                counts["invalid"] += 1
+                continue
+            key, ip, port, protocol = parsed
+            proxy = self.proxies.get(key)
+            if op == "remove":
+                if proxy is None:
+                    counts["ignored"] += 1
+                    continue
+                self._untrack(key)
+                del self.proxies[key]
+                self._state_changes.add(key)
+                self._evicted.add(key)
+                counts["remove"] += 1
+                continue
+            if proxy is None:
+                proxy = self.proxies[key] = Proxy(ip=ip, port=port, protocol=protocol, key=key)
+                self._track(key, proxy)
+                self._evicted.discard(key)
+                counts["add"] += 1
+            else:
+                counts["latency"] += 1
+            proxy.last_validated = now
+            # Proxy novo ou revalidado pelo checker: entra no próximo lote do journal
+            self._state_changes.add(key)
+            if latency_ms is not None:
+                # A medição do checker entra na mesma média móvel que os relatórios dos clientes
+                proxy.latency = latency_ms if proxy.latency is None else \
+                    proxy.latency + PROXY_STATS_EWMA_ALPHA * (latency_ms - proxy.latency)
+        for result, count in counts.items():
+            INGESTED[result].inc(count)
+        logger.debug("INGEST", "Eventos do checker aplicados", total=len(self.proxies), **counts)
+        return counts
+
+    # --- Estado persistente (pool_state.py) ---
+
+    def export_state(self) -> PoolState:
+        """
+        Fotografia do estado atual; inclui as alterações ainda não enviadas para o
+        journal. Copia o estado já gravado em vez de percorrer o pool, para não
+        ocupar o loop com pools grandes.
+        """
+        self.take_state_changes()
+        return PoolState(written_at=time.time(), proxies=dict(self._saved_state), sessions=self.sessions.snapshot())
+
+    def take_state_changes(self) -> Dict[str, Optional[list]]:
+        """Estado atual dos proxies alterados desde a última chamada (None = estado inicial)."""
+        changes = {}
+        for key in self._state_changes:
+            proxy = self.proxies.get(key)
+            state = proxy_state(proxy) if proxy is not None else None
+            changes[key] = state
+            if state is None:
+                self._saved_state.pop(key, None)
+            else:
+                self._saved_state[key] = state
+        self._state_changes.clear()
+        return changes
+
+    def restore_state(self, state: PoolState):
+        """
+        Repõe o estado gravado nos proxies que estão no pool; as chaves que já não
+        existem são ignoradas. Usar no arranque, antes de haver sessões.
+        """
+        now = time.time()
+        restored = 0
+        for key_str, values in state.proxies.items():
+            proxy = self.proxies.get(key_str)
+            if proxy is not None:
+                apply_proxy_state(proxy, values, now)
+                restored += 1
+                if values is not None:
+                    self._saved_state[key_str] = values
+        self._rebuild_indexes(time.monotonic())
+        for key in self._cooldown_deadline:
+            proxy = self.proxies[key]
+            if proxy.failures:
+                self._schedule_probe(key, proxy, time.monotonic(), after_failure=False)
+        # O tempo em que o serviço esteve parado também conta como inatividade das sessões
+        downtime = max(0.0, now - state.written_at) if state.written_at else 0.0
+        sessions = 0
+        for session_id, key, idle_sec in state.sessions:
+            idle_sec += downtime
+            if key in self._ready_pos and idle_sec <= self.sessions.idle_ttl_sec:
+                self.sessions.set(session_id, key, idle_sec)
+                sessions += 1
+        logger.info("STATE_RESTORED", "Estado do pool reposto", proxies=restored,
+                    cooldown=len(self._cooldown_deadline), sessions=sessions, journal_batches=state.journal_batches)
+
+    # --- Consultas ---
 
     def get_available_proxies(self) -> List[Proxy]:
-        return [p for p in self.proxies.values() if p.is_active()]
+        self._release_expired(time.monotonic())
+        return [self.proxies[key] for key in self._ready]
 
     def get_cooldown_proxies(self) -> List[Proxy]:
-        return [p for p in self.proxies.values() if not p.is_active()]
-
-    def get_proxy(self, session_id: str) -> Optional[Proxy]:
-        # O lock garante que apenas um thread pode executar este bloco de cada vez,
-        # prevenindo que dois pedidos recebam o mesmo proxy simultaneamente.
-        with self.lock:
-            # Tenta manter o proxy da sessão se ainda for válido
-            if session_id in self.session_proxy_map:
-                proxy_key = self.session_proxy_map[session_id]
-                if proxy_key in self.proxies:
-                    proxy = self.proxies[proxy_key]
-                    if proxy.is_active() and proxy.requests_served < REQUESTS_PER_PROXY:
-                        proxy.requests_served += 1 # Incrementar o uso
-                        return proxy
-            
-            # Se não, procura um novo proxy
-            available_proxies = self.get_available_proxies()
-            if not available_proxies:
-                return None
-            
-            # Lógica simples: pegar no primeiro disponível
-            new_proxy = available_proxies[0]
-            
-            # Marcar o proxy como "usado" imediatamente para que o próximo pedido não o apanhe
-            new_proxy.requests_served += 1
-
-            new_proxy_key = f"{new_proxy.ip}:{new_proxy.port}:{new_proxy.protocol}"
-            print(f"({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) LOG: Rotação de proxy para a sessão '{session_id}'. Novo proxy: {new_proxy_key}")
-            self.session_proxy_map[session_id] = new_proxy_key
-            return new_proxy
-
-    def report_proxy_usage(self, proxy_key: str, success: bool):
-        if proxy_key not in self.proxies:
-            return
+        self._release_expired(time.monotonic())
+        return [self.proxies[key] for key in self._cooldown_deadline]
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Contagens do pool, mantidas pelos índices (sem percorrer os proxies)."""
+        self._release_expired(time.monotonic())
+        self.sessions.expire()
+        return {
+            "total_proxies_in_pool": len(self.proxies),
+            "available_proxies": len(self._ready),
+            "proxies_in_cooldown": len(self._cooldown_deadline),
+            "active_sessions": len(self.sessions),
+            "sessions_evicted": sum(self.sessions.evicted.values()),
+        }
+
+    def register_metrics(self):
+        """Liga os gauges do registo aos índices deste pool (lidos na recolha, sem percorrer o pool)."""
+        REGISTRY.gauge_function("proxy_pool_proxies", "Proxies no pool.", lambda: len(self.proxies))
+        REGISTRY.gauge_function("proxy_pool_available_proxies", "Proxies prontos a usar.", lambda: len(self._ready))
+        REGISTRY.gauge_function("proxy_pool_cooldown_proxies", "Proxies em cooldown.",
+                                lambda: len(self._cooldown_deadline))
+        REGISTRY.gauge_function("proxy_pool_sessions", "Sessões com proxy associado.", lambda: len(self.sessions))
+        REGISTRY.gauge_function("proxy_pool_revalidations_scheduled", "Proxies com uma sonda de revalidação agendada.",
+                                lambda: len(self._probe_at))
+        REGISTRY.gauge_function("proxy_pool_revalidations_in_flight", "Sondas de revalidação em curso.",
+                                lambda: len(self._probing))
+        REGISTRY.gauge_function("proxy_pool_evicted_proxies",
+                                "Proxies retirados (revalidação ou /ingest) à espera de nova validação do checker.",
+                                lambda: len(self._evicted))
+        for reason in self.sessions.evicted:
+            REGISTRY.gauge_function("proxy_pool_sessions_evicted_total",
+                                    "Sessões retiradas: ttl (inatividade), lru (limite) ou proxy (o proxy saiu).",
+                                    lambda reason=reason: self.sessions.evicted[reason],
+                                    {"reason": reason}, kind="counter")
+
+    def metrics_text(self) -> str:
+        """Métricas do processo no formato de texto do Prometheus."""
+        self._release_expired(time.monotonic())
+        self.sessions.expire()
+        return REGISTRY.render()
+
+    def get_proxy(self, session_id: Optional[str]) -> Optional[Proxy]:
+        """Proxy da sessão (ou um novo); com session_id=None escolhe um sem o associar a nenhuma sessão."""
+        started = time.perf_counter()
+        proxy = self._get_proxy(session_id)
+        ACQUIRE_SECONDS.observe(time.perf_counter() - started)
+        return proxy
+
+    def _serve(self, key: ProxyKey, proxy: Proxy, now: float):
+        """Conta um pedido entregue e gasta um token; sem tokens, o proxy espera em cooldown pelo próximo."""
+        proxy.requests_served += 1
+        self._lease(key, proxy, now)
+        until = self.rate_limit.take(proxy, now)
+        if until is not None:
+            self._enter_cooldown(key, proxy, until)
+            COOLDOWNS["limit"].inc()
+            logger.debug("PROXY_LIMIT_REACHED", "Proxy sem tokens; em cooldown até ao próximo.", proxy=proxy.key_str,
+                         cooldown_sec=round(until - now, 1))
+
+    def _get_proxy(self, session_id: Optional[str]) -> Optional[Proxy]:
+        now = time.monotonic()
+        self._release_expired(now)
+        self._expire_leases(now)
+
+        # Tenta manter o proxy da sessão se ainda for válido (um proxy pronto tem sempre um token)
+        proxy_key = self.sessions.get(session_id) if session_id is not None else None
+        if proxy_key is not None:
+            if proxy_key in self._ready_pos:
+                proxy = self.proxies[proxy_key]
+                self._serve(proxy_key, proxy, now)
+                ACQUIRES["sticky"].inc()
+                return proxy
         
-        proxy = self.proxies[proxy_key]
+        # Se não, procura um novo proxy
+        if not self._ready:
+            ACQUIRES["unavailable"].inc()
+            return None
+        
+        new_proxy_key = self.select_proxy(self._ready, self.proxies, self._rng)
+        new_proxy = self.proxies[new_proxy_key]
+        
+        # Marcar o proxy como "usado" imediatamente para que o próximo pedido não o apanhe
+        self._serve(new_proxy_key, new_proxy, now)
+        ACQUIRES["rotated" if proxy_key is not None else "new"].inc()
+
+        if session_id is not None:
+            logger.debug("PROXY_ROTATED", "Rotação de proxy para a sessão", session=session_id, proxy=new_proxy.key_str)
+            self.sessions.set(session_id, new_proxy_key)
+        return new_proxy
+
+    def get_proxies(self, session_id: str, count: int) -> List[Proxy]:
+        """
+        O proxy da sessão (como em get_proxy) e mais `count - 1` proxies distintos
+        escolhidos pela estratégia. Os extra não ficam associados à sessão.
+        """
+        first = self.get_proxy(session_id)
+        if first is None:
+            return []
+        chosen = [first]
+        # Retirar temporariamente dos prontos os já escolhidos para não se repetirem
+        taken = [first.key]
+        self._remove_ready(taken[0])
+        now = time.monotonic()
+        while len(chosen) < count and self._ready:
+            key = self.select_proxy(self._ready, self.proxies, self._rng)
+            proxy = self.proxies[key]
+            self._serve(key, proxy, now)
+            self._remove_ready(key)
+            taken.append(key)
+            chosen.append(proxy)
+        for key in taken:
+            if key not in self._cooldown_deadline:
+                self._add_ready(key)
+        return chosen
+
+    def report_proxy_usage(self, proxy_key: ProxyKey, success: bool, latency_ms: Optional[float] = None,
+                           status_code: Optional[int] = None) -> bool:
+        """
+        `proxy_key` no formato da API ('ip:porto:protocolo').
+        Devolve False se o proxy já não está no pool (relatório ignorado).
+        """
+        started = time.perf_counter()
+        known = self._report_proxy_usage(proxy_key, success, latency_ms, status_code)
+        REPORT_SECONDS.observe(time.perf_counter() - started)
+        return known
+
+    def _report_proxy_usage(self, proxy_key: ProxyKey, success: bool, latency_ms: Optional[float],
+                            status_code: Optional[int]) -> bool:
+        proxy = self.proxies.get(proxy_key)
+        if proxy is None:
+            REPORTS["unknown"].inc()
+            return False
+
+        self._end_lease(proxy)
+        self._state_changes.add(proxy_key)
+        now = time.monotonic()
+
+        if self.rate_limit.is_rate_limited(status_code):
+            # O proxy funciona, a Steam é que limitou o IP: menos pedidos, sem contar como falha
+            # (e sem sonda: libertá-lo mais cedo voltaria a exceder o limite)
+            REPORTS["rate_limited"].inc()
+            self._cancel_probe(proxy_key)
+            until = self.rate_limit.on_rate_limited(proxy, now)
+            if until > (proxy.cooldown_until or 0.0):
+                self._enter_cooldown(proxy_key, proxy, until)
+                COOLDOWNS["rate_limited"].inc()
+                RATE_LIMIT_RATE.observe(proxy.rate)
+                logger.info("PROXY_RATE_LIMITED", "Proxy limitado pela Steam (429). A entrar em cooldown.",
+                            proxy=proxy.key_str, rate_per_min=round(proxy.rate * 60, 2), streak=proxy.rate_limited,
+                            cooldown_sec=round(until - now, 1))
+            return True
+
+        update_proxy_stats(proxy, success, latency_ms, PROXY_STATS_EWMA_ALPHA)
+        REPORTS["success" if success else "failure"].inc()
+        SUCCESS_RATE.observe(proxy.success_rate)
+        if latency_ms is not None:
+            REPORTED_LATENCY.observe(latency_ms / 1000.0)
 
         if not success:
             proxy.mark_failed()
-            proxy.cooldown_until = datetime.now() + timedelta(seconds=COOLDOWN_TIME_SECONDS)
-            print(f"({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) LOG: Proxy {proxy_key} reportado com FALHA. A entrar em cooldown.")
-            return
-        
-        # Se sucesso, resetar o contador de falhas
+            # Um cooldown mais longo que já esteja a decorrer (ex.: de um 429) mantém-se
+            until = max(self.rate_limit.on_failure(proxy, now), proxy.cooldown_until or 0.0)
+            self._enter_cooldown(proxy_key, proxy, until)
+            self._schedule_probe(proxy_key, proxy, now, after_failure=True)
+            COOLDOWNS["failure"].inc()
+            logger.info("PROXY_FAILED", "Proxy reportado com FALHA. A entrar em cooldown.", proxy=proxy.key_str,
+                        status=status_code, failures=proxy.failures, cooldown_sec=round(until - now, 1))
+            return True
+
+        # Se sucesso, resetar o contador de falhas e subir a taxa de pedidos
         proxy.reset_failures()
-        
-        # Verificar se atingiu o limite de pedidos
-        if proxy.requests_served >= REQUESTS_PER_PROXY:
-            proxy.cooldown_until = datetime.now() + timedelta(seconds=COOLDOWN_TIME_SECONDS)
-            proxy.requests_served = 0 # Resetar para a próxima utilização
-            print(f"({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) LOG: Proxy {proxy_key} atingiu o limite de {REQUESTS_PER_PROXY} pedidos e entrou em cooldown.")
+        self.rate_limit.on_success(proxy)
+        self._cancel_probe(proxy_key)
+        return True
+
+    # --- Revalidação ativa (revalidator.py) ---
+
+    def _cancel_probe(self, key: ProxyKey):
+        self._probe_at.pop(key, None)
+        self._probing.discard(key)
 
-proxy_pool = ProxyPool(DATA_FILE)
+    def take_due_probes(self, now: float, limit: int) -> List[Proxy]:
+        """Até `limit` proxies com a sonda na hora e ainda em cooldown; ficam marcados como "em sonda"."""
+        due = []
+        heap = self._probe_heap
+        while heap and heap[0][0] <= now and len(due) < limit:
+            at, key = heapq.heappop(heap)
+            if self._probe_at.get(key) != at:
+                continue  # Entrada obsoleta (sonda reagendada ou cancelada)
+            del self._probe_at[key]
+            if key not in self._cooldown_deadline or key in self._probing:
+                continue  # Já saiu do cooldown, ou já tem uma sonda em curso
+            self._probing.add(key)
+            due.append(self.proxies[key])
+        return due
+
+    def apply_probe(self, proxy: Proxy, outcome: str, latency_ms: Optional[float]) -> str:
+        """
+        Resultado de uma sonda (adaptive_limiter.OUTCOME_* ou revalidator.OUTCOME_RATE_LIMITED).
+        Devolve a ação tomada (ver REVALIDATIONS).
+        """
+        key = proxy.key
+        if key not in self._probing or self.proxies.get(key) is not proxy:
+            # Entretanto foi removido, reportado com sucesso ou limitado (429)
+            REVALIDATIONS["stale"].inc()
+            return "stale"
+        self._probing.discard(key)
+        now = time.monotonic()
+        if outcome == OUTCOME_LOCAL_ERROR:
+            # O erro foi deste lado (ex.: sem sockets): o proxy não tem culpa, tentar de novo depois
+            self._schedule_probe(key, proxy, now + SERVICE_REVALIDATION_LEAD_SEC, after_failure=False)
+            action = "retry"
+        elif outcome == OUTCOME_OK or outcome == OUTCOME_RATE_LIMITED:
+            proxy.reset_failures()
+            proxy.last_validated = time.time()
+            self._state_changes.add(key)
+            if outcome == OUTCOME_RATE_LIMITED:
+                until = max(self.rate_limit.on_rate_limited(proxy, now), proxy.cooldown_until or 0.0)
+                self._enter_cooldown(key, proxy, until)
+                action = "rate_limited"
+            else:
+                update_proxy_stats(proxy, True, latency_ms, PROXY_STATS_EWMA_ALPHA)
+                self._cooldown_deadline.pop(key, None)
+                proxy.cooldown_until = None
+                # A sonda foi um pedido à Steam: gasta um token, como um pedido entregue
+                until = self.rate_limit.take(proxy, now)
+                if until is not None:
+                    self._enter_cooldown(key, proxy, until)
+                else:
+                    self._add_ready(key)
+                action = "released"
+        else:
+            proxy.mark_failed()
+            update_proxy_stats(proxy, False, None, PROXY_STATS_EWMA_ALPHA)
+            self._state_changes.add(key)
+            if proxy.failures >= SERVICE_REVALIDATION_EVICT_FAILURES:
+                self._untrack(key)
+                del self.proxies[key]
+                self._evicted.add(key)
+                logger.info("PROXY_EVICTED", "Proxy retirado do pool depois de falhar a revalidação.",
+                            proxy=proxy.key_str, failures=proxy.failures)
+                action = "evicted"
+            else:
+                until = max(self.rate_limit.on_failure(proxy, now), proxy.cooldown_until or 0.0)
+                self._enter_cooldown(key, proxy, until)
+                self._schedule_probe(key, proxy, now, after_failure=False)
+                action = "failed"
+        REVALIDATIONS[action].inc()
+        return action
+
+# Criados no arranque (lifespan ou coordenador): o pool só existe no processo que é dono dele
+proxy_pool: Optional[ProxyPool] = None
+pool_backend = None
 
 # --- TAREFAS DE FUNDO ---
 
-def _reload_proxies_periodically():
+# Correm como tarefas no loop do dono do pool; o I/O é feito em asyncio.to_thread.
+
+async def _reload_proxies():
+    try:
+        if await proxy_pool.reload():
+            logger.debug("RELOAD", "Ficheiro de proxies alterado e recarregado", path=DATA_FILE)
+    except Exception as e:
+        RELOADS["error"].inc()
+        logger.error("RELOAD_ERROR", f"{type(e).__name__}: {e}", path=DATA_FILE)
+
+async def _reload_proxies_periodically():
+    # Mesmo com watchfiles, o polling fica como rede de segurança (custa um stat)
     while True:
-        time.sleep(RELOAD_INTERVAL_SECONDS)
-        print(f"({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) INFO: Tarefa de fundo a recarregar proxies de '{DATA_FILE}'...")
-        proxy_pool.load_proxies()
+        await asyncio.sleep(RELOAD_INTERVAL_SECONDS)
+        await _reload_proxies()
+
+async def _watch_proxy_file():
+    """Recarrega assim que o ficheiro muda. Vigia a pasta, porque o checker substitui o ficheiro (os.replace)."""
+    directory = os.path.dirname(os.path.abspath(DATA_FILE))
+    name = os.path.basename(DATA_FILE)
+    try:
+        async for changes in awatch(directory, debounce=500):
+            if any(os.path.basename(path) == name for _, path in changes):
+                await _reload_proxies()
+    except Exception as e:
+        logger.warning("WATCH_UNAVAILABLE", f"Sem vigilância do ficheiro ({type(e).__name__}: {e}); fica só o polling",
+                       path=DATA_FILE)
 
-def _update_cooldown_file_periodically():
+async def _persist_state_periodically(store: PoolStateStore):
+    """
+    Um lote do journal a cada STATE_JOURNAL_FLUSH_INTERVAL_SECONDS e uma fotografia
+    a cada STATE_SNAPSHOT_INTERVAL_SECONDS. Corre numa só tarefa para o journal
+    nunca ser escrito enquanto a fotografia o está a limpar.
+    """
+    last_snapshot = time.monotonic()
     while True:
-        time.sleep(COOLDOWN_FILE_UPDATE_INTERVAL_SECONDS)
-        cooldown_proxies = proxy_pool.get_cooldown_proxies()
+        await asyncio.sleep(STATE_JOURNAL_FLUSH_INTERVAL_SECONDS)
         try:
-            temp_file = COOLDOWN_PROXIES_FILE + ".tmp"
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                for p in cooldown_proxies:
-                    f.write(f"{p.protocol}://{p.ip}:{p.port}\n")
-            os.replace(temp_file, COOLDOWN_PROXIES_FILE)
+            if time.monotonic() - last_snapshot >= STATE_SNAPSHOT_INTERVAL_SECONDS:
+                await _write_snapshot(store)
+                last_snapshot = time.monotonic()
+                continue
+            # Fotografia do estado no loop; a escrita é feita noutro thread
+            started = time.perf_counter()
+            changes = proxy_pool.take_state_changes()
+            if changes:
+                await asyncio.to_thread(store.append_journal, changes)
+                STATE_WRITE_SECONDS["journal"].observe(time.perf_counter() - started)
         except Exception as e:
-            print(f"({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) ERRO: Falha ao escrever no ficheiro de cooldown '{COOLDOWN_PROXIES_FILE}': {e}")
+            STATE_WRITE_ERRORS.inc()
+            logger.error("STATE_WRITE_ERROR", f"Falha ao gravar o estado do pool: {e}", path=store.journal_path)
+
+async def _write_snapshot(store: PoolStateStore):
+    started = time.perf_counter()
+    state = proxy_pool.export_state()
+    await asyncio.to_thread(store.write_snapshot, state)
+    STATE_WRITE_SECONDS["snapshot"].observe(time.perf_counter() - started)
+    logger.debug("STATE_SNAPSHOT", "Fotografia do estado do pool gravada", proxies=len(state.proxies),
+                 sessions=len(state.sessions), path=store.snapshot_path)
+
+async def _measure_loop_lag():
+    """Quanto o loop demora a acordar uma tarefa além do previsto: o tempo que os pedidos esperam pelo loop."""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL_SECONDS)
+        LOOP_LAG.observe(max(0.0, time.perf_counter() - started - LOOP_LAG_INTERVAL_SECONDS))
+
+# --- ARRANQUE E PARAGEM DO POOL ---
+
+class PoolOwner:
+    """O pool e o que corre à volta dele (tarefas de fundo, forward proxy), no processo que é dono dele."""
+
+    def __init__(self):
+        self.state_store = PoolStateStore(STATE_SNAPSHOT_FILE, STATE_JOURNAL_FILE)
+        self.background_tasks: List[asyncio.Task] = []
+        self.forward_proxy: Optional[ForwardProxyServer] = None
+        self.revalidator = None
+
+    async def start(self):
+        global proxy_pool
+        open_service_log()
+        logger.info("STARTUP", "A carregar o pool e a iniciar tarefas de fundo (recarregamento e gravação do estado).")
+        # A leitura inicial do ficheiro é bloqueante: fora do loop
+        proxy_pool = await asyncio.to_thread(ProxyPool, DATA_FILE)
+        if SERVICE_REVALIDATION_ENABLED:
+            if ProxyRevalidator is None:
+                logger.warning("REVALIDATION_DISABLED", "Revalidação ativa desligada: instale aiohttp e aiohttp_socks.")
+            else:
+                # Antes de repor o estado, para os proxies em cooldown por falhas ficarem com a sonda agendada
+                proxy_pool.revalidate = True
+        try:
+            state = await asyncio.to_thread(self.state_store.load)
+            proxy_pool.restore_state(state)
+        except Exception as e:
+            logger.error("STATE_RESTORE_ERROR", f"Estado do pool não reposto ({type(e).__name__}: {e}); a começar do zero",
+                         path=STATE_SNAPSHOT_FILE)
+        # Os proxies carregados vivem até serem removidos do ficheiro: tirá-los das
+        # passagens completas do GC evita pausas proporcionais ao tamanho do pool
+        gc.collect()
+        gc.freeze()
+        proxy_pool.register_metrics()
+
+        self.background_tasks = [
+            asyncio.create_task(_reload_proxies_periodically()),
+            asyncio.create_task(_persist_state_periodically(self.state_store)),
+            asyncio.create_task(_measure_loop_lag()),
+        ]
+        if RELOAD_WATCH_FILE and awatch is not None:
+            self.background_tasks.append(asyncio.create_task(_watch_proxy_file()))
+        if proxy_pool.revalidate:
+            self.revalidator = ProxyRevalidator(
+                SERVICE_REVALIDATION_URL or CHECKER_VALIDATION_URL, CHECKER_VALIDATION_TEXT, CHECKER_HEADERS,
+                SERVICE_REVALIDATION_CONCURRENCY, SERVICE_REVALIDATION_TIMEOUT_SEC, SERVICE_REVALIDATION_INTERVAL_SEC,
+                PROXY_RATE_LIMIT_STATUS, logger,
+            )
+            await self.revalidator.start()
+            self.background_tasks.append(asyncio.create_task(self.revalidator.run(proxy_pool)))
+        if FORWARD_PROXY_ENABLED:
+            self.forward_proxy = ForwardProxyServer(
+                LocalPoolBackend(proxy_pool), logger, FORWARD_PROXY_HOST, FORWARD_PROXY_PORT,
+                FORWARD_PROXY_SESSION_HEADER, FORWARD_PROXY_CONNECT_TIMEOUT_SEC, FORWARD_PROXY_MAX_ATTEMPTS,
+                FORWARD_PROXY_IDLE_TIMEOUT_SEC,
+            )
+            await self.forward_proxy.start()
+
+    async def stop(self):
+        if self.forward_proxy:
+            await self.forward_proxy.close()
+        for task in self.background_tasks:
+            task.cancel()
+        for task in self.background_tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        if self.revalidator:
+            await self.revalidator.close()
+        try:
+            # A fotografia final já inclui as alterações ainda fora do journal
+            await _write_snapshot(self.state_store)
+        except Exception as e:
+            logger.error("STATE_WRITE_ERROR", f"Falha ao gravar o estado do pool: {e}", path=STATE_SNAPSHOT_FILE)
+
+async def run_coordinator(address: str):
+    """Processo coordenador: dono do pool para todos os workers (ver pool_backend.py)."""
+    owner = PoolOwner()
+    await owner.start()
+    coordinator = PoolCoordinator(proxy_pool, logger, address)
+    await coordinator.start()
+    stop = asyncio.Event()
+    if sys.platform != "win32":
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await coordinator.close()
+        await owner.stop()
+        logger.info("SHUTDOWN", "Coordenador a terminar.")
+        logger.close()
 
 # --- GESTOR DE CICLO DE VIDA (LIFESPAN) ---
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("INFO: A iniciar tarefas de fundo (recarregamento de proxies e escrita de cooldown).")
-    
-    reload_thread = threading.Thread(target=_reload_proxies_periodically, daemon=True)
-    reload_thread.start()
-    
-    cooldown_thread = threading.Thread(target=_update_cooldown_file_periodically, daemon=True)
-    cooldown_thread.start()
-    
+    global pool_backend
+    address = os.environ.get(POOL_COORDINATOR_ENV)
+    owner = None
+    if address:
+        # Um de vários workers: o pool está no coordenador
+        pool_backend = CoordinatorPoolBackend(address)
+        await pool_backend.connect()
+        logger.info("STARTUP", "Worker ligado ao coordenador do pool.", address=address, pid=os.getpid())
+    else:
+        owner = PoolOwner()
+        await owner.start()
+        pool_backend = LocalPoolBackend(proxy_pool)
+
     yield
-    
-    print("INFO: Aplicação a terminar.")
+
+    await pool_backend.close()
+    if owner:
+        await owner.stop()
+    logger.info("SHUTDOWN", "Aplicação a terminar.")
+    logger.close()
 
 # --- INICIALIZAÇÃO DA APLICAÇÃO FASTAPI ---
 app = FastAPI(lifespan=lifespan)
@@ -182,38 +976,182 @@ class AcquireProxyResponse(BaseModel):
 
 class ReportProxyRequest(BaseModel):
     proxy_key: str
-    success: bool
+    # Se `success` não vier, é deduzido de `status_code` (2xx/3xx = sucesso)
+    success: Optional[bool] = None
+    latency_ms: Optional[float] = None
+    status_code: Optional[int] = None
+
+class AcquireProxiesRequest(BaseModel):
+    # Um proxy por sessão em `session_ids`, ou `count` proxies distintos para `session_id`
+    session_ids: Optional[List[str]] = None
+    session_id: Optional[str] = None
+    count: int = Field(1, ge=1, le=MAX_BATCH_SIZE)
+
+class AcquiredProxy(AcquireProxyResponse):
+    session_id: str
+
+class AcquireProxiesResponse(BaseModel):
+    proxies: List[AcquiredProxy]
+    unavailable: List[str]  # Sessões que ficaram sem proxy
+
+class ReportProxyBatchRequest(BaseModel):
+    reports: List[ReportProxyRequest]
+
+def _to_response(proxy: Proxy, session_id: str) -> AcquiredProxy:
+    return AcquiredProxy(ip=proxy.ip, port=proxy.port, protocol=proxy.protocol,
+                         proxy_key=proxy.key_str, session_id=session_id)
+
+def _report_success(report: ReportProxyRequest) -> bool:
+    if report.success is not None:
+        return report.success
+    if report.status_code is not None:
+        return 200 <= report.status_code < 400
+    raise HTTPException(status_code=422, detail=f"Relatório de '{report.proxy_key}' sem 'success' nem 'status_code'.")
+
+def _check_batch_size(size: int):
+    if size > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=422, detail=f"Lote demasiado grande ({size} > {MAX_BATCH_SIZE}).")
 
 @app.get("/acquire_proxy", response_model=AcquireProxyResponse)
 async def acquire_proxy(session_id: str):
-    print(f"({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) LOG: Recebido pedido de proxy para a sessão: '{session_id}'")
-    proxy = proxy_pool.get_proxy(session_id)
+    logger.debug("ACQUIRE", "Recebido pedido de proxy", session=session_id)
+    proxy = await pool_backend.acquire(session_id)
     if not proxy:
         raise HTTPException(status_code=503, detail="Nenhum proxy disponível no momento.")
     
-    proxy_key = f"{proxy.ip}:{proxy.port}:{proxy.protocol}"
-    return AcquireProxyResponse(ip=proxy.ip, port=proxy.port, protocol=proxy.protocol, proxy_key=proxy_key)
+    return AcquireProxyResponse(ip=proxy.ip, port=proxy.port, protocol=proxy.protocol, proxy_key=proxy.key_str)
+
+@app.post("/acquire_proxies", response_model=AcquireProxiesResponse)
+async def acquire_proxies(request: AcquireProxiesRequest):
+    """Vários proxies num só pedido; o lote inteiro é servido numa única passagem pelo pool."""
+    if request.session_ids is not None:
+        _check_batch_size(len(request.session_ids))
+        acquired, unavailable = [], []
+        proxies = await pool_backend.acquire_many(request.session_ids)
+        for session_id, proxy in zip(request.session_ids, proxies):
+            if proxy:
+                acquired.append(_to_response(proxy, session_id))
+            else:
+                unavailable.append(session_id)
+    elif request.session_id is not None:
+        proxies = await pool_backend.acquire_for_session(request.session_id, request.count)
+        acquired = [_to_response(p, request.session_id) for p in proxies]
+        unavailable = [] if acquired else [request.session_id]
+    else:
+        raise HTTPException(status_code=422, detail="Indique 'session_ids' ou 'session_id' (com 'count').")
+    logger.debug("ACQUIRE_BATCH", "Recebido pedido de proxies em lote", served=len(acquired), unavailable=len(unavailable))
+    if not acquired:
+        raise HTTPException(status_code=503, detail="Nenhum proxy disponível no momento.")
+    return AcquireProxiesResponse(proxies=acquired, unavailable=unavailable)
 
 @app.post("/report_proxy_usage")
 async def report_proxy_usage(request: ReportProxyRequest):
-    proxy_pool.report_proxy_usage(request.proxy_key, request.success)
+    await pool_backend.report(request.proxy_key, _report_success(request), request.latency_ms, request.status_code)
     return {"message": "Relatório de uso do proxy recebido"}
 
-@app.get("/metrics")
+@app.post("/report_proxy_usage/batch")
+async def report_proxy_usage_batch(request: ReportProxyBatchRequest):
+    _check_batch_size(len(request.reports))
+    # Validar o lote inteiro antes de aplicar, para não o aplicar só em parte
+    outcomes = [_report_success(report) for report in request.reports]
+    accepted = await pool_backend.report_many([
+        (report.proxy_key, success, report.latency_ms, report.status_code)
+        for report, success in zip(request.reports, outcomes)
+    ])
+    return {"message": "Relatórios de uso recebidos", "accepted": accepted, "unknown": len(request.reports) - accepted}
+
+class IngestEvent(BaseModel):
+    op: Literal["add", "latency", "remove"]
+    proxy: str  # 'protocolo://ip:porto'
+    latency_ms: Optional[float] = None
+
+class IngestRequest(BaseModel):
+    events: List[IngestEvent]
+
+@app.post("/ingest")
+async def ingest(request: IngestRequest, http_request: Request):
+    """Resultados do checker (ver ResultPusher em proxy_client.py), aplicados logo ao pool."""
+    client_host = http_request.client.host if http_request.client else None
+    if not SERVICE_INGEST_ALLOW_REMOTE and client_host not in LOOPBACK_HOSTS:
+        raise HTTPException(status_code=403, detail="POST /ingest só é aceite a partir da própria máquina.")
+    _check_batch_size(len(request.events))
+    return await pool_backend.ingest([(event.op, event.proxy, event.latency_ms) for event in request.events])
+
+@app.get("/metrics", response_class=PlainTextResponse)
 async def get_metrics():
-    available_proxies = len(proxy_pool.get_available_proxies())
-    total_proxies = len(proxy_pool.proxies)
-    return {
-        "total_proxies_in_pool": total_proxies,
-        "available_proxies": available_proxies,
-        "proxies_in_cooldown": total_proxies - available_proxies,
-        "active_sessions": len(proxy_pool.session_proxy_map),
-    }
+    """Métricas no formato de texto do Prometheus (com vários workers, as do coordenador)."""
+    return PlainTextResponse(await pool_backend.metrics_text(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/summary")
+async def get_metrics_summary():
+    return await pool_backend.metrics()
+
+def _check_profiler_enabled():
+    if not SERVICE_PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler desativado (SERVICE_PROFILER_ENABLED).")
+
+@app.post("/admin/profiler/start")
+async def start_profiler(interval_ms: float = 5.0, duration_sec: float = SERVICE_PROFILER_MAX_SECONDS):
+    """Liga o profiler por amostragem do event loop deste processo (no máximo SERVICE_PROFILER_MAX_SECONDS)."""
+    _check_profiler_enabled()
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="O profiler já está ligado.")
+    if interval_ms < 1:
+        raise HTTPException(status_code=422, detail="interval_ms tem de ser pelo menos 1.")
+    # O endpoint corre no thread do event loop: é esse que é amostrado
+    profiler.start(interval_ms / 1000.0, min(duration_sec, SERVICE_PROFILER_MAX_SECONDS), threading.get_ident())
+    logger.info("PROFILER_STARTED", "Profiler por amostragem ligado", interval_ms=interval_ms, pid=os.getpid())
+    return profiler.status()
+
+@app.post("/admin/profiler/stop")
+async def stop_profiler():
+    _check_profiler_enabled()
+    await asyncio.to_thread(profiler.stop)
+    return profiler.status()
+
+@app.get("/admin/profiler", response_class=PlainTextResponse)
+async def get_profile():
+    """Amostras da última recolha (ou da atual) em pilhas colapsadas, para flamegraph.pl / speedscope."""
+    _check_profiler_enabled()
+    return PlainTextResponse(profiler.collapsed())
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "timestamp": datetime.now().isoformat()}
 
-if __name__ == "__main__":
+def main():
+    global DATA_FILE
+    parser = argparse.ArgumentParser(description="Proxy Manager Service")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Workers do uvicorn; com mais de um, o pool fica num processo coordenador partilhado.")
+    parser.add_argument("--data-file", default=DATA_FILE, help="Ficheiro de proxies.")
+    parser.add_argument("--coordinator", action="store_true", help="Correr só o coordenador do pool.")
+    parser.add_argument("--coordinator-address",
+                        default=default_coordinator_address(POOL_COORDINATOR_SOCKET, POOL_COORDINATOR_TCP_PORT),
+                        help="Socket Unix ou host:porto do coordenador.")
+    args = parser.parse_args()
+    DATA_FILE = args.data_file
+
+    if args.coordinator:
+        asyncio.run(run_coordinator(args.coordinator_address))
+        return
+
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    if args.workers <= 1:
+        uvicorn.run(app, host=args.host, port=args.port)
+        return
+
+    coordinator = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--coordinator",
+                                    "--coordinator-address", args.coordinator_address, "--data-file", DATA_FILE])
+    # Os workers herdam o ambiente e ligam-se ao coordenador no lifespan
+    os.environ[POOL_COORDINATOR_ENV] = args.coordinator_address
+    try:
+        uvicorn.run("proxy_manager_service:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        coordinator.terminate()
+        coordinator.wait()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
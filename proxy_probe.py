@@ -0,0 +1,251 @@
+# proxy_steam_manager/proxy_probe.py
+
+"""
+Sondas baratas de proxies: ligação TCP seguida apenas do handshake do
+protocolo do proxy (saudação SOCKS4/5 ou HTTP CONNECT), sem TLS nem pedidos
+HTTP completos. Servem para descartar rapidamente proxies mortos antes da
+verificação completa contra a Steam e para descobrir que protocolo fala um
+endpoint 'ip:porto' sem o validar uma vez por cada protocolo.
+"""
+
+import asyncio
+import socket
+import struct
+import time
+from contextlib import suppress
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Ordem de deteção: um proxy SOCKS que recebe "CONNECT ..." ou uma saudação de
+# outra versão fecha a ligação de imediato, por isso as tentativas erradas
+# custam pouco e um proxy HTTP (o caso mais comum) é detetado à primeira.
+SNIFF_ORDER = ("http", "socks5", "socks4")
+
+
+class ProbeTiming(NamedTuple):
+    connect_ms: float    # Ligação TCP ao proxy
+    handshake_ms: float  # Handshake do protocolo do proxy
+
+
+class ProxyProbeError(Exception):
+    """O proxy aceitou a ligação mas não respondeu como esperado ao handshake."""
+
+
+class ProxyUnreachableError(ProxyProbeError):
+    """Não foi possível abrir a ligação TCP ao proxy."""
+
+
+def parse_proxy_url(proxy: str) -> Tuple[str, str, int]:
+    """Divide 'protocolo://ip:porto' em (protocolo, ip, porto)."""
+    parts = urlsplit(proxy)
+    if not parts.scheme or not parts.hostname or not parts.port:
+        raise ValueError(f"Proxy mal formatado: {proxy}")
+    protocol = "http" if parts.scheme.lower() == "https" else parts.scheme.lower()
+    return protocol, parts.hostname, parts.port
+
+
+def parse_target_url(url: str) -> Tuple[str, int]:
+    """Devolve (host, porto) do URL de destino usado no handshake."""
+    parts = urlsplit(url)
+    return parts.hostname, parts.port or DEFAULT_PORTS.get(parts.scheme, 80)
+
+
+async def _handshake_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, target_host: str, target_port: int):
+    writer.write(f"CONNECT {target_host}:{target_port} HTTP/1.1\r\nHost: {target_host}:{target_port}\r\n\r\n".encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    parts = status_line.split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+        raise ProxyProbeError(f"Resposta HTTP inválida: {status_line[:40]!r}")
+    if parts[1] != b"200":
+        raise ProxyProbeError(f"CONNECT recusado com status {parts[1].decode(errors='replace')}")
+
+
+async def _handshake_socks5(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, target_host: str, target_port: int):
+    writer.write(b"\x05\x01\x00")  # Versão 5, um método: sem autenticação
+    await writer.drain()
+    reply = await reader.readexactly(2)
+    if reply[0] != 0x05:
+        raise ProxyProbeError(f"Resposta SOCKS5 inválida: {reply!r}")
+    if reply[1] != 0x00:
+        raise ProxyProbeError("Servidor SOCKS5 exige autenticação")
+
+
+async def _handshake_socks4(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, target_host: str, target_port: int):
+    # SOCKS4a: IP 0.0.0.1 e o nome do destino no fim, para não depender de DNS local
+    request = struct.pack(">BBH", 0x04, 0x01, target_port) + socket.inet_aton("0.0.0.1")
+    request += b"\x00" + target_host.encode("idna") + b"\x00"
+    writer.write(request)
+    await writer.drain()
+    reply = await reader.readexactly(8)
+    if reply[0] != 0x00:
+        raise ProxyProbeError(f"Resposta SOCKS4 inválida: {reply!r}")
+    if reply[1] != 0x5A:
+        raise ProxyProbeError(f"Pedido SOCKS4 recusado (código {reply[1]:#04x})")
+
+
+HANDSHAKES = {
+    "http": _handshake_http,
+    "socks4": _handshake_socks4,
+    "socks5": _handshake_socks5,
+}
+
+
+# --- Túneis completos (usados pelo forward proxy do serviço) ---
+
+async def _tunnel_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, target_host: str, target_port: int):
+    await _handshake_http(reader, writer, target_host, target_port)
+    # Consumir o resto dos cabeçalhos da resposta ao CONNECT
+    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+        pass
+
+
+async def _tunnel_socks5(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, target_host: str, target_port: int):
+    await _handshake_socks5(reader, writer, target_host, target_port)
+    host = target_host.encode("idna")
+    writer.write(b"\x05\x01\x00\x03" + bytes([len(host)]) + host + struct.pack(">H", target_port))
+    await writer.drain()
+    reply = await reader.readexactly(4)
+    if reply[1] != 0x00:
+        raise ProxyProbeError(f"Pedido SOCKS5 recusado (código {reply[1]:#04x})")
+    # Endereço de ligação devolvido pelo servidor (ignorado) + porto
+    if reply[3] == 0x01:
+        await reader.readexactly(4 + 2)
+    elif reply[3] == 0x04:
+        await reader.readexactly(16 + 2)
+    else:
+        length = (await reader.readexactly(1))[0]
+        await reader.readexactly(length + 2)
+
+
+TUNNELS = {
+    "http": _tunnel_http,
+    "socks4": _handshake_socks4,  # O handshake SOCKS4a já é o pedido CONNECT completo
+    "socks5": _tunnel_socks5,
+}
+
+
+async def open_tunnel(protocol: str, host: str, port: int, target_host: str, target_port: int,
+                      timeout: float) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, ProbeTiming]:
+    """
+    Abre um túnel até target_host:target_port através do proxy host:porto e
+    devolve os streams já prontos a transportar dados. Levanta as mesmas
+    exceções que probe_endpoint.
+    """
+    tunnel = TUNNELS.get(protocol)
+    if tunnel is None:
+        raise ValueError(f"Protocolo não suportado: {protocol}")
+
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError) as e:
+        raise ProxyUnreachableError(f"{type(e).__name__}: {e}") from e
+    connected = time.perf_counter()
+    try:
+        await asyncio.wait_for(tunnel(reader, writer, target_host, target_port), timeout)
+    except BaseException as e:
+        writer.close()
+        if isinstance(e, asyncio.IncompleteReadError):
+            raise ProxyProbeError("Ligação fechada durante o handshake") from e
+        raise
+    return reader, writer, ProbeTiming((connected - started) * 1000.0, (time.perf_counter() - connected) * 1000.0)
+
+
+def split_endpoint(line: str) -> Tuple[Optional[str], str, int]:
+    """
+    Interpreta 'protocolo://ip:porto' ou 'ip:porto' e devolve (protocolo ou None, ip, porto).
+    Levanta ValueError se a linha estiver mal formatada.
+    """
+    if "://" in line:
+        return parse_proxy_url(line)
+    host, port_str = line.rsplit(":", 1)
+    return None, host.strip(), int(port_str)
+
+
+async def probe_endpoint(protocol: str, host: str, port: int, target_host: str, target_port: int,
+                         timeout: float) -> ProbeTiming:
+    """
+    Liga a host:porto e executa o handshake de `protocol`.
+
+    Em caso de sucesso devolve a duração de cada fase; em caso de falha levanta ValueError
+    (protocolo desconhecido), ProxyUnreachableError (ligação TCP falhou),
+    ProxyProbeError, OSError ou asyncio.TimeoutError (handshake falhou).
+    """
+    handshake = HANDSHAKES.get(protocol)
+    if handshake is None:
+        raise ValueError(f"Protocolo não suportado: {protocol}")
+
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError) as e:
+        raise ProxyUnreachableError(f"{type(e).__name__}: {e}") from e
+    connected = time.perf_counter()
+    try:
+        await asyncio.wait_for(handshake(reader, writer, target_host, target_port), timeout)
+        return ProbeTiming((connected - started) * 1000.0, (time.perf_counter() - connected) * 1000.0)
+    except asyncio.IncompleteReadError:
+        raise ProxyProbeError("Ligação fechada durante o handshake")
+    finally:
+        writer.close()
+        with suppress(Exception):
+            await writer.wait_closed()
+
+
+async def probe_proxy(proxy: str, target_host: str, target_port: int, timeout: float) -> ProbeTiming:
+    """Como probe_endpoint, para um proxy no formato 'protocolo://ip:porto'."""
+    protocol, host, port = parse_proxy_url(proxy)
+    return await probe_endpoint(protocol, host, port, target_host, target_port, timeout)
+
+
+async def detect_protocol_timed(host: str, port: int, target_host: str, target_port: int, timeout: float,
+                                hint: Optional[str] = None) -> Optional[Tuple[str, ProbeTiming]]:
+    """
+    Descobre que protocolo de proxy fala host:porto, tentando os handshakes por
+    SNIFF_ORDER (começando por `hint`, se indicado). Devolve o protocolo e a
+    duração das fases da tentativa bem-sucedida, ou None se o endpoint não
+    responder a nenhum. Se a ligação TCP falhar, desiste logo.
+    """
+    order = SNIFF_ORDER if hint not in SNIFF_ORDER else (hint, *(p for p in SNIFF_ORDER if p != hint))
+    for protocol in order:
+        try:
+            timing = await probe_endpoint(protocol, host, port, target_host, target_port, timeout)
+            return protocol, timing
+        except ProxyUnreachableError:
+            return None
+        except (ProxyProbeError, OSError, asyncio.TimeoutError):
+            continue
+    return None
+
+
+async def detect_protocol(host: str, port: int, target_host: str, target_port: int, timeout: float,
+                          hint: Optional[str] = None) -> Optional[str]:
+    """Como detect_protocol_timed, mas devolve apenas o protocolo."""
+    detected = await detect_protocol_timed(host, port, target_host, target_port, timeout, hint)
+    return detected[0] if detected else None
+
+
+async def detect_protocols(endpoints: Iterable[Tuple[str, int]], target_host: str, target_port: int,
+                           timeout: float, concurrency: int) -> Dict[Tuple[str, int], str]:
+    """
+    Deteta o protocolo de vários endpoints em paralelo, com no máximo
+    `concurrency` sondas em curso; só devolve os endpoints que responderam.
+    """
+    results: Dict[Tuple[str, int], str] = {}
+
+    async def detect(endpoint: Tuple[str, int]):
+        protocol = await detect_protocol(endpoint[0], endpoint[1], target_host, target_port, timeout)
+        if protocol:
+            results[endpoint] = protocol
+
+    pending: Set[asyncio.Future] = set()
+    for endpoint in dict.fromkeys(endpoints):
+        if len(pending) >= concurrency:
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        pending.add(asyncio.ensure_future(detect(endpoint)))
+    if pending:
+        await asyncio.wait(pending)
+    return results
@@ -0,0 +1,220 @@
+# proxy_steam_manager/proxy_store.py
+
+"""
+Armazenamento persistente dos proxies numa tabela SQLite (módulo sqlite3 da
+biblioteca padrão), em vez de um ficheiro JSON reescrito por inteiro a cada
+atualização.
+
+  - upsert_many grava um lote numa só transação; upsert grava um proxy sem ler
+    nem reescrever os restantes;
+  - iter_proxies lê a tabela aos blocos, sem carregar tudo de uma vez;
+  - query_live usa os índices de latência e de última validação para consultas
+    como "proxies vivos com latência < X validados nos últimos N minutos".
+
+Uma ligação por ProxyStore, partilhada entre threads e protegida por um lock
+(como o antigo _file_write_lock de utils.py). O journal em modo WAL deixa outros
+processos ler a base enquanto este escreve.
+"""
+
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models import Proxy, ProxyKey
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS proxies (
+    ip TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    protocol TEXT NOT NULL,
+    latency REAL,
+    last_validated REAL,
+    failures INTEGER NOT NULL DEFAULT 0,
+    requests_served INTEGER NOT NULL DEFAULT 0,
+    cooldown_until REAL,
+    success_rate REAL NOT NULL DEFAULT 1.0,
+    PRIMARY KEY (ip, port, protocol)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS proxies_latency ON proxies (latency);
+CREATE INDEX IF NOT EXISTS proxies_last_validated ON proxies (last_validated);
+"""
+
+_COLUMNS = "ip, port, protocol, latency, last_validated, failures, requests_served, cooldown_until, success_rate"
+
+_UPSERT = f"""
+INSERT INTO proxies ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (ip, port, protocol) DO UPDATE SET
+    latency = excluded.latency,
+    last_validated = excluded.last_validated,
+    failures = excluded.failures,
+    requests_served = excluded.requests_served,
+    cooldown_until = excluded.cooldown_until,
+    success_rate = excluded.success_rate
+"""
+
+
+def _to_row(proxy: Proxy, now_wall: float, now_mono: float) -> tuple:
+    # O prazo do cooldown está em time.monotonic(): na base fica em tempo Unix
+    cooldown = proxy.cooldown_until - now_mono + now_wall if proxy.cooldown_until else None
+    return (proxy.ip, proxy.port, proxy.protocol, proxy.latency, proxy.last_validated, proxy.failures,
+            proxy.requests_served, cooldown, proxy.success_rate)
+
+
+def _split_key(key: ProxyKey) -> Tuple[str, int, str]:
+    ip, port, protocol = key.rsplit(":", 2)
+    return ip, int(port), protocol
+
+
+def _from_row(row: tuple, now_wall: float, now_mono: float) -> Proxy:
+    ip, port, protocol, latency, last_validated, failures, requests_served, cooldown, success_rate = row
+    return Proxy(ip=ip, port=port, protocol=protocol, latency=latency, last_validated=last_validated,
+                 failures=failures, requests_served=requests_served,
+                 cooldown_until=cooldown - now_wall + now_mono if cooldown and cooldown > now_wall else None,
+                 success_rate=success_rate)
+
+
+class ProxyStore:
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # isolation_level=None: as transações são abertas explicitamente (BEGIN) nos lotes
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, statement: str, rows: Iterable[tuple]):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(statement, rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def upsert(self, proxy: Proxy):
+        self.upsert_many((proxy,))
+
+    def upsert_many(self, proxies: Iterable[Proxy]):
+        """Insere ou atualiza os proxies numa só transação."""
+        now_wall, now_mono = time.time(), time.monotonic()
+        self._write(_UPSERT, (_to_row(proxy, now_wall, now_mono) for proxy in proxies))
+
+    def replace_all(self, proxies: Iterable[Proxy]):
+        """Substitui o conteúdo da tabela pelos proxies dados (numa só transação)."""
+        now_wall, now_mono = time.time(), time.monotonic()
+        rows = (_to_row(proxy, now_wall, now_mono) for proxy in proxies)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM proxies")
+                self._conn.executemany(_UPSERT, rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def delete_many(self, keys: Iterable[ProxyKey]):
+        """Remove os proxies com estas chaves (do pool ou 'ip:porto:protocolo')."""
+        self._write("DELETE FROM proxies WHERE ip = ? AND port = ? AND protocol = ?", (_split_key(key) for key in keys))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM proxies").fetchone()[0]
+
+    def _select(self, where: str, params: tuple, batch_size: int) -> Iterator[Proxy]:
+        # Ligação própria, só de leitura: com WAL a consulta vê a base como estava
+        # no início, mesmo que haja escritas entretanto, e não bloqueia os escritores
+        conn = sqlite3.connect(pathlib.Path(self.path).absolute().as_uri() + "?mode=ro", uri=True)
+        try:
+            cursor = conn.execute(f"SELECT {_COLUMNS} FROM proxies {where}", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                now_wall, now_mono = time.time(), time.monotonic()
+                for row in rows:
+                    yield _from_row(row, now_wall, now_mono)
+        finally:
+            conn.close()
+
+    def iter_proxies(self, batch_size: int = 1000) -> Iterator[Proxy]:
+        """Todos os proxies, lidos da base em blocos de `batch_size`."""
+        return self._select("", (), batch_size)
+
+    def query_live(self, max_latency_ms: Optional[float] = None, validated_within_sec: Optional[float] = None,
+                   max_failures: int = 0, limit: Optional[int] = None, batch_size: int = 1000) -> Iterator[Proxy]:
+        """
+        Proxies com no máximo `max_failures` falhas, latência abaixo de
+        `max_latency_ms` e validados nos últimos `validated_within_sec` segundos,
+        do mais rápido para o mais lento; os sem latência medida ficam no fim.
+        """
+        conditions: List[str] = ["failures <= ?"]
+        params: List = [max_failures]
+        if max_latency_ms is not None:
+            conditions.append("latency < ?")
+            params.append(max_latency_ms)
+        if validated_within_sec is not None:
+            conditions.append("last_validated >= ?")
+            params.append(time.time() - validated_within_sec)
+        where = "WHERE " + " AND ".join(conditions) + " ORDER BY latency IS NULL, latency"
+        if limit is not None:
+            where += " LIMIT ?"
+            params.append(limit)
+        return self._select(where, tuple(params), batch_size)
+
+    def import_json(self, json_path: str) -> int:
+        """Importa um ficheiro no formato antigo (lista de Proxy.to_dict); devolve quantos proxies leu."""
+        with open(json_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        proxies = [Proxy.from_dict(d) for d in json.loads(content)] if content.strip() else []
+        self.upsert_many(proxies)
+        return len(proxies)
+
+
+_stores_lock = threading.Lock()
+_stores: Dict[str, ProxyStore] = {}
+
+
+def _is_legacy_json(path: str) -> bool:
+    with open(path, "rb") as f:
+        head = f.read(64).lstrip()
+    return head.startswith(b"[")
+
+
+def get_proxy_store(path: str) -> ProxyStore:
+    """
+    ProxyStore partilhado para `path`. Um ficheiro JSON do formato antigo nesse
+    caminho é importado na primeira abertura e fica guardado como `path`.bak.
+    """
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            backup = None
+            if os.path.exists(path) and _is_legacy_json(path):
+                backup = path + ".bak"
+                os.replace(path, backup)
+            store = ProxyStore(path)
+            if backup is not None:
+                store.import_json(backup)
+            _stores[path] = store
+        return store
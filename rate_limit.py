@@ -0,0 +1,100 @@
+# proxy_steam_manager/rate_limit.py
+
+"""
+Limite de pedidos por proxy usado pelo ProxyPool: um token bucket por proxy
+cuja taxa de reposição é aprendida com as respostas da Steam.
+
+  - cada pedido entregue gasta um token; com o balde vazio o proxy entra em
+    cooldown até haver de novo um token (1 / taxa segundos);
+  - o balde leva no máximo `capacity` tokens (a rajada) e um proxy novo começa
+    com `initial_tokens`: num intervalo de T segundos um proxy recebe no máximo
+    capacity + taxa * T pedidos (e um proxy novo initial_tokens + taxa * T);
+  - cada sucesso sobe a taxa um pouco (aumento aditivo) até ao máximo;
+  - um 429 ("rate-limited") corta a taxa (decréscimo multiplicativo), esvazia
+    o balde e põe o proxy em cooldown, sem o dar como avariado;
+  - as outras falhas ("broken") contam como falhas do proxy.
+
+Os dois tipos de cooldown duplicam a cada 429 / falha seguida, até ao máximo.
+O estado (tokens, instante da última reposição, taxa) vive no próprio Proxy e
+é atualizado de forma preguiçosa, só quando o proxy é usado ou reportado:
+nunca se percorre o pool.
+"""
+
+from typing import Optional, Sequence
+
+from models import Proxy
+
+
+def _backoff(base_sec: float, streak: int, max_sec: float) -> float:
+    """`base_sec` a duplicar a cada ocorrência seguida (streak >= 1), até `max_sec`."""
+    return min(max_sec, base_sec * 2 ** min(max(0, streak - 1), 32))
+
+
+class TokenBucketPolicy:
+    def __init__(self, capacity: float, initial_tokens: float, initial_rate: float, min_rate: float, max_rate: float,
+                 increase: float, decrease_factor: float, rate_limit_statuses: Sequence[int], rate_limited_sec: float,
+                 failure_sec: float, max_cooldown_sec: float):
+        """
+        Taxas em pedidos por segundo; `increase` é somado à taxa a cada sucesso.
+        `capacity` é a rajada máxima e `initial_tokens` os tokens de um proxy novo
+        (ou com o estado reposto), pelo menos um.
+        """
+        self.capacity = max(1.0, capacity)
+        self.initial_tokens = min(self.capacity, max(1.0, initial_tokens))
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.rate_limit_statuses = frozenset(rate_limit_statuses)
+        self.rate_limited_sec = rate_limited_sec
+        self.failure_sec = failure_sec
+        self.max_cooldown_sec = max_cooldown_sec
+
+    def rate(self, proxy: Proxy) -> float:
+        return proxy.rate if proxy.rate is not None else self.initial_rate
+
+    def _refill(self, proxy: Proxy, now: float) -> float:
+        if proxy.tokens is None:
+            tokens = self.initial_tokens  # Proxy novo (ou estado reposto)
+        else:
+            tokens = min(self.capacity, proxy.tokens + (now - proxy.tokens_at) * self.rate(proxy))
+        proxy.tokens, proxy.tokens_at = tokens, now
+        return tokens
+
+    def take(self, proxy: Proxy, now: float) -> Optional[float]:
+        """Gasta um token; se o balde ficar sem tokens inteiros devolve o prazo (monotonic) do próximo."""
+        tokens = self._refill(proxy, now) - 1.0
+        proxy.tokens = tokens
+        if tokens >= 1.0:
+            return None
+        return now + (1.0 - tokens) / self.rate(proxy)
+
+    def is_rate_limited(self, status_code: Optional[int]) -> bool:
+        return status_code is not None and status_code in self.rate_limit_statuses
+
+    def on_success(self, proxy: Proxy):
+        proxy.rate_limited = 0
+        proxy.rate = min(self.max_rate, self.rate(proxy) + self.increase)
+
+    def on_rate_limited(self, proxy: Proxy, now: float) -> float:
+        """
+        Corta a taxa e esvazia o balde; devolve o fim do cooldown. Os 429 que
+        chegam antes desse prazo são de pedidos entregues antes do corte: não
+        voltam a cortar a taxa nem contam como 429 seguidos.
+        """
+        if proxy.rate_cut_at is not None and now < self._rate_limited_until(proxy, proxy.rate_cut_at):
+            return self._rate_limited_until(proxy, proxy.rate_cut_at)
+        proxy.rate_limited += 1
+        proxy.rate = max(self.min_rate, self.rate(proxy) * self.decrease_factor)
+        proxy.tokens, proxy.tokens_at, proxy.rate_cut_at = 0.0, now, now
+        return self._rate_limited_until(proxy, now)
+
+    def _rate_limited_until(self, proxy: Proxy, cut_at: float) -> float:
+        # Pelo menos o tempo de repor um token à nova taxa
+        return cut_at + max(1.0 / self.rate(proxy),
+                            _backoff(self.rate_limited_sec, proxy.rate_limited, self.max_cooldown_sec))
+
+    def on_failure(self, proxy: Proxy, now: float) -> float:
+        """Fim do cooldown de um proxy avariado (`proxy.failures` já inclui esta falha)."""
+        return now + _backoff(self.failure_sec, proxy.failures, self.max_cooldown_sec)
@@ -0,0 +1,128 @@
+# proxy_steam_manager/revalidator.py
+
+"""
+Revalidação ativa dos proxies com falhas, dentro do serviço.
+
+O ProxyPool agenda uma sonda para cada proxy que entra em cooldown por uma
+falha: perto do fim do cooldown ou, com falhas seguidas, logo a seguir (ver
+ProxyPool.take_due_probes). ProxyRevalidator vai buscar as sondas que já estão
+na hora, faz a cada proxy o mesmo pedido que o checker faz (CHECKER_VALIDATION_URL)
+com no máximo `concurrency` pedidos em curso, e entrega o resultado ao pool
+(ProxyPool.apply_probe), que liberta o proxy mais cedo, prolonga o cooldown ou
+o retira do pool.
+
+Os proxies HTTP partilham uma única sessão aiohttp (o conector reutiliza as
+ligações, e os túneis CONNECT, de cada proxy); os SOCKS precisam de um conector
+próprio (aiohttp_socks) por sonda. As chamadas ao pool são feitas no loop do
+dono do pool, como as dos endpoints.
+"""
+
+import asyncio
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Mapping, Optional, Set
+
+import aiohttp
+from aiohttp_socks import ProxyConnector
+
+from adaptive_limiter import OUTCOME_FAIL, OUTCOME_OK, classify_exception
+from async_logger import AsyncLogger
+from models import Proxy
+
+# O proxy funciona, mas a Steam respondeu com um código de limite (429)
+OUTCOME_RATE_LIMITED = "rate_limited"
+
+
+@dataclass
+class ProbeResult:
+    outcome: str = OUTCOME_FAIL  # adaptive_limiter.OUTCOME_* ou OUTCOME_RATE_LIMITED
+    latency_ms: Optional[float] = None
+    status: Optional[int] = None
+    error: Optional[str] = None
+
+
+class ProxyRevalidator:
+    def __init__(self, url: str, validation_text: str, headers: Mapping[str, str], concurrency: int,
+                 timeout_sec: float, interval_sec: float, rate_limit_statuses=(429,),
+                 logger: Optional[AsyncLogger] = None):
+        self.url = url
+        self.validation_text = validation_text
+        self.headers = dict(headers)
+        self.concurrency = concurrency
+        self.timeout_sec = timeout_sec
+        self.interval_sec = interval_sec
+        self.rate_limit_statuses = frozenset(rate_limit_statuses)
+        self.logger = logger
+        self.running: Set[asyncio.Task] = set()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                              timeout=aiohttp.ClientTimeout(total=self.timeout_sec))
+
+    async def close(self):
+        for task in list(self.running):
+            task.cancel()
+        for task in list(self.running):
+            with suppress(asyncio.CancelledError):
+                await task
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _get(self, session: aiohttp.ClientSession, proxy_url: Optional[str]) -> ProbeResult:
+        started = time.perf_counter()
+        async with session.get(self.url, proxy=proxy_url) as response:
+            if response.status in self.rate_limit_statuses:
+                return ProbeResult(OUTCOME_RATE_LIMITED, status=response.status)
+            if response.status != 200:
+                return ProbeResult(status=response.status)
+            text = await response.text()
+            if self.validation_text not in text:
+                return ProbeResult(status=response.status, error="Texto de validação não encontrado")
+            return ProbeResult(OUTCOME_OK, (time.perf_counter() - started) * 1000.0, response.status)
+
+    async def probe(self, proxy: Proxy) -> ProbeResult:
+        """Um pedido a `url` através do proxy; não lança exceções (exceto o cancelamento)."""
+        try:
+            if proxy.protocol == "http":
+                return await self._get(self._session, f"http://{proxy.ip}:{proxy.port}")
+            connector = ProxyConnector.from_url(f"{proxy.protocol}://{proxy.ip}:{proxy.port}")
+            async with aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout_sec)) as session:
+                return await self._get(session, None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return ProbeResult(classify_exception(e), error=f"{type(e).__name__}: {e}")
+
+    async def _probe_and_apply(self, pool, proxy: Proxy):
+        result = await self.probe(proxy)
+        action = pool.apply_probe(proxy, result.outcome, result.latency_ms)
+        if self.logger is not None:
+            self.logger.debug("PROXY_REVALIDATED", "Proxy revalidado", proxy=proxy.key_str, outcome=result.outcome,
+                              action=action, status=result.status, latency_ms=result.latency_ms, error=result.error)
+
+    async def run(self, pool):
+        """Ciclo de revalidação de `pool` (um ProxyPool); corre até ser cancelado."""
+        try:
+            while True:
+                free = self.concurrency - len(self.running)
+                if free > 0:
+                    for proxy in pool.take_due_probes(time.monotonic(), free):
+                        task = asyncio.create_task(self._probe_and_apply(pool, proxy))
+                        self.running.add(task)
+                        task.add_done_callback(self.running.discard)
+                await asyncio.sleep(self.interval_sec)
+        finally:
+            for task in list(self.running):
+                task.cancel()
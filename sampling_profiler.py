@@ -0,0 +1,96 @@
+# proxy_steam_manager/sampling_profiler.py
+
+"""
+Profiler por amostragem, ligado e desligado em funcionamento (endpoints
+/admin/profiler/* do serviço).
+
+Um thread à parte lê a pilha do thread observado (sys._current_frames) a cada
+`interval_sec` e conta as pilhas iguais. Com o profiler desligado não há custo
+nenhum; ligado, o thread observado só perde o tempo de o GIL passar para o
+amostrador. O resultado sai no formato "pilhas colapsadas" (uma linha
+'f1;f2;f3 N' por pilha), que flamegraph.pl e speedscope leem diretamente.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self.interval_sec = 0.005
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()  # Entre o amostrador e quem lê o resultado
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_sec: float = 0.005, max_duration_sec: Optional[float] = None,
+              thread_id: Optional[int] = None):
+        """Começa uma nova recolha (as amostras anteriores são descartadas) do thread `thread_id` (o atual, por omissão)."""
+        if self.running:
+            raise RuntimeError("O profiler já está ligado.")
+        self.interval_sec = interval_sec
+        self.started_at, self.stopped_at = time.time(), None
+        self.samples = 0
+        self._stacks = Counter()
+        self._stop.clear()
+        target = thread_id if thread_id is not None else threading.get_ident()
+        self._thread = threading.Thread(target=self._run, args=(target, max_duration_sec),
+                                        name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, thread_id: int, max_duration_sec: Optional[float]):
+        deadline = time.monotonic() + max_duration_sec if max_duration_sec else None
+        stacks = self._stacks
+        while not self._stop.wait(self.interval_sec):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                break  # O thread observado terminou
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            stack = ";".join(reversed(labels))
+            with self._lock:
+                stacks[stack] += 1
+                self.samples += 1
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        self.stopped_at = time.time()
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_sec": self.interval_sec,
+            "samples": self.samples,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
+
+    def collapsed(self) -> str:
+        """Pilhas colapsadas, da mais frequente para a menos frequente."""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
@@ -0,0 +1,93 @@
+# proxy_steam_manager/selection.py
+
+"""
+Estratégias de seleção de proxies usadas pelo ProxyPool.
+
+Cada estratégia recebe a lista de chaves prontas a usar e o dicionário de
+proxies do pool e devolve a chave escolhida. Nenhuma percorre o pool inteiro:
+trabalham sobre uma amostra aleatória de tamanho fixo, por isso o custo de
+cada escolha não depende do número de proxies.
+"""
+
+import random
+from typing import Callable, Dict, List, Optional
+
+from models import Proxy, ProxyKey
+
+# Latência assumida (ms) para proxies ainda sem medições
+DEFAULT_LATENCY_MS = 1000.0
+# Taxa de sucesso mínima usada no cálculo do custo, para evitar divisões por zero
+MIN_SUCCESS_RATE = 0.05
+# Número de candidatos amostrados pelas estratégias "weighted_random" e "least_in_flight"
+SAMPLE_SIZE = 8
+
+SelectionStrategy = Callable[[List[ProxyKey], Dict[ProxyKey, Proxy], random.Random], ProxyKey]
+
+
+def update_proxy_stats(proxy: Proxy, success: bool, latency_ms: Optional[float], alpha: float):
+    """Atualiza a latência e a taxa de sucesso (médias móveis exponenciais) do proxy."""
+    proxy.success_rate += alpha * ((1.0 if success else 0.0) - proxy.success_rate)
+    if latency_ms is not None:
+        if proxy.latency is None:
+            proxy.latency = latency_ms
+        else:
+            proxy.latency += alpha * (latency_ms - proxy.latency)
+
+
+def proxy_cost(proxy: Proxy) -> float:
+    """Custo esperado de enviar mais um pedido ao proxy (menor é melhor)."""
+    latency = proxy.latency if proxy.latency is not None else DEFAULT_LATENCY_MS
+    return latency * (1 + proxy.in_flight) / max(proxy.success_rate, MIN_SUCCESS_RATE)
+
+
+def _sample(ready: List[ProxyKey], rng: random.Random) -> List[ProxyKey]:
+    if len(ready) <= SAMPLE_SIZE:
+        return ready
+    return rng.sample(ready, SAMPLE_SIZE)
+
+
+def select_first(ready: List[ProxyKey], proxies: Dict[ProxyKey, Proxy], rng: random.Random) -> ProxyKey:
+    """Comportamento antigo: o primeiro proxy disponível."""
+    return ready[0]
+
+
+def select_power_of_two(ready: List[ProxyKey], proxies: Dict[ProxyKey, Proxy], rng: random.Random) -> ProxyKey:
+    """Escolhe dois proxies ao acaso e fica com o de menor custo."""
+    if len(ready) == 1:
+        return ready[0]
+    first, second = rng.sample(ready, 2)
+    return first if proxy_cost(proxies[first]) <= proxy_cost(proxies[second]) else second
+
+
+def select_weighted_random(ready: List[ProxyKey], proxies: Dict[ProxyKey, Proxy], rng: random.Random) -> ProxyKey:
+    """
+    Sorteio ponderado pelo inverso do custo. Para manter O(1), o sorteio é feito
+    sobre uma amostra uniforme de SAMPLE_SIZE candidatos e não sobre o pool inteiro.
+    """
+    candidates = _sample(ready, rng)
+    weights = [1.0 / proxy_cost(proxies[key]) for key in candidates]
+    return rng.choices(candidates, weights=weights, k=1)[0]
+
+
+def select_least_in_flight(ready: List[ProxyKey], proxies: Dict[ProxyKey, Proxy], rng: random.Random) -> ProxyKey:
+    """
+    O candidato com menos pedidos em curso (desempate pelo custo), entre uma
+    amostra de SAMPLE_SIZE proxies.
+    """
+    candidates = _sample(ready, rng)
+    return min(candidates, key=lambda key: (proxies[key].in_flight, proxy_cost(proxies[key])))
+
+
+STRATEGIES: Dict[str, SelectionStrategy] = {
+    "first": select_first,
+    "p2c": select_power_of_two,
+    "weighted_random": select_weighted_random,
+    "least_in_flight": select_least_in_flight,
+}
+
+
+def get_strategy(name: str) -> SelectionStrategy:
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Estratégia de seleção desconhecida: '{name}'. Opções: {', '.join(STRATEGIES)}")
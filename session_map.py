@@ -0,0 +1,108 @@
+# proxy_steam_manager/session_map.py
+
+"""
+Afinidade sessão -> proxy do ProxyPool, com tamanho limitado.
+
+As sessões ficam num OrderedDict pela ordem do último uso, que é ao mesmo
+tempo a ordem LRU e a ordem de inatividade: as expiradas (sem uso há mais de
+`idle_ttl_sec`) e, acima de `max_sessions`, as menos usadas saem sempre pela
+frente, em O(1) amortizado. Um índice inverso proxy -> sessões permite largar
+todas as sessões de um proxy em O(k) quando ele entra em cooldown ou sai do pool.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from models import ProxyKey
+
+
+class SessionMap:
+    def __init__(self, max_sessions: int, idle_ttl_sec: float, clock: Callable[[], float] = time.monotonic):
+        self.max_sessions = max(1, max_sessions)
+        self.idle_ttl_sec = idle_ttl_sec
+        self._clock = clock
+        # session_id -> (proxy_key, último uso)
+        self._sessions: "OrderedDict[str, Tuple[ProxyKey, float]]" = OrderedDict()
+        self._by_proxy: Dict[ProxyKey, Set[str]] = {}
+        # Sessões removidas por cada motivo, para as métricas
+        self.evicted = {"ttl": 0, "lru": 0, "proxy": 0}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> Optional[ProxyKey]:
+        """Proxy da sessão (e marca-a como usada agora), ou None se não existir ou tiver expirado."""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        now = self._clock()
+        if now - entry[1] > self.idle_ttl_sec:
+            self._remove(session_id)
+            self.evicted["ttl"] += 1
+            return None
+        self._sessions[session_id] = (entry[0], now)
+        self._sessions.move_to_end(session_id)
+        return entry[0]
+
+    def set(self, session_id: str, proxy_key: ProxyKey, idle_sec: float = 0.0):
+        """Associa a sessão ao proxy; `idle_sec` > 0 repõe uma sessão sem uso há esse tempo (ver `snapshot`)."""
+        now = self._clock() - idle_sec
+        entry = self._sessions.get(session_id)
+        if entry is not None and entry[0] != proxy_key:
+            self._unindex(session_id, entry[0])
+        self._sessions[session_id] = (proxy_key, now)
+        self._sessions.move_to_end(session_id)
+        self._by_proxy.setdefault(proxy_key, set()).add(session_id)
+        self.expire(now)
+        while len(self._sessions) > self.max_sessions:
+            self._remove(next(iter(self._sessions)))
+            self.evicted["lru"] += 1
+
+    def drop(self, session_id: str):
+        if session_id in self._sessions:
+            self._remove(session_id)
+
+    def drop_proxy(self, proxy_key: ProxyKey) -> int:
+        """Larga todas as sessões associadas a `proxy_key`; devolve quantas eram."""
+        sessions = self._by_proxy.pop(proxy_key, None)
+        if not sessions:
+            return 0
+        for session_id in sessions:
+            del self._sessions[session_id]
+        self.evicted["proxy"] += len(sessions)
+        return len(sessions)
+
+    def snapshot(self) -> List[list]:
+        """[session_id, proxy_key, segundos sem uso] de cada sessão, da menos usada para a mais usada."""
+        now = self._clock()
+        return [[session_id, proxy_key, now - last_used] for session_id, (proxy_key, last_used) in self._sessions.items()]
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Remove as sessões inativas há mais de idle_ttl_sec (estão todas no início)."""
+        if now is None:
+            now = self._clock()
+        expired = 0
+        sessions = self._sessions
+        while sessions:
+            session_id, (_, last_used) = next(iter(sessions.items()))
+            if now - last_used <= self.idle_ttl_sec:
+                break
+            self._remove(session_id)
+            expired += 1
+        self.evicted["ttl"] += expired
+        return expired
+
+    def _remove(self, session_id: str):
+        proxy_key, _ = self._sessions.pop(session_id)
+        self._unindex(session_id, proxy_key)
+
+    def _unindex(self, session_id: str, proxy_key: ProxyKey):
+        sessions = self._by_proxy.get(proxy_key)
+        if sessions is not None:
+            sessions.discard(session_id)
+            if not sessions:
+                del self._by_proxy[proxy_key]
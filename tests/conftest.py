@@ -0,0 +1,148 @@
+# proxy_steam_manager/tests/conftest.py
+
+"""
+Fixtures partilhadas pelos testes. Os módulos do projeto estão na raiz do
+repositório (sem pacote) e os substitutos locais (Steam e frota de proxies
+falsas) em benchmarks/fakes.py, por isso ambas as pastas entram no sys.path.
+Os testes assíncronos usam asyncio.run, sem plugins do pytest.
+"""
+
+import os
+import socket
+import sys
+import time
+from typing import List
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import proxy_manager_service as service  # noqa: E402
+from async_logger import ERROR  # noqa: E402
+from fakes import fleet_endpoints, start_fake_steam, start_proxy_fleet, stop_fleet, wait_for_port  # noqa: E402
+from models import proxy_key  # noqa: E402
+
+HOST = "127.0.0.1"
+
+# Linhas do ficheiro de proxies usadas pelos testes do pool, e as chaves correspondentes
+A = "http://10.0.0.1:8080"
+B = "http://10.0.0.2:8080"
+C = "socks5://10.0.0.3:1080"
+KEY_A = proxy_key("10.0.0.1", 8080, "http")
+KEY_B = proxy_key("10.0.0.2", 8080, "http")
+KEY_C = proxy_key("10.0.0.3", 1080, "socks5")
+
+# Os registos do pool (cargas, falhas, cooldowns) só fariam ruído na saída do pytest
+service.logger.level = ERROR + 1
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def free_port_range(count: int) -> int:
+    """Primeiro de `count` portos seguidos livres (a frota falsa usa portos consecutivos)."""
+    for base in range(30000, 60000, count + 7):
+        sockets: List[socket.socket] = []
+        try:
+            for port in range(base, base + count):
+                sock = socket.socket()
+                sockets.append(sock)
+                sock.bind((HOST, port))
+            return base
+        except OSError:
+            continue
+        finally:
+            for sock in sockets:
+                sock.close()
+    raise RuntimeError("Sem portos livres seguidos")
+
+
+def bump_mtime(path: str, seconds: int = 1):
+    """Muda o mtime sem esperar (a deteção rápida de alterações compara mtime e tamanho)."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10 ** 9))
+
+
+def assert_invariants(pool: service.ProxyPool):
+    """Os índices do ProxyPool (prontos, cooldown, sondas, sessões, pedidos em curso) batem certo entre si."""
+    pool._release_expired(time.monotonic())
+    ready = pool._ready
+    cooldown = set(pool._cooldown_deadline)
+    assert len(ready) == len(set(ready))
+    assert pool._ready_pos == {key: pos for pos, key in enumerate(ready)}
+    # Cada proxy está pronto ou em cooldown, nunca nos dois
+    assert not set(ready) & cooldown
+    assert set(ready) | cooldown == set(pool.proxies)
+    heap_entries = set(pool._cooldown_heap)
+    for key, deadline in pool._cooldown_deadline.items():
+        assert (deadline, key) in heap_entries
+        assert pool.proxies[key].cooldown_until == deadline
+    # Sondas só para proxies do pool; em curso só para proxies em cooldown
+    assert set(pool._probe_at) <= set(pool.proxies)
+    assert pool._probing <= cooldown
+    probe_entries = set(pool._probe_heap)
+    for key, at in pool._probe_at.items():
+        assert (at, key) in probe_entries
+    # As sessões só apontam para proxies prontos (cooldown e remoção largam-nas)
+    for session_id, (key, _) in pool.sessions._sessions.items():
+        assert key in pool._ready_pos
+        assert session_id in pool.sessions._by_proxy[key]
+    for proxy in pool.proxies.values():
+        assert proxy.in_flight == len(proxy.leases or ())
+
+
+@pytest.fixture
+def write_proxy_file(tmp_path):
+    """Escreve as linhas num ficheiro de proxies e devolve o caminho."""
+    path = str(tmp_path / "steam_live.txt")
+
+    def write(*lines: str) -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in lines)
+        return path
+
+    return write
+
+
+@pytest.fixture
+def make_pool(write_proxy_file):
+    """ProxyPool com os proxies dados (linhas 'protocolo://ip:porto')."""
+    def make(*lines: str, strategy: str = "first") -> service.ProxyPool:
+        return service.ProxyPool(write_proxy_file(*lines), strategy=strategy)
+
+    return make
+
+
+@pytest.fixture(scope="session")
+def fake_steam():
+    """Endpoint /market/search/render/ falso (ver fakes.py); devolve o URL de validação."""
+    port = free_port()
+    process = start_fake_steam(HOST, port)
+    try:
+        wait_for_port(HOST, port)
+        yield f"http://{HOST}:{port}/market/search/render/?query=&start=10&count=10"
+    finally:
+        stop_fleet([process])
+
+
+@pytest.fixture(scope="session")
+def proxy_fleet():
+    """
+    Frota falsa com 2 proxies de cada protocolo, um deles limitado (a Steam
+    responde-lhe 429). Devolve ([(porto, protocolo)], portos limitados).
+    """
+    counts = {"http": 2, "socks4": 2, "socks5": 2}
+    base_port = free_port_range(6)
+    fleet, limited = start_proxy_fleet(HOST, base_port, counts, processes=1, rate_limited=1 / 6)
+    endpoints = fleet_endpoints(base_port, counts)
+    try:
+        for port, _ in endpoints:
+            wait_for_port(HOST, port)
+        yield endpoints, limited
+    finally:
+        stop_fleet(fleet)
@@ -0,0 +1,198 @@
+# proxy_steam_manager/tests/test_forward_proxy.py
+
+"""Forward proxy através de um proxy da frota falsa: relatórios, pedidos HTTP simples e inatividade."""
+
+import asyncio
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import proxy_manager_service as service
+from conftest import HOST, free_port
+from forward_proxy import ForwardProxyServer
+from models import proxy_key
+from pool_backend import LocalPoolBackend
+
+
+async def _silent_target(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Destino que lê o pedido e fecha sem responder (como um upstream que corta a ligação)."""
+    await reader.read(1024)
+    writer.close()
+
+
+async def _stalled_target(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Destino que aceita a ligação e nunca envia nem fecha nada."""
+    await asyncio.sleep(3600)
+
+
+class RecordingOrigin:
+    """Servidor HTTP/1.1 de destino que guarda os pedidos recebidos (cabeçalho e corpo)."""
+
+    def __init__(self):
+        self.requests: List[bytes] = []
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                self.requests.append(head + await reader.readexactly(length))
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+                await writer.drain()
+                if b"connection: close" in head.lower():
+                    break
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+
+async def _wait_idle(server: ForwardProxyServer):
+    # O relatório é feito quando os dois sentidos do túnel terminam
+    deadline = time.monotonic() + 5
+    while server.active_connections:
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+def run_client(pool, client, target_handler=_silent_target, idle_timeout_sec: Optional[float] = None):
+    """
+    Corre `client(porto do forward proxy, (host, porto) de um destino local que usa
+    `target_handler`)` com um forward proxy sobre `pool`; devolve o resultado do cliente.
+    """
+    port = free_port()
+
+    async def main():
+        server = ForwardProxyServer(LocalPoolBackend(pool), service.logger, HOST, port, "X-Proxy-Session",
+                                    connect_timeout_sec=2, max_attempts=1, idle_timeout_sec=idle_timeout_sec)
+        await server.start()
+        target = await asyncio.start_server(target_handler, HOST, 0)
+        try:
+            result = await client(port, target.sockets[0].getsockname()[:2])
+            await _wait_idle(server)
+            return result
+        finally:
+            target.close()
+            await server.close()
+
+    return asyncio.run(main())
+
+
+def run_tunnel(pool, target: Optional[Tuple[str, int]], request: bytes) -> bytes:
+    """
+    Um túnel CONNECT pelo forward proxy até `target` (None: um destino que não
+    responde); devolve o que o cliente recebeu depois do 200.
+    """
+    async def client(port, silent):
+        target_host, target_port = target or silent
+        reader, writer = await asyncio.open_connection(HOST, port)
+        writer.write(f"CONNECT {target_host}:{target_port} HTTP/1.1\r\n\r\n".encode())
+        assert (await reader.readuntil(b"\r\n\r\n")).startswith(b"HTTP/1.1 200")
+        writer.write(request)
+        response = await asyncio.wait_for(reader.read(65536), 5)
+        writer.close()
+        return response
+
+    return run_client(pool, client)
+
+
+def _live_http_proxy(proxy_fleet):
+    endpoints, limited = proxy_fleet
+    return next(port for port, protocol in endpoints if protocol == "http" and port not in limited)
+
+
+def test_tunnel_with_a_response_is_reported_as_success(make_pool, fake_steam, proxy_fleet):
+    port = _live_http_proxy(proxy_fleet)
+    pool = make_pool(f"http://{HOST}:{port}")
+    steam = urlsplit(fake_steam)
+    request = f"GET {steam.path}?{steam.query} HTTP/1.1\r\nHost: {steam.netloc}\r\nConnection: close\r\n\r\n"
+    response = run_tunnel(pool, (steam.hostname, steam.port), request.encode())
+    assert response.startswith(b"HTTP/1.1 200")
+    proxy = pool.proxies[proxy_key(HOST, port, "http")]
+    assert proxy.failures == 0 and proxy.latency is not None and proxy.in_flight == 0
+
+
+def test_tunnel_closed_without_a_response_is_reported_as_failure(make_pool, proxy_fleet):
+    port = _live_http_proxy(proxy_fleet)
+    pool = make_pool(f"http://{HOST}:{port}")
+    response = run_tunnel(pool, None, b"GET / HTTP/1.1\r\nHost: x\r\n\r\n")
+    assert response == b""
+    proxy = pool.proxies[proxy_key(HOST, port, "http")]
+    assert proxy.failures == 1 and proxy.latency is None and proxy.in_flight == 0
+
+
+def test_plain_http_connection_carries_one_stripped_request(make_pool, proxy_fleet):
+    port = _live_http_proxy(proxy_fleet)
+    pool = make_pool(f"http://{HOST}:{port}")
+    origin = RecordingOrigin()
+
+    async def client(proxy_port, target):
+        url = f"http://{target[0]}:{target[1]}"
+        hop = "Proxy-Authorization: Basic czE6eA==\r\nX-Proxy-Session: s1\r\nConnection: keep-alive, X-Trace\r\n" \
+              "X-Trace: 1\r\nKeep-Alive: timeout=5\r\n"
+        reader, writer = await asyncio.open_connection(HOST, proxy_port)
+        # Dois pedidos seguidos na mesma ligação keep-alive, o primeiro com corpo
+        writer.write(f"POST {url}/first HTTP/1.1\r\nHost: x\r\n{hop}Content-Length: 5\r\n\r\nhello".encode())
+        writer.write(f"GET {url}/second HTTP/1.1\r\nHost: x\r\n{hop}\r\n".encode())
+        response = await asyncio.wait_for(reader.read(), 5)  # Até a ligação fechar
+        writer.close()
+        return response
+
+    response = run_client(pool, client, origin.handle)
+    assert response.count(b"HTTP/1.1 200") == 1 and response.endswith(b"ok")
+    [request] = origin.requests
+    head, _, body = request.partition(b"\r\n\r\n")
+    lines = head.lower().split(b"\r\n")
+    assert lines[0] == b"post /first http/1.1" and body == b"hello"
+    names = {line.partition(b":")[0] for line in lines[1:]}
+    assert names == {b"host", b"content-length", b"connection"}
+    assert b"connection: close" in lines
+    # O segundo pedido não chega ao destino (com ou sem os cabeçalhos do proxy)
+    assert all(b"/second" not in request for request in origin.requests)
+    assert pool.proxies[proxy_key(HOST, port, "http")].failures == 0
+
+
+def test_chunked_body_is_forwarded_whole(make_pool, proxy_fleet):
+    port = _live_http_proxy(proxy_fleet)
+    pool = make_pool(f"http://{HOST}:{port}")
+    received = []
+
+    async def origin(reader, writer):
+        head = await reader.readuntil(b"\r\n\r\n")
+        received.append(head + await reader.readuntil(b"0\r\n\r\n"))
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n")
+        writer.close()
+
+    async def client(proxy_port, target):
+        reader, writer = await asyncio.open_connection(HOST, proxy_port)
+        writer.write(f"POST http://{target[0]}:{target[1]}/ HTTP/1.1\r\nHost: x\r\n"
+                     "Transfer-Encoding: chunked\r\n\r\n5\r\nhello\r\n3;ext=1\r\nabc\r\n0\r\n\r\n".encode())
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return response
+
+    assert run_client(pool, client, origin).startswith(b"HTTP/1.1 200")
+    assert received[0].endswith(b"\r\n\r\n5\r\nhello\r\n3;ext=1\r\nabc\r\n0\r\n\r\n")
+
+
+def test_idle_tunnel_is_closed(make_pool, proxy_fleet):
+    port = _live_http_proxy(proxy_fleet)
+    pool = make_pool(f"http://{HOST}:{port}")
+
+    async def client(proxy_port, target):
+        reader, writer = await asyncio.open_connection(HOST, proxy_port)
+        writer.write(f"CONNECT {target[0]}:{target[1]} HTTP/1.1\r\n\r\n".encode())
+        assert (await reader.readuntil(b"\r\n\r\n")).startswith(b"HTTP/1.1 200")
+        started = time.monotonic()
+        # Nem o cliente nem o destino enviam nada: o forward proxy fecha a ligação
+        assert await asyncio.wait_for(reader.read(), 5) == b""
+        writer.close()
+        return time.monotonic() - started
+
+    elapsed = run_client(pool, client, _stalled_target, idle_timeout_sec=0.2)
+    assert 0.15 < elapsed < 3
+    assert pool.proxies[proxy_key(HOST, port, "http")].in_flight == 0
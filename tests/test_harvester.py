@@ -0,0 +1,102 @@
+# proxy_steam_manager/tests/test_harvester.py
+
+"""ProxyHarvester contra o servidor de listas falso (ETag / 304, deduplicação, limite do ficheiro de saída)."""
+
+import asyncio
+
+import pytest
+
+from conftest import HOST, free_port
+from fakes import start_list_server, stop_fleet, wait_for_port
+from proxy_harvester import ProxyHarvester
+
+SOURCES, LINES, OVERLAP = 3, 100, 0.3
+UNIQUE = int(LINES * OVERLAP) + SOURCES * (LINES - int(LINES * OVERLAP))
+
+
+@pytest.fixture(scope="module")
+def list_urls():
+    port = free_port()
+    process = start_list_server(HOST, port, SOURCES, LINES, OVERLAP)
+    try:
+        wait_for_port(HOST, port)
+        yield [f"http://{HOST}:{port}/list/{i}" for i in range(SOURCES)]
+    finally:
+        stop_fleet([process])
+
+
+def harvest(harvester: ProxyHarvester, rounds: int):
+    async def main():
+        async with harvester:
+            return [await harvester.harvest_once() for _ in range(rounds)]
+
+    return asyncio.run(main())
+
+
+def read_lines(path) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_second_round_is_answered_with_304(tmp_path, list_urls):
+    output, cache = tmp_path / "live.txt", tmp_path / "cache.json"
+    first, second = harvest(ProxyHarvester({"http": list_urls}, str(output), str(cache)), rounds=2)
+    assert [source.status for source in first.sources] == [200] * SOURCES
+    assert len(first.new_lines) == UNIQUE
+    # As linhas comuns a várias listas entram uma só vez
+    assert sum(source.new for source in first.sources) == UNIQUE
+    assert sum(source.lines for source in first.sources) == SOURCES * LINES
+    assert second.unchanged == SOURCES and second.new_lines == []
+    assert all(source.bytes == 0 for source in second.sources)
+    lines = read_lines(output)
+    assert len(lines) == len(set(lines)) == UNIQUE
+    assert all(line.startswith("http://") for line in lines)
+
+
+def test_validators_survive_a_restart(tmp_path, list_urls):
+    output, cache = tmp_path / "live.txt", tmp_path / "cache.json"
+    harvest(ProxyHarvester({"http": list_urls}, str(output), str(cache)), rounds=1)
+    [again] = harvest(ProxyHarvester({"http": list_urls}, str(output), str(cache)), rounds=1)
+    assert again.unchanged == SOURCES and again.new_lines == []
+    # Sem cache descarrega de novo, mas as chaves do ficheiro de saída não se repetem
+    [fresh] = harvest(ProxyHarvester({"http": list_urls}, str(output)), rounds=1)
+    assert fresh.unchanged == 0 and fresh.new_lines == []
+    assert len(read_lines(output)) == UNIQUE
+
+
+def test_same_endpoint_with_another_protocol_is_another_proxy(tmp_path, list_urls):
+    output = tmp_path / "live.txt"
+    [result] = harvest(ProxyHarvester({"http": list_urls[:1], "socks5": list_urls[:1]}, str(output)), rounds=1)
+    assert len(result.new_lines) == 2 * LINES
+    assert sum(line.startswith("socks5://") for line in read_lines(output)) == LINES
+
+
+def test_failed_source_does_not_stop_the_round(tmp_path, list_urls):
+    output = tmp_path / "live.txt"
+    dead = f"http://{HOST}:{free_port()}/list/0"
+    [result] = harvest(ProxyHarvester({"http": list_urls[:1] + [dead]}, str(output), timeout_sec=2), rounds=1)
+    assert result.failed == 1 and result.sources[1].status is None and result.sources[1].error
+    assert len(result.new_lines) == LINES
+
+
+def test_output_is_capped_to_the_newest_lines(tmp_path, list_urls):
+    output = tmp_path / "live.txt"
+    [first] = harvest(ProxyHarvester({"http": list_urls}, str(output), max_lines=LINES), rounds=1)
+    assert len(first.new_lines) == UNIQUE and first.trimmed == UNIQUE - LINES
+    assert read_lines(output) == first.new_lines[-LINES:]
+    # Sem cache as listas são descarregadas de novo: os cortados voltam como novos e o ficheiro continua limitado
+    [again] = harvest(ProxyHarvester({"http": list_urls}, str(output), max_lines=LINES), rounds=1)
+    assert len(again.new_lines) == again.trimmed == UNIQUE - LINES
+    lines = read_lines(output)
+    assert len(lines) == len(set(lines)) == LINES
+    assert lines == again.new_lines[-LINES:]
+
+
+def test_existing_output_over_the_cap_is_trimmed(tmp_path, list_urls):
+    output = tmp_path / "live.txt"
+    old = [f"http://10.9.{i // 256}.{i % 256}:80" for i in range(LINES)]
+    output.write_text("\n".join(old) + "\n", encoding="utf-8")
+    [result] = harvest(ProxyHarvester({"http": list_urls[:1]}, str(output), max_lines=LINES), rounds=1)
+    # Os antigos saem primeiro
+    assert len(result.new_lines) == LINES and result.trimmed == LINES
+    assert read_lines(output) == result.new_lines
@@ -0,0 +1,114 @@
+# proxy_steam_manager/tests/test_pool_backend.py
+
+"""Protocolo JSON por linhas entre os workers e o coordenador do pool (TCP local)."""
+
+import asyncio
+
+import pytest
+
+import proxy_manager_service as service
+from conftest import HOST, free_port
+from pool_backend import CoordinatorError, CoordinatorPoolBackend, PoolCoordinator, parse_address
+
+A = "http://10.0.0.1:8080"
+B = "socks5://10.0.0.2:1080"
+
+
+def test_parse_address():
+    assert parse_address("127.0.0.1:9000") == ("127.0.0.1", 9000, None)
+    assert parse_address("/tmp/pool.sock") == (None, None, "/tmp/pool.sock")
+    assert parse_address("/tmp/a:1") == (None, None, "/tmp/a:1")
+
+
+def run_with_coordinator(pool, scenario):
+    """Corre `scenario(backend)` com um coordenador e um cliente ligados por TCP."""
+    address = f"{HOST}:{free_port()}"
+
+    async def main():
+        coordinator = PoolCoordinator(pool, service.logger, address)
+        await coordinator.start()
+        backend = CoordinatorPoolBackend(address, connect_timeout_sec=2)
+        try:
+            await backend.connect()
+            return await scenario(backend, coordinator)
+        finally:
+            await backend.close()
+            await coordinator.close()
+
+    return asyncio.run(main())
+
+
+def test_round_trips_match_the_local_pool(make_pool):
+    pool = make_pool(A, B)
+
+    async def scenario(backend, coordinator):
+        proxy = await backend.acquire("s1")
+        assert proxy.key_str in ("10.0.0.1:8080:http", "10.0.0.2:1080:socks5")
+        # A sessão fica com o mesmo proxy
+        assert (await backend.acquire("s1")).key_str == proxy.key_str
+        assert {p.key_str for p in await backend.acquire_for_session("s2", 2)} == \
+            {"10.0.0.1:8080:http", "10.0.0.2:1080:socks5"}
+        assert [p is not None for p in await backend.acquire_many(["s3", "s4"])] == [True, True]
+        assert await backend.report(proxy.key_str, True, 120.0)
+        assert not await backend.report("10.9.9.9:1:http", True)
+        assert await backend.report_many([(proxy.key_str, True, None, None), ("10.9.9.9:1:http", False, None, None)]) == 1
+        other = B if proxy.protocol == "http" else A
+        counts = await backend.ingest([("add", "http://10.0.0.3:3128", 90.0), ("remove", other, None)])
+        assert counts["add"] == 1 and counts["remove"] == 1
+        assert (await backend.metrics())["total_proxies_in_pool"] == 2
+        assert "# TYPE proxy_pool_acquire_seconds histogram" in await backend.metrics_text()
+        return proxy
+
+    proxy = run_with_coordinator(pool, scenario)
+    # O estado mudou no pool do coordenador, não numa cópia
+    assert pool.proxies[proxy.key].latency == 120.0
+    assert {p.key_str for p in pool.proxies.values()} == {proxy.key_str, "10.0.0.3:3128:http"}
+
+
+def test_pipelined_calls_get_their_own_responses(make_pool):
+    pool = make_pool(A, B)
+
+    async def scenario(backend, coordinator):
+        # Muitos pedidos em curso na mesma ligação: as respostas chegam pela ordem dos pedidos
+        calls = []
+        for i in range(1, 60):
+            calls.append(backend.ingest([("add", "lixo", None)] * i))
+            calls.append(backend.metrics())
+        results = await asyncio.gather(*calls)
+        assert [counts["invalid"] for counts in results[0::2]] == list(range(1, 60))
+        assert all(metrics["total_proxies_in_pool"] == 2 for metrics in results[1::2])
+
+    run_with_coordinator(pool, scenario)
+
+
+def test_errors_are_returned_without_closing_the_connection(make_pool):
+    pool = make_pool(A)
+
+    async def scenario(backend, coordinator):
+        with pytest.raises(CoordinatorError, match="Operação desconhecida"):
+            await backend._call("drop_everything")
+        with pytest.raises(CoordinatorError):
+            await backend._call("acquire_for_session", "s1")  # Falta o número de proxies
+        assert (await backend.acquire(None)).key_str == "10.0.0.1:8080:http"
+        assert coordinator.connections == 1
+
+    run_with_coordinator(pool, scenario)
+
+
+def test_client_reconnects_after_the_connection_drops(make_pool):
+    pool = make_pool(A)
+
+    async def scenario(backend, coordinator):
+        assert await backend.acquire(None) is not None
+        # Ligação fechada (ex.: o coordenador reiniciou): o próximo pedido volta a ligar
+        backend._writer.close()
+        await asyncio.sleep(0.05)
+        assert await backend.acquire(None) is not None
+
+    run_with_coordinator(pool, scenario)
+
+
+def test_unreachable_coordinator_raises():
+    backend = CoordinatorPoolBackend(f"{HOST}:{free_port()}", connect_timeout_sec=0.3)
+    with pytest.raises(CoordinatorError, match="inacessível"):
+        asyncio.run(backend.connect())
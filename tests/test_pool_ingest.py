@@ -0,0 +1,35 @@
+# proxy_steam_manager/tests/test_pool_ingest.py
+
+"""Eventos do checker aplicados diretamente ao pool (POST /ingest)."""
+
+from conftest import A, B, C, KEY_A, KEY_C, assert_invariants
+
+
+def test_ingest_applies_events_and_journals_them(make_pool):
+    pool = make_pool(A, B)
+    pool.take_state_changes()
+    counts = pool.ingest([
+        ("add", C, None),
+        ("latency", A, 120.0),
+        ("latency", B, None),
+        ("remove", B, None),
+        ("remove", "http://10.9.9.9:1", None),
+        ("add", "não é um proxy", None),
+        ("explode", A, None),
+    ])
+    assert counts == {"add": 1, "latency": 2, "remove": 1, "ignored": 1, "invalid": 2}
+    assert set(pool.proxies) == {KEY_A, KEY_C}
+    assert pool.proxies[KEY_A].latency == 120.0
+    assert pool.proxies[KEY_C].last_validated is not None
+    changes = pool.take_state_changes()
+    # O proxy novo (sem latência) também entra no journal; o removido fica None
+    assert set(changes) == {"10.0.0.1:8080:http", "10.0.0.2:8080:http", "10.0.0.3:1080:socks5"}
+    assert changes["10.0.0.2:8080:http"] is None
+    assert_invariants(pool)
+
+
+def test_ingested_latency_is_averaged(make_pool):
+    pool = make_pool(A)
+    pool.ingest([("latency", A, 100.0)])
+    pool.ingest([("latency", A, 200.0)])
+    assert 100.0 < pool.proxies[KEY_A].latency < 200.0
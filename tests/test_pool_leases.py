@@ -0,0 +1,43 @@
+# proxy_steam_manager/tests/test_pool_leases.py
+
+"""Pedidos em curso (in_flight) que a seleção pesa e que expiram se nunca forem reportados."""
+
+import proxy_manager_service as service
+from conftest import A, B, assert_invariants
+
+
+def test_reports_end_the_oldest_lease(make_pool):
+    pool = make_pool(A)
+    proxy = pool.get_proxy(None)
+    pool.get_proxy(None)
+    assert proxy.in_flight == 2
+    assert pool.report_proxy_usage(proxy.key_str, True, 50.0)
+    assert proxy.in_flight == 1
+    assert_invariants(pool)
+
+
+def test_unreported_acquires_expire(make_pool, monkeypatch):
+    pool = make_pool(A, B)
+    first = pool.get_proxy(None)
+    pool.get_proxy(None)
+    pool.report_proxy_usage(first.key_str, True, 50.0)
+    assert sum(proxy.in_flight for proxy in pool.proxies.values()) == 1
+    assert_invariants(pool)
+    expired_before = service.LEASES_EXPIRED.value
+    monkeypatch.setattr(service, "PROXY_IN_FLIGHT_LEASE_SEC", 0)
+    pool.get_proxy(None)  # Expira os dois pedidos anteriores; o novo fica em curso
+    assert service.LEASES_EXPIRED.value - expired_before == 1
+    assert sum(proxy.in_flight for proxy in pool.proxies.values()) == 1
+    assert_invariants(pool)
+
+
+def test_lease_of_a_replaced_proxy_is_not_charged_to_the_new_one(make_pool, monkeypatch):
+    pool = make_pool(A)
+    pool.get_proxy(None)
+    # Retirado e acrescentado de novo: outro Proxy, sem pedidos em curso
+    pool.ingest([("remove", A, None), ("add", A, None)])
+    expired_before = service.LEASES_EXPIRED.value
+    monkeypatch.setattr(service, "PROXY_IN_FLIGHT_LEASE_SEC", 0)
+    pool.get_proxy(None)
+    assert service.LEASES_EXPIRED.value == expired_before
+    assert_invariants(pool)
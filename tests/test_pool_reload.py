@@ -0,0 +1,42 @@
+# proxy_steam_manager/tests/test_pool_reload.py
+
+"""Recarga incremental do ficheiro de proxies no ProxyPool (só a diferença é aplicada)."""
+
+import proxy_manager_service as service
+from conftest import A, B, C, KEY_A, KEY_B, KEY_C, assert_invariants, bump_mtime
+from models import proxy_key
+from proxy_file import diff_proxy_file
+
+
+def test_apply_diff_keeps_state_and_drops_sessions_of_removed(make_pool):
+    pool = make_pool(A, B)
+    removed = pool.get_proxy("s1")
+    kept = pool.proxies[KEY_B if removed.key == KEY_A else KEY_A]
+    kept.failures = 1
+    pool.apply_diff({KEY_C: service.Proxy("10.0.0.3", 1080, "socks5")}, {removed.key, proxy_key("10.9.9.9", 1, "http")})
+    assert set(pool.proxies) == {kept.key, KEY_C}
+    assert pool.proxies[kept.key] is kept and kept.failures == 1
+    assert "s1" not in pool.sessions
+    assert_invariants(pool)
+
+
+def test_unchanged_file_is_not_applied(make_pool):
+    pool = make_pool(A, B)
+    unchanged_before = service.RELOADS["unchanged"].value
+    pool.load_proxies()
+    assert service.RELOADS["unchanged"].value - unchanged_before == 1
+    assert set(pool.proxies) == {KEY_A, KEY_B}
+
+
+def test_reload_counts_only_keys_actually_changed(make_pool, write_proxy_file):
+    pool = make_pool(A)
+    pool.ingest([("add", B, None)])  # Já no pool quando o ficheiro o acrescentar
+    added_before = service.PROXIES_ADDED.value
+    removed_before = service.PROXIES_REMOVED.value
+    path = write_proxy_file(B, C)
+    bump_mtime(path)
+    assert pool.apply_file_diff(diff_proxy_file(path, pool._file_state))
+    assert service.PROXIES_ADDED.value - added_before == 1  # Só C
+    assert service.PROXIES_REMOVED.value - removed_before == 1  # Só A
+    assert set(pool.proxies) == {KEY_B, KEY_C}
+    assert_invariants(pool)
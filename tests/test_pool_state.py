@@ -0,0 +1,94 @@
+# proxy_steam_manager/tests/test_pool_state.py
+
+"""PoolStateStore (fotografia + journal com números de sequência) e o estado de cada proxy."""
+
+import json
+import time
+
+from models import Proxy
+from pool_state import STATE_VERSION, PoolState, PoolStateStore, apply_proxy_state, proxy_state
+
+
+def make_store(tmp_path) -> PoolStateStore:
+    return PoolStateStore(str(tmp_path / "pool_state.json"), str(tmp_path / "pool_state.journal"))
+
+
+def test_missing_files_give_an_empty_state(tmp_path):
+    state = make_store(tmp_path).load()
+    assert state.seq == 0 and state.proxies == {} and state.sessions == []
+
+
+def test_journal_is_replayed_over_the_snapshot(tmp_path):
+    store = make_store(tmp_path)
+    store.write_snapshot(PoolState(written_at=time.time(), proxies={"a": [1, 0, None, 0.5, 100.0, None]},
+                                   sessions=[["s1", "a", 3.0]]))
+    store.append_journal({"a": [2, 0, None, 0.4, 110.0, None], "b": [1, 0, None, 0.7, None, None]})
+    store.append_journal({"b": None})
+    state = make_store(tmp_path).load()
+    assert state.seq == 2 and state.journal_batches == 2
+    assert state.proxies == {"a": [2, 0, None, 0.4, 110.0, None], "b": None}
+    assert state.sessions == [["s1", "a", 3.0]]
+
+
+def test_truncated_journal_line_is_ignored(tmp_path):
+    store = make_store(tmp_path)
+    store.append_journal({"a": [1, 0, None, 0.9, None, None]})
+    store.append_journal({"a": [2, 0, None, 0.8, None, None]})
+    # O serviço parou a meio da escrita do terceiro lote
+    with open(store.journal_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps([3, {"a": [3, 0, None, 0.7, None, None]}])[:-5])
+    state = make_store(tmp_path).load()
+    assert state.seq == 2 and state.journal_batches == 2
+    assert state.proxies["a"][0] == 2
+
+
+def test_batches_older_than_the_snapshot_are_skipped(tmp_path):
+    store = make_store(tmp_path)
+    store.append_journal({"a": [1, 0, None, 0.9, None, None]})
+    # Fotografia escrita e o serviço parou antes de limpar o journal: o lote 1 volta a aparecer
+    with open(store.journal_path, "r", encoding="utf-8") as f:
+        old_journal = f.read()
+    store.write_snapshot(PoolState(written_at=time.time(), proxies={"a": [5, 0, None, 0.5, None, None]}))
+    with open(store.journal_path, "w", encoding="utf-8") as f:
+        f.write(old_journal)
+    store.append_journal({"b": [1, 0, None, 1.0, 50.0, None]})
+    state = make_store(tmp_path).load()
+    assert state.seq == 2 and state.journal_batches == 1
+    assert state.proxies == {"a": [5, 0, None, 0.5, None, None], "b": [1, 0, None, 1.0, 50.0, None]}
+
+
+def test_snapshot_of_another_version_is_ignored(tmp_path):
+    store = make_store(tmp_path)
+    with open(store.snapshot_path, "w", encoding="utf-8") as f:
+        json.dump({"version": STATE_VERSION + 1, "seq": 9, "written_at": 0, "proxies": {"a": None}, "sessions": []}, f)
+    assert store.load().proxies == {}
+
+
+def test_proxy_state_round_trip():
+    proxy = Proxy("10.0.0.1", 8080, "http")
+    assert proxy_state(proxy) is None
+    # Os pedidos servidos já não contam: sozinhos deixam o proxy no estado inicial
+    proxy.requests_served = 40
+    assert proxy_state(proxy) is None
+    proxy.failures, proxy.success_rate, proxy.latency, proxy.rate = 2, 0.5, 150.0, 0.1
+    proxy.cooldown_until = time.monotonic() + 60
+    state = proxy_state(proxy)
+    assert state[1] == 0
+
+    restored = Proxy("10.0.0.1", 8080, "http", tokens=0.0, rate_limited=3)
+    apply_proxy_state(restored, json.loads(json.dumps(state)), time.time())
+    assert (restored.failures, restored.success_rate, restored.latency, restored.rate) == (2, 0.5, 150.0, 0.1)
+    assert abs(restored.cooldown_until - proxy.cooldown_until) < 0.5
+    # O balde recomeça com os tokens iniciais e a sequência de 429 é esquecida
+    assert restored.tokens is None and restored.rate_limited == 0
+
+    apply_proxy_state(restored, None, time.time())
+    assert proxy_state(restored) is None
+
+
+def test_old_states_are_accepted():
+    # Estado de antes da taxa aprendida (5 elementos), com um cooldown que já terminou
+    proxy = Proxy("10.0.0.1", 8080, "http")
+    apply_proxy_state(proxy, [1, 22, time.time() - 10, 0.9, 80.0], time.time())
+    assert proxy.failures == 1 and proxy.cooldown_until is None and proxy.rate is None
+    assert proxy.requests_served == 0
@@ -0,0 +1,88 @@
+# proxy_steam_manager/tests/test_proxy_file.py
+
+"""diff_proxy_file: ficheiro sem alterações, reescrito com o mesmo conteúdo e alterado."""
+
+import os
+
+from conftest import bump_mtime
+from models import proxy_key
+from proxy_file import ProxyFileState, diff_proxy_file, parse_proxy_line
+
+KEY_A = proxy_key("10.0.0.1", 8080, "http")
+KEY_B = proxy_key("10.0.0.2", 1080, "socks5")
+KEY_C = proxy_key("10.0.0.3", 3128, "http")
+
+
+def test_parse_proxy_line():
+    assert parse_proxy_line("https://10.0.0.1:8080") == (KEY_A, "10.0.0.1", 8080, "http")
+    assert parse_proxy_line("") is None
+    assert parse_proxy_line("10.0.0.1:8080") is None
+    assert parse_proxy_line("ftp://10.0.0.1:21") is None
+
+
+def test_first_read_adds_everything(write_proxy_file):
+    path = write_proxy_file("http://10.0.0.1:8080", "socks5://10.0.0.2:1080", "", "http://lixo", "http://10.0.0.9:x")
+    state = ProxyFileState()
+    diff = diff_proxy_file(path, state)
+    assert set(diff.added) == {KEY_A, KEY_B}
+    assert diff.removed == set()
+    assert sorted(diff.bad_lines) == ["http://10.0.0.9:x", "http://lixo"]
+    assert not diff.missing
+
+
+def test_unchanged_file_returns_none(write_proxy_file):
+    path = write_proxy_file("http://10.0.0.1:8080")
+    state = ProxyFileState()
+    diff_proxy_file(path, state)
+    assert diff_proxy_file(path, state) is None
+
+
+def test_identical_rewrite_returns_none(write_proxy_file):
+    path = write_proxy_file("http://10.0.0.1:8080", "socks5://10.0.0.2:1080")
+    state = ProxyFileState()
+    diff_proxy_file(path, state)
+    # O checker reescreve o ficheiro de forma atómica, muitas vezes com o mesmo conteúdo
+    write_proxy_file("http://10.0.0.1:8080", "socks5://10.0.0.2:1080")
+    bump_mtime(path)
+    assert diff_proxy_file(path, state) is None
+    # A verificação rápida passa a usar o novo mtime
+    assert state.mtime_ns == os.stat(path).st_mtime_ns
+
+
+def test_changed_file_returns_only_the_difference(write_proxy_file):
+    path = write_proxy_file("http://10.0.0.1:8080", "socks5://10.0.0.2:1080")
+    state = ProxyFileState()
+    diff_proxy_file(path, state)
+    write_proxy_file("http://10.0.0.1:8080", "http://10.0.0.3:3128")
+    bump_mtime(path)
+    diff = diff_proxy_file(path, state)
+    assert set(diff.added) == {KEY_C}
+    assert diff.removed == {KEY_B}
+
+
+def test_lines_with_the_same_key_count_once(write_proxy_file):
+    path = write_proxy_file("http://10.0.0.1:8080", "https://10.0.0.1:8080")
+    state = ProxyFileState()
+    assert set(diff_proxy_file(path, state).added) == {KEY_A}
+    # Sai uma das linhas: a chave continua no ficheiro
+    write_proxy_file("https://10.0.0.1:8080")
+    bump_mtime(path)
+    diff = diff_proxy_file(path, state)
+    assert diff.added == {} and diff.removed == set()
+    write_proxy_file("socks5://10.0.0.2:1080")
+    bump_mtime(path, 2)
+    diff = diff_proxy_file(path, state)
+    assert set(diff.added) == {KEY_B} and diff.removed == {KEY_A}
+
+
+def test_missing_file_counts_as_empty(write_proxy_file):
+    path = write_proxy_file("http://10.0.0.1:8080")
+    state = ProxyFileState()
+    diff_proxy_file(path, state)
+    os.remove(path)
+    diff = diff_proxy_file(path, state)
+    assert diff.missing and diff.removed == {KEY_A}
+    assert diff_proxy_file(path, state) is None
+    # Ficheiro de novo: o mtime/tamanho nunca coincidem com os de um ficheiro inexistente
+    write_proxy_file("http://10.0.0.1:8080")
+    assert set(diff_proxy_file(path, state).added) == {KEY_A}
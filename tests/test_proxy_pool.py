@@ -0,0 +1,57 @@
+# proxy_steam_manager/tests/test_proxy_pool.py
+
+"""Índice de proxies prontos e heap de cooldowns do ProxyPool."""
+
+import heapq
+import time
+
+from conftest import A, B, C, KEY_A, KEY_B, KEY_C, assert_invariants
+
+
+def test_initial_load_puts_every_proxy_in_ready(make_pool):
+    pool = make_pool(A, B, C, "linha inválida", "ftp://10.0.0.9:21")
+    assert set(pool.proxies) == {KEY_A, KEY_B, KEY_C}
+    assert len(pool._ready) == 3
+    assert_invariants(pool)
+
+
+def test_session_is_sticky_until_failure(make_pool):
+    pool = make_pool(A, B)
+    first = pool.get_proxy("s1")
+    assert pool.get_proxy("s1") is first
+    assert pool.report_proxy_usage(first.key_str, False, status_code=502)
+    assert first.failures == 1
+    assert first.key in pool._cooldown_deadline
+    assert "s1" not in pool.sessions
+    assert_invariants(pool)
+    second = pool.get_proxy("s1")
+    assert second is not None and second is not first
+    assert_invariants(pool)
+
+
+def test_report_for_unknown_proxy_is_ignored(make_pool):
+    pool = make_pool(A)
+    assert not pool.report_proxy_usage("10.9.9.9:1:http", True)
+    assert_invariants(pool)
+
+
+def test_get_proxies_returns_distinct_proxies(make_pool):
+    pool = make_pool(A, B, C)
+    proxies = pool.get_proxies("s1", 5)
+    assert len(proxies) == 3
+    assert len({proxy.key for proxy in proxies}) == 3
+    assert pool.sessions.get("s1") == proxies[0].key
+    assert_invariants(pool)
+
+
+def test_cooldown_expiry_returns_proxy_to_ready(make_pool):
+    pool = make_pool(A)
+    pool.report_proxy_usage(KEY_A, False)
+    assert pool.get_proxy(None) is None
+    # Antecipar o prazo em vez de esperar pelo cooldown
+    deadline = time.monotonic() - 1
+    pool.proxies[KEY_A].cooldown_until = deadline
+    pool._cooldown_deadline[KEY_A] = deadline
+    heapq.heappush(pool._cooldown_heap, (deadline, KEY_A))
+    assert pool.get_proxy(None) is pool.proxies[KEY_A]
+    assert_invariants(pool)
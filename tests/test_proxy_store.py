@@ -0,0 +1,36 @@
+# proxy_steam_manager/tests/test_proxy_store.py
+
+"""ProxyStore (SQLite): upsert, filtros e ordem de query_live."""
+
+import time
+
+from models import Proxy, proxy_key
+from proxy_store import ProxyStore
+
+
+def test_query_live_lists_unmeasured_proxies_last(tmp_path):
+    now = time.time()
+    with ProxyStore(str(tmp_path / "proxies.db")) as store:
+        store.upsert_many([
+            Proxy("10.0.0.1", 8080, "http", latency=None, last_validated=now),
+            Proxy("10.0.0.2", 8080, "http", latency=300.0, last_validated=now),
+            Proxy("10.0.0.3", 8080, "http", latency=100.0, last_validated=now),
+            Proxy("10.0.0.4", 8080, "http", latency=50.0, last_validated=now - 3600),
+            Proxy("10.0.0.5", 8080, "http", latency=10.0, last_validated=now, failures=2),
+        ])
+        assert [p.ip for p in store.query_live()] == ["10.0.0.4", "10.0.0.3", "10.0.0.2", "10.0.0.1"]
+        assert [p.ip for p in store.query_live(validated_within_sec=60)] == ["10.0.0.3", "10.0.0.2", "10.0.0.1"]
+        # Um limite de latência exclui os que não têm latência medida
+        assert [p.ip for p in store.query_live(max_latency_ms=200)] == ["10.0.0.4", "10.0.0.3"]
+        assert [p.ip for p in store.query_live(max_failures=2, limit=2)] == ["10.0.0.5", "10.0.0.4"]
+
+
+def test_upsert_updates_and_delete_removes(tmp_path):
+    with ProxyStore(str(tmp_path / "proxies.db")) as store:
+        store.upsert(Proxy("10.0.0.1", 8080, "http", latency=100.0))
+        store.upsert(Proxy("10.0.0.1", 8080, "http", latency=80.0, failures=1))
+        assert store.count() == 1
+        [proxy] = store.iter_proxies()
+        assert proxy.latency == 80.0 and proxy.failures == 1
+        store.delete_many([proxy_key("10.0.0.1", 8080, "http")])
+        assert store.count() == 0
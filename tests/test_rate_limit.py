@@ -0,0 +1,147 @@
+# proxy_steam_manager/tests/test_rate_limit.py
+
+"""TokenBucketPolicy: tokens, corte da taxa nos 429 e cooldowns exponenciais."""
+
+import time
+
+import pytest
+
+import config
+from conftest import A, B, KEY_A, assert_invariants
+from models import Proxy
+from rate_limit import TokenBucketPolicy, _backoff
+
+
+def make_policy(**overrides) -> TokenBucketPolicy:
+    params = dict(capacity=4, initial_tokens=2, initial_rate=1.0, min_rate=0.25, max_rate=2.0, increase=0.5,
+                  decrease_factor=0.5, rate_limit_statuses=(429,), rate_limited_sec=10, failure_sec=5,
+                  max_cooldown_sec=40)
+    params.update(overrides)
+    return TokenBucketPolicy(**params)
+
+
+def config_policy() -> TokenBucketPolicy:
+    return TokenBucketPolicy(
+        config.PROXY_RATE_BURST, config.PROXY_RATE_INITIAL_TOKENS, config.PROXY_RATE_INITIAL, config.PROXY_RATE_MIN,
+        config.PROXY_RATE_MAX, config.PROXY_RATE_INCREASE, config.PROXY_RATE_DECREASE_FACTOR,
+        config.PROXY_RATE_LIMIT_STATUS, config.PROXY_RATE_LIMITED_COOLDOWN_SEC, config.PROXY_FAILURE_COOLDOWN_SEC,
+        config.PROXY_COOLDOWN_MAX_SEC)
+
+
+def test_backoff_doubles_up_to_the_maximum():
+    assert [_backoff(5, streak, 40) for streak in range(0, 6)] == [5, 5, 10, 20, 40, 40]
+
+
+def test_fresh_proxy_starts_with_the_initial_tokens():
+    policy = make_policy()
+    proxy = Proxy("10.0.0.1", 8080, "http")
+    assert policy.take(proxy, 100.0) is None
+    # Sem tokens inteiros: espera até haver um (1 / taxa)
+    assert policy.take(proxy, 100.0) == pytest.approx(101.0)
+    assert proxy.tokens == pytest.approx(0.0)
+
+
+def test_initial_tokens_are_clamped():
+    assert make_policy(initial_tokens=0).initial_tokens == 1.0
+    assert make_policy(initial_tokens=10).initial_tokens == 4.0
+
+
+def test_refill_is_capped_at_capacity():
+    policy = make_policy()
+    proxy = Proxy("10.0.0.1", 8080, "http")
+    policy.take(proxy, 0.0)
+    # Muito tempo parado: o balde enche só até à capacidade (a rajada)
+    deadlines = [policy.take(proxy, 1000.0) for _ in range(4)]
+    assert deadlines[:3] == [None, None, None]
+    assert deadlines[3] == pytest.approx(1001.0)
+
+
+def test_success_raises_the_rate_up_to_the_maximum():
+    policy = make_policy()
+    proxy = Proxy("10.0.0.1", 8080, "http", rate_limited=2)
+    policy.on_success(proxy)
+    assert proxy.rate == 1.5 and proxy.rate_limited == 0
+    policy.on_success(proxy)
+    policy.on_success(proxy)
+    assert proxy.rate == 2.0
+
+
+def test_rate_limited_cuts_the_rate_and_ignores_in_flight_429s():
+    policy = make_policy()
+    proxy = Proxy("10.0.0.1", 8080, "http")
+    assert policy.is_rate_limited(429) and not policy.is_rate_limited(503) and not policy.is_rate_limited(None)
+    until = policy.on_rate_limited(proxy, 100.0)
+    assert proxy.rate == 0.5 and proxy.tokens == 0.0 and proxy.rate_limited == 1
+    assert until == pytest.approx(110.0)
+    # Outro 429 de um pedido entregue antes do corte: mesmo prazo, sem novo corte
+    assert policy.on_rate_limited(proxy, 105.0) == pytest.approx(110.0)
+    assert proxy.rate == 0.5 and proxy.rate_limited == 1
+    # Depois do cooldown conta como 429 seguido: corta outra vez e duplica o cooldown
+    assert policy.on_rate_limited(proxy, 111.0) == pytest.approx(131.0)
+    assert proxy.rate == 0.25 and proxy.rate_limited == 2
+    policy.on_rate_limited(proxy, 200.0)
+    assert proxy.rate == 0.25  # Nunca abaixo do mínimo
+
+
+def test_rate_limited_cooldown_covers_at_least_one_token():
+    policy = make_policy(rate_limited_sec=1, min_rate=0.01)
+    proxy = Proxy("10.0.0.1", 8080, "http", rate=0.02)
+    assert policy.on_rate_limited(proxy, 0.0) == pytest.approx(100.0)  # 1 / 0.01
+
+
+def test_failure_cooldown_grows_with_consecutive_failures():
+    policy = make_policy()
+    proxy = Proxy("10.0.0.1", 8080, "http")
+    deadlines = []
+    for _ in range(5):
+        proxy.mark_failed()
+        deadlines.append(policy.on_failure(proxy, 0.0))
+    assert deadlines == [5, 10, 20, 40, 40]
+
+
+def test_pool_acquire_spends_tokens_until_cooldown(make_pool):
+    pool = make_pool(A)
+    expected = int(pool.rate_limit.initial_tokens)
+    served = 0
+    while pool.get_proxy("s1") is not None:
+        served += 1
+        assert_invariants(pool)
+        assert served <= expected
+    assert served == expected
+    proxy = pool.proxies[KEY_A]
+    assert KEY_A in pool._cooldown_deadline
+    # Sem tokens só espera pelo próximo, não por uma janela inteira
+    assert proxy.cooldown_until - time.monotonic() <= 1.0 / pool.rate_limit.rate(proxy) + 0.1
+    assert "s1" not in pool.sessions
+
+
+def test_pool_rate_limited_report_is_not_a_failure(make_pool):
+    pool = make_pool(A, B)
+    pool.revalidate = True
+    proxy = pool.get_proxy("s1")
+    rate_before = pool.rate_limit.rate(proxy)
+    assert pool.report_proxy_usage(proxy.key_str, False, status_code=429)
+    assert proxy.failures == 0
+    assert proxy.rate_limited == 1
+    assert pool.rate_limit.rate(proxy) < rate_before
+    assert proxy.key in pool._cooldown_deadline
+    # Um proxy limitado não é sondado: libertá-lo mais cedo voltaria a exceder o limite
+    assert proxy.key not in pool._probe_at
+    assert_invariants(pool)
+
+
+def test_defaults_keep_the_old_window_ceiling():
+    # Cliente ganancioso: usa o proxy assim que tem um token e só recebe sucessos
+    policy = config_policy()
+    proxy = Proxy("10.0.0.1", 8080, "http")
+    now, sent = 0.0, []
+    while now < 10 * config.COOLDOWN_TIME_SECONDS:
+        sent.append(now)
+        deadline = policy.take(proxy, now)
+        policy.on_success(proxy)
+        if deadline is not None:
+            now = deadline
+    limit = config.REQUESTS_PER_PROXY
+    # Como a janela fixa antiga: nunca mais de REQUESTS_PER_PROXY pedidos em COOLDOWN_TIME_SECONDS
+    assert all(sent[i + limit] - sent[i] >= config.COOLDOWN_TIME_SECONDS - 1e-6
+               for i in range(len(sent) - limit))
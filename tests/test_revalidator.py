@@ -0,0 +1,182 @@
+# proxy_steam_manager/tests/test_revalidator.py
+
+"""Sondas agendadas pelo ProxyPool e ProxyRevalidator contra a Steam e a frota falsas (benchmarks/fakes.py)."""
+
+import asyncio
+import time
+
+import proxy_manager_service as service
+from adaptive_limiter import OUTCOME_FAIL, OUTCOME_LOCAL_ERROR, OUTCOME_OK
+from conftest import A, B, C, HOST, KEY_A, KEY_B, KEY_C, assert_invariants, bump_mtime, free_port
+from models import Proxy, proxy_key
+from revalidator import OUTCOME_RATE_LIMITED, ProxyRevalidator
+
+
+def make_revalidator(url: str) -> ProxyRevalidator:
+    return ProxyRevalidator(url, service.CHECKER_VALIDATION_TEXT, service.CHECKER_HEADERS, concurrency=10,
+                            timeout_sec=2, interval_sec=0.01)
+
+
+def test_probe_outcomes(fake_steam, proxy_fleet):
+    endpoints, limited = proxy_fleet
+    dead_port = free_port()
+
+    async def main():
+        async with make_revalidator(fake_steam) as revalidator:
+            results = {}
+            for port, protocol in endpoints + [(dead_port, "http"), (dead_port, "socks5")]:
+                results[port, protocol] = await revalidator.probe(Proxy(HOST, port, protocol))
+            return results
+
+    results = asyncio.run(main())
+    for (port, protocol), result in results.items():
+        if port == dead_port:
+            assert result.outcome == OUTCOME_FAIL and result.error, (protocol, result)
+        elif port in limited:
+            assert result.outcome == OUTCOME_RATE_LIMITED and result.status == 429, (protocol, result)
+        else:
+            assert result.outcome == OUTCOME_OK and result.latency_ms > 0, (protocol, result)
+
+
+def test_run_releases_live_proxies_and_evicts_dead_ones(fake_steam, proxy_fleet, make_pool):
+    endpoints, limited = proxy_fleet
+    dead_port = free_port()
+    all_endpoints = endpoints + [(dead_port, "http")]
+    pool = make_pool(*(f"{protocol}://{HOST}:{port}" for port, protocol in all_endpoints))
+    pool.revalidate = True
+    # Falhas seguidas reportadas pelos clientes: a sonda fica na hora e a próxima falha retira o proxy
+    for key in pool.proxies:
+        for _ in range(service.SERVICE_REVALIDATION_EVICT_FAILURES - 1):
+            pool.report_proxy_usage(key, False)
+    assert not pool._ready
+
+    async def main():
+        async with make_revalidator(fake_steam) as revalidator:
+            task = asyncio.create_task(revalidator.run(pool))
+            deadline = time.monotonic() + 10
+            while pool._probing or any(at <= time.monotonic() for at in pool._probe_at.values()):
+                assert time.monotonic() < deadline, "As sondas não terminaram"
+                await asyncio.sleep(0.02)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+    for port, protocol in all_endpoints:
+        key = proxy_key(HOST, port, protocol)
+        if port == dead_port:
+            assert key not in pool.proxies and key in pool._evicted
+            continue
+        proxy = pool.proxies[key]
+        assert proxy.failures == 0
+        if port in limited:
+            assert key in pool._cooldown_deadline and proxy.rate_limited == 1
+        else:
+            assert key in pool._ready_pos and proxy.last_validated is not None
+    assert not pool._probing
+
+
+def test_failed_reports_schedule_probes(make_pool):
+    pool = make_pool(A, B)
+    pool.revalidate = True
+    proxy = pool.proxies[KEY_A]
+    pool.report_proxy_usage(KEY_A, False)
+    # Uma falha: sonda perto do fim do cooldown
+    assert pool._probe_at[KEY_A] >= proxy.cooldown_until - service.SERVICE_REVALIDATION_LEAD_SEC - 0.01
+    for _ in range(service.SERVICE_REVALIDATION_FAILURES - 1):
+        pool.report_proxy_usage(KEY_A, False)
+    # Falhas seguidas: sonda já
+    assert pool._probe_at[KEY_A] <= time.monotonic()
+    assert pool.take_due_probes(time.monotonic(), 10) == [proxy]
+    assert pool.take_due_probes(time.monotonic(), 10) == []
+    assert_invariants(pool)
+    # Um sucesso reportado entretanto torna a sonda obsoleta
+    pool.report_proxy_usage(KEY_A, True)
+    assert pool.apply_probe(proxy, OUTCOME_FAIL, None) == "stale"
+    assert_invariants(pool)
+
+
+def _start_probe(pool, key, failures):
+    for _ in range(failures):
+        pool.report_proxy_usage(key, False)
+    [proxy] = pool.take_due_probes(time.monotonic(), 10)
+    return proxy
+
+
+def test_apply_probe_outcomes(make_pool):
+    failures = service.SERVICE_REVALIDATION_FAILURES
+    pool = make_pool(A, B, C)
+    pool.revalidate = True
+
+    proxy = _start_probe(pool, KEY_A, failures)
+    assert pool.apply_probe(proxy, OUTCOME_OK, 80.0) == "released"
+    assert proxy.failures == 0 and KEY_A in pool._ready_pos
+    assert_invariants(pool)
+
+    proxy = _start_probe(pool, KEY_B, failures)
+    assert pool.apply_probe(proxy, OUTCOME_RATE_LIMITED, None) == "rate_limited"
+    assert proxy.failures == 0 and proxy.rate_limited == 1 and KEY_B in pool._cooldown_deadline
+    assert KEY_B not in pool._probe_at
+    assert_invariants(pool)
+
+    proxy = _start_probe(pool, KEY_C, failures)
+    assert pool.apply_probe(proxy, OUTCOME_LOCAL_ERROR, None) == "retry"
+    assert proxy.failures == failures and KEY_C in pool._probe_at
+    assert_invariants(pool)
+
+
+def test_probe_failures_evict_at_threshold(make_pool):
+    pool = make_pool(A, B)
+    pool.revalidate = True
+    proxy = _start_probe(pool, KEY_A, service.SERVICE_REVALIDATION_EVICT_FAILURES - 2)
+    assert pool.apply_probe(proxy, OUTCOME_FAIL, None) == "failed"
+    assert KEY_A in pool._cooldown_deadline and KEY_A in pool._probe_at
+    assert_invariants(pool)
+    pool._probe_at[KEY_A] = 0.0
+    pool._probe_heap.append((0.0, KEY_A))
+    pool._probe_heap.sort()
+    [proxy] = pool.take_due_probes(time.monotonic(), 10)
+    assert pool.apply_probe(proxy, OUTCOME_FAIL, None) == "evicted"
+    assert proxy.failures == service.SERVICE_REVALIDATION_EVICT_FAILURES
+    assert KEY_A not in pool.proxies
+    assert_invariants(pool)
+
+
+def test_removed_proxy_stays_out_while_the_file_still_lists_it(make_pool, write_proxy_file):
+    pool = make_pool("http://1.1.1.1:80", "http://2.2.2.2:80")
+    removed = proxy_key("1.1.1.1", 80, "http")
+    pool.ingest([("remove", "http://1.1.1.1:80", None)])
+    # O checker reescreve o ficheiro a meio da ronda com as linhas antigas e uma nova
+    bump_mtime(write_proxy_file("http://1.1.1.1:80", "http://2.2.2.2:80", "http://3.3.3.3:80"))
+    pool.load_proxies()
+    assert removed not in pool.proxies
+    assert proxy_key("3.3.3.3", 80, "http") in pool.proxies
+    assert removed in pool._evicted
+    assert_invariants(pool)
+
+
+def test_evicted_proxy_returns_only_when_validated_again(make_pool, write_proxy_file):
+    pool = make_pool(A, B)
+    pool.revalidate = True
+    proxy = _start_probe(pool, KEY_A, service.SERVICE_REVALIDATION_EVICT_FAILURES - 1)
+    assert pool.apply_probe(proxy, OUTCOME_FAIL, None) == "evicted"
+    # A linha sai no fim da ronda do checker e volta a entrar quando ele o valida de novo
+    bump_mtime(write_proxy_file(B))
+    pool.load_proxies()
+    assert KEY_A not in pool._evicted
+    bump_mtime(write_proxy_file(A, B), 2)
+    pool.load_proxies()
+    assert pool.proxies[KEY_A].failures == 0
+    assert_invariants(pool)
+
+
+def test_ingest_add_brings_an_evicted_proxy_back(make_pool, write_proxy_file):
+    pool = make_pool(A, B)
+    pool.ingest([("remove", A, None)])
+    pool.ingest([("add", A, 90.0)])
+    assert KEY_A in pool.proxies and not pool._evicted
+    # Já está no pool: uma reescrita do ficheiro não o duplica nem o retira
+    bump_mtime(write_proxy_file(A, B, C))
+    pool.load_proxies()
+    assert set(pool.proxies) == {KEY_A, KEY_B, KEY_C}
+    assert pool.proxies[KEY_A].latency == 90.0
+    assert_invariants(pool)
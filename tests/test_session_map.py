@@ -0,0 +1,91 @@
+# proxy_steam_manager/tests/test_session_map.py
+
+"""SessionMap: expiração por inatividade, saída LRU e índice inverso proxy -> sessões."""
+
+from session_map import SessionMap
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def assert_reverse_index(sessions: SessionMap):
+    expected = {}
+    for session_id, (key, _) in sessions._sessions.items():
+        expected.setdefault(key, set()).add(session_id)
+    assert sessions._by_proxy == expected
+
+
+def test_get_refreshes_and_ttl_expires():
+    clock = FakeClock()
+    sessions = SessionMap(10, idle_ttl_sec=60, clock=clock)
+    sessions.set("a", 1)
+    clock.now += 50
+    assert sessions.get("a") == 1  # Marca como usada agora
+    clock.now += 50
+    assert sessions.get("a") == 1
+    clock.now += 61
+    assert sessions.get("a") is None
+    assert sessions.evicted["ttl"] == 1
+    assert len(sessions) == 0
+    assert_reverse_index(sessions)
+
+
+def test_expire_removes_only_idle_sessions_from_the_front():
+    clock = FakeClock()
+    sessions = SessionMap(10, idle_ttl_sec=60, clock=clock)
+    sessions.set("old", 1)
+    clock.now += 40
+    sessions.set("new", 2)
+    clock.now += 30
+    assert sessions.expire() == 1
+    assert "old" not in sessions and "new" in sessions
+    assert_reverse_index(sessions)
+
+
+def test_lru_eviction_drops_least_recently_used():
+    clock = FakeClock()
+    sessions = SessionMap(3, idle_ttl_sec=600, clock=clock)
+    for i, session_id in enumerate("abc"):
+        sessions.set(session_id, i)
+        clock.now += 1
+    sessions.get("a")  # "b" passa a ser a menos usada
+    sessions.set("d", 3)
+    assert "b" not in sessions
+    assert {"a", "c", "d"} == {session_id for session_id in "abcd" if session_id in sessions}
+    assert sessions.evicted["lru"] == 1
+    assert_reverse_index(sessions)
+
+
+def test_reassigning_a_session_updates_the_reverse_index():
+    sessions = SessionMap(10, idle_ttl_sec=600)
+    sessions.set("a", 1)
+    sessions.set("b", 1)
+    sessions.set("a", 2)
+    assert sessions._by_proxy == {1: {"b"}, 2: {"a"}}
+    assert sessions.drop_proxy(1) == 1
+    assert "b" not in sessions and sessions.get("a") == 2
+    assert sessions.evicted["proxy"] == 1
+    assert sessions.drop_proxy(1) == 0
+    assert_reverse_index(sessions)
+
+
+def test_drop_and_snapshot_restore():
+    clock = FakeClock()
+    sessions = SessionMap(10, idle_ttl_sec=600, clock=clock)
+    sessions.set("a", 1)
+    clock.now += 5
+    sessions.set("b", 2)
+    sessions.drop("b")
+    sessions.drop("missing")
+    assert sessions.snapshot() == [["a", 1, 5.0]]
+    # Repor a partir da fotografia mantém o tempo sem uso
+    restored = SessionMap(10, idle_ttl_sec=600, clock=clock)
+    for session_id, key, idle_sec in sessions.snapshot():
+        restored.set(session_id, key, idle_sec)
+    assert restored.snapshot() == [["a", 1, 5.0]]
+    assert_reverse_index(restored)
@@ -1,23 +1,18 @@
 # proxy_steam_manager/utils.py
 
+import asyncio
 import requests
 from requests.exceptions import RequestException
 import time
-from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Optional
-import json
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 import os
-import threading
-try:
-    import fcntl  # Unix file locking
-except ImportError:
-    fcntl = None
 
 from .config import STEAM_PING_URL, PROXY_VALIDATION_TIMEOUT, PROXY_VALIDATION_RETRIES, MAX_ACCEPTABLE_LATENCY_MS
+from .config import PROXY_SNIFF_TIMEOUT_SEC, PROXY_SNIFF_CONCURRENCY
 from .models import Proxy
-
-_file_write_lock = threading.Lock()
+from .proxy_probe import detect_protocols, parse_target_url
+from .proxy_store import get_proxy_store
 
 def build_requests_proxies(proxy: Proxy) -> Dict[str, str]:
     """Constrói o dicionário de proxies para a biblioteca requests."""
@@ -62,7 +57,7 @@ def validate_proxy(proxy: Proxy) -> Optional[Proxy]:
             latency_ms = (time.time() - start_time) * 1000.0
             if latency_ms <= MAX_ACCEPTABLE_LATENCY_MS:
                 proxy.latency = latency_ms
-                proxy.last_validated = datetime.now()
+                proxy.last_validated = time.time()
                 proxy.reset_failures()
                 return proxy
             else:
@@ -83,6 +78,19 @@ def validate_proxy(proxy: Proxy) -> Optional[Proxy]:
         
     return None
 
+def detect_proxy_protocols(endpoints: List[Tuple[str, int]]) -> List[Proxy]:
+    """
+    Sonda endpoints 'ip:porto' sem protocolo e devolve um Proxy (já com o
+    protocolo certo) por cada endpoint que respondeu a um handshake.
+    """
+    if not endpoints:
+        return []
+    target_host, target_port = parse_target_url(STEAM_PING_URL)
+    detected = asyncio.run(detect_protocols(
+        endpoints, target_host, target_port, PROXY_SNIFF_TIMEOUT_SEC, PROXY_SNIFF_CONCURRENCY
+    ))
+    return [Proxy(ip=ip, port=port, protocol=protocol) for (ip, port), protocol in detected.items()]
+
 # (O resto do ficheiro utils.py permanece igual ao da resposta anterior)
 
 def get_proxies_from_file(file_path: str) -> List[Proxy]:
@@ -91,6 +99,7 @@ def get_proxies_from_file(file_path: str) -> List[Proxy]:
     Suporta os formatos: 'IP:PORTO' e 'protocolo://IP:PORTO'.
     """
     proxies: List[Proxy] = []
+    untyped_endpoints: List[Tuple[str, int]] = []
     print(f"[DEBUG] A tentar ler proxies do ficheiro: {file_path}")
     if not os.path.exists(file_path):
         print(f"[AVISO] Ficheiro de proxies não encontrado: {file_path}")
@@ -120,13 +129,14 @@ def get_proxies_from_file(file_path: str) -> List[Proxy]:
                     try:
                         ip, port_str = line.split(':')
                         port = int(port_str.strip())
-                        proxies.append(Proxy(ip=ip.strip(), port=port, protocol="http"))
-                        proxies.append(Proxy(ip=ip.strip(), port=port, protocol="socks4"))
-                        proxies.append(Proxy(ip=ip.strip(), port=port, protocol="socks5"))
+                        untyped_endpoints.append((ip.strip(), port))
                     except ValueError:
                         pass
     except Exception as e:
         print(f"[ERRO] Falha ao ler o ficheiro {file_path}: {e}")
+
+    # Linhas sem protocolo: detetar o protocolo em vez de testar http, socks4 e socks5
+    proxies.extend(detect_proxy_protocols(untyped_endpoints))
     
     print(f"[DEBUG] {len(proxies)} proxies potenciais lidos de {file_path}")
     return proxies
@@ -137,18 +147,17 @@ def fetch_proxies_from_url(source_url: str) -> List[Proxy]:
     try:
         response = requests.get(source_url, timeout=10)
         response.raise_for_status()
-        proxies: List[Proxy] = []
+        endpoints: List[Tuple[str, int]] = []
         for line in response.text.splitlines():
             line = line.strip()
             if line and ':' in line:
                 try:
                     ip, port_str = line.split(':')
                     port = int(port_str)
-                    proxies.append(Proxy(ip=ip.strip(), port=port, protocol="http"))
-                    proxies.append(Proxy(ip=ip.strip(), port=port, protocol="socks5"))
+                    endpoints.append((ip.strip(), port))
                 except ValueError:
                     continue
-        return proxies
+        return detect_proxy_protocols(endpoints)
     except RequestException as e:
         print(f"[AVISO] Falha ao buscar proxies da URL {source_url}: {e}")
         return []
@@ -167,44 +176,18 @@ def get_all_proxies(proxy_sources: List[Dict]) -> List[Proxy]:
     return all_proxies
 
 
-def load_proxies_from_file(filename: str) -> List[Proxy]:
+def load_proxies_from_file(filename: str) -> Iterator[Proxy]:
+    """Proxies guardados em `filename` (ver proxy_store.py), lidos aos blocos."""
     if not os.path.exists(filename):
-        return []
-    try:
-        with open(filename, "r") as f:
-            content = f.read()
-            if not content:
-                return []
-            data = json.loads(content)
-            return [Proxy.from_dict(d) for d in data]
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+        return iter(())
+    return get_proxy_store(filename).iter_proxies()
 
 
-def save_proxies_to_file(proxies: List[Proxy], filename: str):
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    tmp_filename = filename + ".tmp"
-    data_to_save = [p.to_dict() for p in proxies]
-    
-    with _file_write_lock:
-        with open(tmp_filename, "w") as f:
-            if fcntl:
-                try:
-                    fcntl.flock(f, fcntl.LOCK_EX)
-                except Exception:
-                    pass
-            json.dump(data_to_save, f, indent=4)
-        os.replace(tmp_filename, filename)
+def save_proxies_to_file(proxies: Iterable[Proxy], filename: str):
+    """Substitui os proxies guardados em `filename` por estes, numa só transação."""
+    get_proxy_store(filename).replace_all(proxies)
 
 
 def save_or_update_single_proxy(proxy: Proxy, filename: str):
-    """Atualiza o ficheiro JSON para inserir/atualizar um único proxy de forma segura."""
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    with _file_write_lock:
-        all_proxies = load_proxies_from_file(filename)
-        existing_proxies: Dict[str, Proxy] = {f"{p.ip}:{p.port}:{p.protocol}": p for p in all_proxies}
-        
-        key = f"{proxy.ip}:{proxy.port}:{p.protocol}"
-        existing_proxies[key] = proxy
-        
-        save_proxies_to_file(list(existing_proxies.values()), filename)
\ No newline at end of file
+    """Insere/atualiza um único proxy sem ler nem reescrever os restantes."""
+    get_proxy_store(filename).upsert(proxy)